@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.db import init_crypto_db
+from utils.db import init_crypto_db, get_crypto_db_path
+from utils.backup import snapshot_database
 
 def main():
     st.header("📈 Crypto Trade Tracker")
@@ -132,6 +133,7 @@ def main():
                     st.rerun()
 
                 if st.button("🗑️ Delete Trade", key=f"delete_{selected_id}"):
+                    snapshot_database(get_crypto_db_path(), reason="delete-trade")
                     c.execute("DELETE FROM trades WHERE id=?", (selected_id,))
                     conn.commit()
                     st.success("🗑️ Deleted.")
@@ -1,23 +1,41 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime
 import plotly.express as px
+import plotly.graph_objects as go
 import sqlite3
 import os
+import calendar
+import threading
+import time
+import io
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
+from utils.backup import snapshot_database, list_snapshots, restore_snapshot, restore_as_of
+from utils.db import EXPENSE_DB_NAME, get_user_db_path, get_crypto_db_path, get_stocks_db_path
+from utils.write_queue import get_write_queue, close_write_queue
+from utils.blob_store import BlobStore, get_lru_cache
+from utils.expense_queries import query_transactions, close_read_connections
 
 # Main function that serves as the entry point
 def show_expense_tracker():
     # Initialize database if not exists
     init_database()
     
+    # Write any recurring transactions that have come due since the last visit
+    materialized = materialize_recurring_transactions()
+    if materialized:
+        st.info(f"Added {materialized} recurring transaction(s) due up to today.")
+    
     # Initialize session state variables
     init_session_state()
     
     # Top-level navigation
     st.header("🗓️ Daily Expense Tracker")
-    nav_options = ["Dashboard", "Transactions", "Calendar", "Accounts", "Statistics", "Settings"]
+    nav_options = ["Dashboard", "Transactions", "Calendar", "Accounts", "Statistics", "Forecast", "Settings"]
     selected_nav = st.sidebar.radio("Navigation", nav_options)
     
     # Navigation router
@@ -31,12 +49,19 @@ def show_expense_tracker():
         show_accounts_page()
     elif selected_nav == "Statistics":
         show_statistics_page()
+    elif selected_nav == "Forecast":
+        show_forecast_page()
     elif selected_nav == "Settings":
         show_settings_page()
 
-def init_database():
+# Database files already initialized by this process; later reruns skip the schema checks
+_initialized_databases = set()
+
+def init_database(db_path=None):
     """Initialize SQLite database with tables if they don't exist"""
-    db_path = "data/expense_tracker.db"
+    db_path = db_path or get_db_path()
+    if db_path in _initialized_databases and os.path.exists(db_path):
+        return
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
     conn = sqlite3.connect(db_path)
@@ -82,6 +107,157 @@ def init_database():
     )
     ''')
     
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS recurring_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,  -- 'expense', 'income', 'transfer'
+        amount REAL NOT NULL,
+        category_id INTEGER,
+        account_id INTEGER NOT NULL,
+        to_account_id INTEGER,
+        description TEXT,
+        frequency TEXT NOT NULL,  -- 'daily', 'weekly', 'monthly', 'yearly'
+        interval INTEGER NOT NULL DEFAULT 1,
+        start_date TEXT NOT NULL,
+        end_date TEXT,
+        next_date TEXT NOT NULL,  -- first occurrence not yet materialized
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories(id),
+        FOREIGN KEY (account_id) REFERENCES accounts(id),
+        FOREIGN KEY (to_account_id) REFERENCES accounts(id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_rules_next_date ON recurring_rules(next_date)")
+    
+    # Per-account ledger scans, ordered the way running balances are accumulated
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions(account_id, date, id)")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transactions_to_account_date
+    ON transactions(to_account_id, date, id) WHERE to_account_id IS NOT NULL
+    ''')
+    
+    # Occurrences written by the scheduler carry '<rule id>:<date>' so a rerun never duplicates them
+    ensure_column(cursor, "transactions", "recurrence_key", "TEXT")
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_recurrence_key
+    ON transactions(recurrence_key)
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category_id INTEGER NOT NULL,
+        period TEXT NOT NULL,  -- 'monthly', 'weekly'
+        amount REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (category_id, period),
+        FOREIGN KEY (category_id) REFERENCES categories(id)
+    )
+    ''')
+    
+    # Spend per category and period, kept current by the write path so budgets never rescan the ledger
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS budget_rollups (
+        category_id INTEGER NOT NULL,
+        period TEXT NOT NULL,  -- 'monthly', 'weekly'
+        period_start TEXT NOT NULL,
+        spent REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (category_id, period, period_start)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS budget_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        budget_id INTEGER NOT NULL,
+        period_start TEXT NOT NULL,
+        threshold INTEGER NOT NULL,  -- percent of the budget amount
+        spent REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (budget_id, period_start, threshold),
+        FOREIGN KEY (budget_id) REFERENCES budgets(id)
+    )
+    ''')
+    
+    # Daily exchange rates, stored as units of the currency per 1 USD
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fx_rates (
+        currency TEXT NOT NULL,
+        date TEXT NOT NULL,
+        rate REAL NOT NULL,
+        PRIMARY KEY (currency, date)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS preferences (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+    
+    # Streaming anomaly detector state: Welford moments per category and recent charge fingerprints
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS anomaly_stats (
+        category_id INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        m2 REAL NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS anomaly_recent_charges (
+        fingerprint INTEGER PRIMARY KEY,
+        transaction_id INTEGER NOT NULL,
+        date TEXT NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS anomalies (
+        transaction_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,  -- 'outlier', 'duplicate'
+        score REAL,  -- z-score, or days between the duplicate charges
+        related_transaction_id INTEGER,
+        dismissed INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (transaction_id, kind)
+    ) WITHOUT ROWID
+    ''')
+    
+    # Bumped whenever the ledger changes, so derived results know when they are stale
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ledger_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generation INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO ledger_state (id, generation) VALUES (1, 0)")
+    
+    # Receipt files live in a content-addressed store next to the database; only their hash is kept here
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transaction_attachments (
+        transaction_id INTEGER NOT NULL,
+        blob_hash TEXT NOT NULL,  -- SHA-256 of the file content
+        filename TEXT NOT NULL,
+        content_type TEXT,
+        size INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (transaction_id, blob_hash),
+        FOREIGN KEY (transaction_id) REFERENCES transactions (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transaction_attachments_hash ON transaction_attachments(blob_hash)")
+    
+    # One-off data migrations for databases created by older versions
+    cursor.execute("PRAGMA user_version")
+    schema_version = cursor.fetchone()[0]
+    if schema_version < 1:
+        rebuild_budget_rollups(cursor)
+    if schema_version < 2:
+        backfill_anomalies(cursor)
+    if schema_version < SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
     # Insert default categories if not exist
     default_categories = [
         ('Food & Dining', 'expense', '🍔', '#FF5733'),
@@ -104,6 +280,13 @@ def init_database():
     
     conn.commit()
     conn.close()
+    _initialized_databases.add(db_path)
+
+def ensure_column(cursor, table, column, definition):
+    """Add a column to an existing table if an older database does not have it yet"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 def init_session_state():
     """Initialize session state variables"""
@@ -121,7 +304,7 @@ def init_session_state():
     if "current_year" not in st.session_state:
         st.session_state.current_year = datetime.date.today().year
 
-@dataclass
+@dataclass(frozen=True)
 class Account:
     id: Optional[int]
     name: str
@@ -129,7 +312,7 @@ class Account:
     currency: str
     initial_balance: float
     
-@dataclass
+@dataclass(frozen=True)
 class Category:
     id: Optional[int]
     name: str
@@ -148,140 +331,1104 @@ class Transaction:
     to_account_id: Optional[int]
     description: Optional[str]
 
+@dataclass
+class RecurringRule:
+    id: Optional[int]
+    type: str
+    amount: float
+    category_id: Optional[int]
+    account_id: int
+    to_account_id: Optional[int]
+    description: Optional[str]
+    frequency: str  # 'daily', 'weekly', 'monthly', 'yearly'
+    interval: int
+    start_date: str
+    end_date: Optional[str]
+    next_date: str
+
+RECURRING_FREQUENCIES = ["daily", "weekly", "monthly", "yearly"]
+
+SCHEMA_VERSION = 2
+
+@dataclass
+class Budget:
+    id: Optional[int]
+    category_id: int
+    period: str  # 'monthly', 'weekly'
+    amount: float
+
+@dataclass
+class BudgetStatus:
+    budget: Budget
+    category_name: str
+    category_icon: str
+    period_start: str
+    spent: float
+
+    @property
+    def utilization(self) -> float:
+        return self.spent / self.budget.amount if self.budget.amount else 0.0
+
+BUDGET_PERIODS = ["monthly", "weekly"]
+BUDGET_THRESHOLDS = [50, 80, 100]  # percent of the budget that raises an event
+
+def get_db_path():
+    """Path of the logged-in user's SQLite database file"""
+    return get_user_db_path(EXPENSE_DB_NAME)
+
 def get_db_connection():
     """Get a connection to the SQLite database"""
-    return sqlite3.connect("data/expense_tracker.db")
+    return sqlite3.connect(get_db_path())
 
-def get_accounts() -> List[Account]:
-    """Fetch all accounts from the database"""
+@dataclass(frozen=True)
+class ReferenceData:
+    """Immutable snapshot of accounts and categories with constant-time lookups"""
+    accounts: Tuple[Account, ...]
+    categories: Tuple[Category, ...]  # ordered by type, then name
+    categories_by_type: Mapping[str, Tuple[Category, ...]]
+    account_by_id: Mapping[int, Account]
+    account_id_by_name: Mapping[str, int]
+    category_by_id: Mapping[int, Category]
+    category_id_by_name: Mapping[Tuple[str, str], int]  # (type, name) -> id
+
+# Process-wide snapshot per database file, shared by all sessions until a write invalidates it
+_reference_data: Dict[str, ReferenceData] = {}
+_reference_data_lock = threading.Lock()
+
+def get_reference_data() -> ReferenceData:
+    """Return the cached reference-data snapshot, loading it on first use"""
+    db_path = get_db_path()
+    snapshot = _reference_data.get(db_path)
+    if snapshot is not None:
+        return snapshot
+
+    with _reference_data_lock:
+        snapshot = _reference_data.get(db_path)
+        if snapshot is None:
+            snapshot = _load_reference_data()
+            _reference_data[db_path] = snapshot
+    return snapshot
+
+def _load_reference_data() -> ReferenceData:
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, type, currency, initial_balance FROM accounts")
-    accounts = [Account(id=row[0], name=row[1], type=row[2], 
-                        currency=row[3], initial_balance=row[4]) 
-                for row in cursor.fetchall()]
+    accounts = tuple(Account(id=row[0], name=row[1], type=row[2], 
+                             currency=row[3], initial_balance=row[4]) 
+                     for row in cursor.fetchall())
+    cursor.execute("SELECT id, name, type, icon, color FROM categories ORDER BY type, name")
+    categories = tuple(Category(id=row[0], name=row[1], type=row[2], 
+                                icon=row[3], color=row[4]) 
+                       for row in cursor.fetchall())
     conn.close()
-    return accounts
+
+    categories_by_type = {}
+    for category in categories:
+        categories_by_type.setdefault(category.type, []).append(category)
+
+    return ReferenceData(
+        accounts=accounts,
+        categories=categories,
+        categories_by_type=MappingProxyType({t: tuple(cats) for t, cats in categories_by_type.items()}),
+        account_by_id=MappingProxyType({account.id: account for account in accounts}),
+        account_id_by_name=MappingProxyType({account.name: account.id for account in accounts}),
+        category_by_id=MappingProxyType({category.id: category for category in categories}),
+        category_id_by_name=MappingProxyType({(category.type, category.name): category.id
+                                              for category in categories})
+    )
+
+def invalidate_reference_data():
+    """Drop the snapshot after accounts or categories change"""
+    with _reference_data_lock:
+        _reference_data.pop(get_db_path(), None)
+
+def get_accounts() -> List[Account]:
+    """Fetch all accounts"""
+    return list(get_reference_data().accounts)
 
 def get_categories(type_filter=None) -> List[Category]:
-    """Fetch categories from the database"""
+    """Fetch categories, optionally of one type"""
+    reference = get_reference_data()
+    if type_filter:
+        return list(reference.categories_by_type.get(type_filter, ()))
+    return list(reference.categories)
+
+def save_transaction(transaction: Transaction) -> int:
+    """Save a transaction to the database and return its ID.
+
+    The insert goes through the write queue, which commits concurrent saves together.
+    """
+    def write(cursor):
+        cursor.execute('''
+        INSERT INTO transactions 
+        (type, amount, date, category_id, account_id, to_account_id, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (transaction.type, transaction.amount, transaction.date,
+              transaction.category_id, transaction.account_id,
+              transaction.to_account_id, transaction.description))
+        
+        transaction_id = cursor.lastrowid
+        after_transactions_written(cursor, transaction_id - 1)
+        return transaction_id
+    
+    return get_write_queue(get_db_path()).execute(write)
+
+def save_transactions(transactions: List[Transaction]) -> List[int]:
+    """Save many transactions in one database transaction and return their IDs"""
+    rows = [(tx.type, tx.amount, tx.date, tx.category_id, tx.account_id, tx.to_account_id, tx.description)
+            for tx in transactions]
+    
+    def write(cursor):
+        after_id = last_transaction_id(cursor)
+        cursor.executemany('''
+        INSERT INTO transactions 
+        (type, amount, date, category_id, account_id, to_account_id, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        cursor.execute("SELECT id FROM transactions WHERE id > ? ORDER BY id", (after_id,))
+        transaction_ids = [row[0] for row in cursor.fetchall()]
+        after_transactions_written(cursor, after_id)
+        return transaction_ids
+    
+    return get_write_queue(get_db_path()).execute(write)
+
+def get_account_balance(account_id):
+    """Calculate current balance for an account"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    if type_filter:
-        cursor.execute("""
-            SELECT id, name, type, icon, color FROM categories 
-            WHERE type = ? ORDER BY name
-            """, (type_filter,))
+    # Income adds, expenses and transfers out subtract, transfers in add
+    cursor.execute("""
+    SELECT a.initial_balance
+           + COALESCE((SELECT SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)
+                       FROM transactions t WHERE t.account_id = a.id), 0)
+           + COALESCE((SELECT SUM(t.amount) FROM transactions t
+                       WHERE t.type = 'transfer' AND t.to_account_id = a.id), 0)
+    FROM accounts a
+    WHERE a.id = ?
+    """, (account_id,))
+    balance = cursor.fetchone()[0]
+    
+    conn.close()
+    return balance
+
+@dataclass
+class Ledger:
+    """One page of an account's ledger plus its end-of-day balance history"""
+    rows: List[Dict]
+    total_rows: int
+    history: pd.DataFrame  # columns: date, balance
+
+# Every transaction becomes one leg per account it touches; a transfer has an outgoing
+# leg on its source account and an incoming leg on its target account
+_LEDGER_SQL = '''
+WITH legs AS (
+    SELECT id, date, type, amount, category_id, description,
+           account_id AS ledger_account_id, to_account_id AS counterparty_id, 0 AS leg,
+           CASE WHEN type = 'income' THEN amount ELSE -amount END AS delta
+    FROM transactions
+    WHERE account_id = :account_id
+    UNION ALL
+    SELECT id, date, type, amount, category_id, description,
+           to_account_id, account_id, 1, amount
+    FROM transactions
+    WHERE to_account_id = :account_id AND type = 'transfer'
+),
+totals AS (
+    SELECT COUNT(*) AS total_rows FROM legs
+),
+running AS (
+    -- All windows share one ordering, so the legs are sorted once; position 1 is the newest leg
+    SELECT l.*, t.total_rows,
+           a.initial_balance + SUM(l.delta) OVER w AS balance,
+           t.total_rows + 1 - ROW_NUMBER() OVER w AS position,
+           LEAD(l.date) OVER w IS NOT l.date AS is_day_end
+    FROM legs l
+    JOIN accounts a ON a.id = l.ledger_account_id
+    CROSS JOIN totals t
+    WINDOW w AS (PARTITION BY l.ledger_account_id ORDER BY l.date, l.id, l.leg ROWS UNBOUNDED PRECEDING)
+)
+SELECT r.id, r.date, r.type, r.amount, r.delta, r.balance, r.description,
+       r.position, r.is_day_end, r.total_rows,
+       c.name AS category_name, c.icon AS category_icon, cp.name AS counterparty_name,
+       (SELECT COUNT(*) FROM transaction_attachments ta WHERE ta.transaction_id = r.id) AS attachments
+FROM running r
+LEFT JOIN categories c ON c.id = r.category_id
+LEFT JOIN accounts cp ON cp.id = r.counterparty_id
+WHERE r.position BETWEEN :first AND :last OR r.is_day_end
+ORDER BY r.position
+'''
+
+def get_account_ledger(account_id, page=1, page_size=50) -> Ledger:
+    """Ledger rows with a running balance, newest first, paginated.
+
+    The page and the balance history (the last balance of every day) come from
+    the same windowed scan of the account's transactions.
+    """
+    conn = get_db_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    first = (page - 1) * page_size + 1
+    cursor.execute(_LEDGER_SQL, {"account_id": account_id, "first": first, "last": first + page_size - 1})
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    
+    page_rows = [row for row in rows if first <= row["position"] < first + page_size]
+    day_ends = [row for row in reversed(rows) if row["is_day_end"]]
+    history = pd.DataFrame({
+        "date": pd.to_datetime([row["date"] for row in day_ends]),
+        "balance": [row["balance"] for row in day_ends],
+    })
+    return Ledger(rows=page_rows, total_rows=rows[0]["total_rows"] if rows else 0, history=history)
+
+RECEIPT_TYPES = ["png", "jpg", "jpeg", "webp", "gif", "pdf"]
+THUMBNAIL_SIZE = (240, 240)
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
+THUMBNAIL_WAIT = 2.0  # seconds a page waits for freshly scheduled thumbnails
+
+@dataclass
+class Attachment:
+    transaction_id: int
+    blob_hash: str
+    filename: str
+    content_type: Optional[str]
+    size: int
+
+    @property
+    def is_image(self) -> bool:
+        return (self.content_type or "").startswith("image/")
+
+# Thumbnails are decoded off the script thread; one job per blob however many pages ask for it
+_thumbnail_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+_thumbnail_jobs: Dict[str, Future] = {}
+_thumbnail_jobs_lock = threading.Lock()
+
+def get_receipts_dir():
+    """Receipts of the current user live next to their database"""
+    return os.path.join(os.path.dirname(get_db_path()), "receipts")
+
+def get_receipt_store() -> BlobStore:
+    return BlobStore(os.path.join(get_receipts_dir(), "blobs"))
+
+def get_thumbnail_cache():
+    return get_lru_cache(os.path.join(get_receipts_dir(), "thumbnails"), THUMBNAIL_CACHE_BYTES)
+
+def _thumbnail_key(blob_hash):
+    return f"{blob_hash}-{THUMBNAIL_SIZE[0]}x{THUMBNAIL_SIZE[1]}.jpg"
+
+def _render_thumbnail(store, cache, blob_hash):
+    """Decode the full image once and cache a small JPEG of it"""
+    from PIL import Image, ImageOps
+    
+    with Image.open(store.path(blob_hash)) as image:
+        # JPEGs can be decoded at a reduced scale directly, which skips most of the work
+        image.draft("RGB", THUMBNAIL_SIZE)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail(THUMBNAIL_SIZE)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=80)
+    return cache.put(_thumbnail_key(blob_hash), buffer.getvalue())
+
+def schedule_thumbnail(blob_hash) -> Optional[Future]:
+    """Start building a thumbnail unless it is cached or already being built"""
+    cache = get_thumbnail_cache()
+    if cache.get(_thumbnail_key(blob_hash)):
+        return None
+    store = get_receipt_store()
+    job_key = store.path(blob_hash)
+    with _thumbnail_jobs_lock:
+        future = _thumbnail_jobs.get(job_key)
+        if future is None:
+            future = _thumbnail_pool.submit(_render_thumbnail, store, cache, blob_hash)
+            _thumbnail_jobs[job_key] = future
+            future.add_done_callback(lambda _: _pop_thumbnail_job(job_key))
+        return future
+
+def _pop_thumbnail_job(job_key):
+    with _thumbnail_jobs_lock:
+        _thumbnail_jobs.pop(job_key, None)
+
+def get_thumbnails(attachments: List[Attachment], wait=THUMBNAIL_WAIT) -> Dict[str, Optional[str]]:
+    """Thumbnail file per image blob; None for those still being built or undecodable"""
+    cache = get_thumbnail_cache()
+    thumbnails = {}
+    pending = {}
+    for attachment in attachments:
+        if not attachment.is_image or attachment.blob_hash in thumbnails:
+            continue
+        thumbnails[attachment.blob_hash] = cache.get(_thumbnail_key(attachment.blob_hash))
+        if thumbnails[attachment.blob_hash] is None:
+            pending[attachment.blob_hash] = schedule_thumbnail(attachment.blob_hash)
+    
+    deadline = time.monotonic() + wait
+    for blob_hash, future in pending.items():
+        if future is None:
+            thumbnails[blob_hash] = cache.get(_thumbnail_key(blob_hash))
+            continue
+        try:
+            thumbnails[blob_hash] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except Exception:
+            # Timed out (shown next run) or not a readable image
+            thumbnails[blob_hash] = None
+    return thumbnails
+
+def attach_receipt(transaction_id, filename, data: bytes, content_type=None) -> str:
+    """Store a receipt file and link it to a transaction; return its content hash"""
+    blob_hash = get_receipt_store().put(data)
+    
+    def write(cursor):
+        cursor.execute('''
+        INSERT OR REPLACE INTO transaction_attachments (transaction_id, blob_hash, filename, content_type, size)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (transaction_id, blob_hash, filename, content_type, len(data)))
+    
+    get_write_queue(get_db_path()).execute(write)
+    if (content_type or "").startswith("image/"):
+        schedule_thumbnail(blob_hash)
+    return blob_hash
+
+def get_attachments(transaction_ids) -> Dict[int, List[Attachment]]:
+    """Attachments of the given transactions, grouped by transaction"""
+    transaction_ids = list(transaction_ids)
+    if not transaction_ids:
+        return {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT transaction_id, blob_hash, filename, content_type, size
+    FROM transaction_attachments
+    WHERE transaction_id IN ({", ".join("?" * len(transaction_ids))})
+    ORDER BY transaction_id, created_at
+    ''', transaction_ids)
+    attachments = {}
+    for row in cursor.fetchall():
+        attachments.setdefault(row[0], []).append(Attachment(*row))
+    conn.close()
+    return attachments
+
+def show_receipt_gallery(attachments: Dict[int, List[Attachment]], labels: Dict[int, str]):
+    """Thumbnails of the given attachments; full-size files are only read when downloaded"""
+    flat = [attachment for group in attachments.values() for attachment in group]
+    thumbnails = get_thumbnails(flat)
+    columns = st.columns(4)
+    for i, attachment in enumerate(flat):
+        with columns[i % len(columns)]:
+            thumbnail = thumbnails.get(attachment.blob_hash)
+            if thumbnail:
+                st.image(thumbnail, use_container_width=True)
+            elif attachment.is_image:
+                st.text("🖼️ preview pending")
+            else:
+                st.text("📄")
+            st.caption(f"{labels.get(attachment.transaction_id, '')} · {attachment.filename}")
+    
+    options = {f"{labels.get(a.transaction_id, '')} · {a.filename}": a for a in flat}
+    selected = st.selectbox("Open receipt", [""] + list(options), key="receipt_open")
+    if selected:
+        attachment = options[selected]
+        st.download_button("Download", data=get_receipt_store().get(attachment.blob_hash),
+                           file_name=attachment.filename, mime=attachment.content_type,
+                           key="receipt_download")
+
+def _add_months(date, months):
+    """Shift a date by whole months, clamping the day to the length of the target month"""
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(date.day, calendar.monthrange(year, month)[1])
+    return datetime.date(year, month, day)
+
+def _rule_occurrence(start, frequency, interval, n):
+    """Return the n-th occurrence (0-based) of a cadence anchored at start"""
+    if frequency == "daily":
+        return start + datetime.timedelta(days=n * interval)
+    if frequency == "weekly":
+        return start + datetime.timedelta(weeks=n * interval)
+    if frequency == "monthly":
+        return _add_months(start, n * interval)
+    if frequency == "yearly":
+        return _add_months(start, 12 * n * interval)
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+def _first_occurrence_index(start, frequency, interval, date):
+    """Index of the first occurrence on or after date, without walking the earlier ones"""
+    if date <= start:
+        return 0
+    if frequency in ("daily", "weekly"):
+        step = interval * (7 if frequency == "weekly" else 1)
+        return -(-(date - start).days // step)
+    step = interval * (12 if frequency == "yearly" else 1)
+    n = max(0, ((date.year - start.year) * 12 + date.month - start.month) // step)
+    while _rule_occurrence(start, frequency, interval, n) < date:
+        n += 1
+    return n
+
+def iter_rule_occurrences(rule: RecurringRule, from_date, to_date):
+    """Yield the dates a rule fires on between from_date and to_date (inclusive)"""
+    start = datetime.date.fromisoformat(rule.start_date)
+    last = to_date
+    if rule.end_date:
+        last = min(last, datetime.date.fromisoformat(rule.end_date))
+    if from_date > last:
+        return
+
+    n = _first_occurrence_index(start, rule.frequency, rule.interval, from_date)
+    occurrence = _rule_occurrence(start, rule.frequency, rule.interval, n)
+    while occurrence <= last:
+        yield occurrence
+        n += 1
+        occurrence = _rule_occurrence(start, rule.frequency, rule.interval, n)
+
+def _rows_to_rules(rows) -> List[RecurringRule]:
+    return [RecurringRule(id=row[0], type=row[1], amount=row[2], category_id=row[3],
+                          account_id=row[4], to_account_id=row[5], description=row[6],
+                          frequency=row[7], interval=row[8], start_date=row[9],
+                          end_date=row[10], next_date=row[11])
+            for row in rows]
+
+_RULE_COLUMNS = '''id, type, amount, category_id, account_id, to_account_id, description,
+                   frequency, interval, start_date, end_date, next_date'''
+
+def get_recurring_rules() -> List[RecurringRule]:
+    """Fetch all recurring rules ordered by their next due date"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {_RULE_COLUMNS} FROM recurring_rules ORDER BY next_date, id")
+    rules = _rows_to_rules(cursor.fetchall())
+    conn.close()
+    return rules
+
+def add_recurring_rule(rule: RecurringRule) -> int:
+    """Save a recurring rule and return its ID; it first fires on its start date"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    INSERT INTO recurring_rules
+    (type, amount, category_id, account_id, to_account_id, description,
+     frequency, interval, start_date, end_date, next_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (rule.type, rule.amount, rule.category_id, rule.account_id,
+          rule.to_account_id, rule.description, rule.frequency, rule.interval,
+          rule.start_date, rule.end_date, rule.start_date))
+
+    rule_id = cursor.lastrowid
+    bump_ledger_generation(cursor)
+    conn.commit()
+    conn.close()
+    return rule_id
+
+def delete_recurring_rule(rule_id):
+    """Delete a recurring rule; transactions it already wrote are kept"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM recurring_rules WHERE id = ?", (rule_id,))
+    bump_ledger_generation(cursor)
+    conn.commit()
+    conn.close()
+
+def materialize_recurring_transactions(as_of=None) -> int:
+    """Write every occurrence due up to as_of (default today) in one batched insert.
+
+    Each occurrence carries a recurrence key, so an interrupted or repeated run
+    never writes the same occurrence twice. Returns the number of new transactions.
+    """
+    as_of = as_of or datetime.date.today()
+    as_of_str = as_of.strftime("%Y-%m-%d")
+    due_sql = f'''
+    SELECT {_RULE_COLUMNS} FROM recurring_rules
+    WHERE next_date <= ? AND (end_date IS NULL OR next_date <= end_date)
+    '''
+
+    # Most visits find nothing due, and then no write is queued at all
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT EXISTS ({due_sql})", (as_of_str,))
+    anything_due = cursor.fetchone()[0]
+    conn.close()
+    if not anything_due:
+        return 0
+
+    def write(cursor):
+        # Rules are read again under the write lock, together with MAX(id)
+        cursor.execute(due_sql, (as_of_str,))
+        due_rules = _rows_to_rules(cursor.fetchall())
+        last_id = last_transaction_id(cursor)
+        rows = []
+        next_dates = []
+        for rule in due_rules:
+            for occurrence in iter_rule_occurrences(rule, datetime.date.fromisoformat(rule.next_date), as_of):
+                occurrence_str = occurrence.strftime("%Y-%m-%d")
+                rows.append((rule.type, rule.amount, occurrence_str, rule.category_id,
+                             rule.account_id, rule.to_account_id, rule.description,
+                             f"{rule.id}:{occurrence_str}"))
+            following = next(iter_rule_occurrences(rule, as_of + datetime.timedelta(days=1),
+                                                   datetime.date.max), None)
+            # A finished rule is parked past its end date so it is never selected again
+            next_dates.append(((following or datetime.date.max).strftime("%Y-%m-%d"), rule.id))
+
+        cursor.executemany('''
+        INSERT OR IGNORE INTO transactions
+        (type, amount, date, category_id, account_id, to_account_id, description, recurrence_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        inserted = cursor.rowcount
+        after_transactions_written(cursor, last_id)
+        cursor.executemany("UPDATE recurring_rules SET next_date = ? WHERE id = ?", next_dates)
+        return inserted
+
+    return get_write_queue(get_db_path()).execute(write)
+
+def project_recurring_transactions(start_date, end_date) -> List[Transaction]:
+    """Generate the occurrences rules will produce between two dates without writing them"""
+    projected = []
+    for rule in get_recurring_rules():
+        from_date = max(start_date, datetime.date.fromisoformat(rule.next_date))
+        for occurrence in iter_rule_occurrences(rule, from_date, end_date):
+            projected.append(Transaction(
+                id=None,
+                type=rule.type,
+                amount=rule.amount,
+                date=occurrence.strftime("%Y-%m-%d"),
+                category_id=rule.category_id,
+                account_id=rule.account_id,
+                to_account_id=rule.to_account_id,
+                description=rule.description
+            ))
+    projected.sort(key=lambda tx: tx.date)
+    return projected
+
+# SQL expression giving the first day of the budget period a transaction date falls in (weeks start on Monday)
+_PERIOD_START_SQL = {
+    "monthly": "substr(date, 1, 8) || '01'",
+    "weekly": "date(date, 'weekday 0', '-6 days')",
+}
+
+def budget_period_start(date, period):
+    """Python counterpart of _PERIOD_START_SQL for a datetime.date"""
+    if period == "monthly":
+        return date.replace(day=1)
+    return date - datetime.timedelta(days=date.weekday())
+
+def last_transaction_id(cursor):
+    """Highest transaction id so far; rows inserted afterwards have larger ids"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions")
+    return cursor.fetchone()[0]
+
+def after_transactions_written(cursor, after_id):
+    """Bookkeeping for transactions inserted in the current database transaction.
+
+    Every write path calls this with the last id that existed before its inserts,
+    so derived tables are updated from the new rows only, inside the same commit.
+    """
+    _fold_expenses_into_rollups(cursor, after_id)
+    _record_budget_events(cursor, after_id)
+    _detect_anomalies(cursor, after_id)
+    bump_ledger_generation(cursor)
+
+def bump_ledger_generation(cursor):
+    """Mark everything derived from the ledger (forecasts, ...) as stale"""
+    cursor.execute("UPDATE ledger_state SET generation = generation + 1")
+
+def get_ledger_generation():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT generation FROM ledger_state")
+    generation = cursor.fetchone()[0]
+    conn.close()
+    return generation
+
+def _fold_expenses_into_rollups(cursor, after_id):
+    for period, period_start in _PERIOD_START_SQL.items():
+        cursor.execute(f'''
+        INSERT INTO budget_rollups (category_id, period, period_start, spent)
+        SELECT category_id, ?, {period_start}, SUM(amount) FROM transactions
+        WHERE id > ? AND type = 'expense' AND category_id IS NOT NULL
+        GROUP BY category_id, {period_start}
+        ON CONFLICT (category_id, period, period_start) DO UPDATE SET spent = spent + excluded.spent
+        ''', (period, after_id))
+
+def _record_budget_events(cursor, after_id):
+    """Record each threshold the new rows pushed a budget across, once per period"""
+    thresholds = ", ".join(f"({threshold})" for threshold in BUDGET_THRESHOLDS)
+    cursor.execute(f'''
+    WITH touched AS (
+        SELECT DISTINCT category_id,
+               {_PERIOD_START_SQL["monthly"]} AS month_start,
+               {_PERIOD_START_SQL["weekly"]} AS week_start
+        FROM transactions
+        WHERE id > ? AND type = 'expense' AND category_id IS NOT NULL
+    )
+    INSERT OR IGNORE INTO budget_events (budget_id, period_start, threshold, spent)
+    SELECT b.id, r.period_start, th.column1, r.spent
+    FROM budgets b
+    JOIN budget_rollups r ON r.category_id = b.category_id AND r.period = b.period
+    JOIN (VALUES {thresholds}) th
+    WHERE r.spent >= b.amount * th.column1 / 100.0
+      AND EXISTS (
+        SELECT 1 FROM touched
+        WHERE touched.category_id = r.category_id
+          AND r.period_start = CASE r.period WHEN 'monthly' THEN touched.month_start
+                                             ELSE touched.week_start END
+      )
+    ''', (after_id,))
+
+def rebuild_budget_rollups(cursor):
+    """Recompute every rollup from the ledger in one grouped pass"""
+    cursor.execute("DELETE FROM budget_rollups")
+    _fold_expenses_into_rollups(cursor, 0)
+
+def set_budget(category_id, period, amount):
+    """Create or change the budget for a category and period"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    INSERT INTO budgets (category_id, period, amount)
+    VALUES (?, ?, ?)
+    ON CONFLICT (category_id, period) DO UPDATE SET amount = excluded.amount
+    ''', (category_id, period, amount))
+
+    conn.commit()
+    conn.close()
+
+def delete_budget(budget_id):
+    """Delete a budget and its threshold history"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM budget_events WHERE budget_id = ?", (budget_id,))
+    cursor.execute("DELETE FROM budgets WHERE id = ?", (budget_id,))
+    conn.commit()
+    conn.close()
+
+def get_budget_status(as_of=None) -> List[BudgetStatus]:
+    """Utilization of every budget in the period containing as_of, read from the rollups"""
+    as_of = as_of or datetime.date.today()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT b.id, b.category_id, b.period, b.amount, c.name, c.icon,
+           CASE b.period WHEN 'monthly' THEN :month_start ELSE :week_start END AS period_start,
+           COALESCE(r.spent, 0)
+    FROM budgets b
+    JOIN categories c ON c.id = b.category_id
+    LEFT JOIN budget_rollups r
+      ON r.category_id = b.category_id AND r.period = b.period
+     AND r.period_start = CASE b.period WHEN 'monthly' THEN :month_start ELSE :week_start END
+    ORDER BY b.period, c.name
+    ''', {
+        "month_start": budget_period_start(as_of, "monthly").strftime("%Y-%m-%d"),
+        "week_start": budget_period_start(as_of, "weekly").strftime("%Y-%m-%d"),
+    })
+    statuses = [BudgetStatus(budget=Budget(id=row[0], category_id=row[1], period=row[2], amount=row[3]),
+                             category_name=row[4], category_icon=row[5],
+                             period_start=row[6], spent=row[7])
+                for row in cursor.fetchall()]
+    conn.close()
+    return statuses
+
+def get_budget_events(limit=10) -> List[Dict]:
+    """Most recent budget threshold crossings"""
+    conn = get_db_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT e.period_start, e.threshold, e.spent, e.created_at,
+           b.period, b.amount, c.name as category_name, c.icon as category_icon
+    FROM budget_events e
+    JOIN budgets b ON b.id = e.budget_id
+    JOIN categories c ON c.id = b.category_id
+    ORDER BY e.id DESC
+    LIMIT ?
+    ''', (limit,))
+    events = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return events
+
+# Flag an expense this many standard deviations above its category's running mean
+ANOMALY_Z_THRESHOLD = 3.5
+ANOMALY_MIN_HISTORY = 8        # expenses a category needs before its outliers are flagged
+DUPLICATE_WINDOW_DAYS = 3      # same account, category, amount and description this close is a duplicate
+ANOMALY_DASHBOARD_DAYS = 30
+
+def _merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Combine two (count, mean, M2) summaries; the parallel form of Welford's update"""
+    count = count_a + count_b
+    safe_count = np.where(count > 0, count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / safe_count
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / safe_count
+    return count, mean, m2
+
+def _detect_anomalies(cursor, after_id):
+    """Score expenses with id > after_id and record outlier and duplicate flags.
+
+    anomaly_stats keeps Welford's (count, mean, M2) per category. Each new row is
+    compared with the statistics of everything before it: the stored state merged
+    with the earlier rows of the same batch. A single save is therefore an O(1)
+    update, and a backfill of the whole ledger is one vectorized pass that raises
+    the same outlier flags as saving the rows one by one. Duplicates are looked up
+    in anomaly_recent_charges, which only remembers the last few days; within one
+    batch every earlier row counts, so a backfill also catches backdated repeats.
+    """
+    cursor.execute('''
+    SELECT id, date, account_id, category_id, amount, LOWER(TRIM(COALESCE(description, ''))),
+           recurrence_key IS NOT NULL
+    FROM transactions
+    WHERE id > ? AND type = 'expense'
+    ORDER BY id
+    ''', (after_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    new = pd.DataFrame(rows, columns=["id", "date", "account_id", "category_id", "amount", "description", "from_rule"])
+    _flag_outliers(cursor, new[new["category_id"].notna()])
+    # Rule occurrences repeat by design
+    _flag_duplicates(cursor, new[new["from_rule"] == 0])
+
+def _flag_outliers(cursor, new):
+    if new.empty:
+        return
+    categories = new["category_id"].to_numpy(dtype=np.int64)
+    amounts = new["amount"].to_numpy(dtype=float)
+
+    cursor.execute("SELECT category_id, count, mean, m2 FROM anomaly_stats")
+    stored = pd.DataFrame(cursor.fetchall(), columns=["category_id", "count", "mean", "m2"]).set_index("category_id")
+    stored = stored.reindex(pd.unique(categories)).fillna(0.0)
+    n0, mean0, m2_0 = (stored[column].reindex(categories).to_numpy(dtype=float) for column in ("count", "mean", "m2"))
+
+    by_category = pd.Series(amounts).groupby(categories)
+    # Sums run relative to a per-category shift so the sums of squares stay well conditioned
+    shift = np.where(n0 > 0, mean0, by_category.transform("first").to_numpy())
+    x = amounts - shift
+    earlier = by_category.cumcount().to_numpy()
+    earlier_sum = pd.Series(x).groupby(categories).cumsum().to_numpy() - x
+    earlier_squares = pd.Series(x * x).groupby(categories).cumsum().to_numpy() - x * x
+    earlier_mean = earlier_sum / np.maximum(earlier, 1)
+    earlier_m2 = earlier_squares - earlier * earlier_mean ** 2
+
+    count, mean, m2 = _merge_moments(n0, mean0 - shift, m2_0, earlier, earlier_mean, earlier_m2)
+    std = np.sqrt(np.maximum(m2, 0) / np.maximum(count - 1, 1))
+    z = np.divide(x - mean, std, out=np.zeros_like(x), where=std > 0)
+    outliers = (count >= ANOMALY_MIN_HISTORY) & (z > ANOMALY_Z_THRESHOLD)
+    cursor.executemany('''
+    INSERT OR IGNORE INTO anomalies (transaction_id, kind, score) VALUES (?, 'outlier', ?)
+    ''', zip(new["id"].to_numpy()[outliers].tolist(), np.round(z[outliers], 2).tolist()))
+
+    # Fold the whole batch into the stored state: merge in each category's last row
+    last = ~pd.Series(categories).duplicated(keep="last").to_numpy()
+    count, mean, m2 = _merge_moments(count[last], mean[last], m2[last], 1, x[last], 0.0)
+    cursor.executemany('''
+    INSERT INTO anomaly_stats (category_id, count, mean, m2) VALUES (?, ?, ?, ?)
+    ON CONFLICT (category_id) DO UPDATE SET count = excluded.count, mean = excluded.mean, m2 = excluded.m2
+    ''', zip(categories[last].tolist(), count.astype(np.int64).tolist(), (mean + shift[last]).tolist(), m2.tolist()))
+
+def _flag_duplicates(cursor, new):
+    """Flag charges whose fingerprint was already seen within DUPLICATE_WINDOW_DAYS"""
+    if new.empty:
+        return
+    fingerprints = pd.util.hash_pandas_object(pd.DataFrame({
+        "account_id": new["account_id"].astype(np.int64),
+        "category_id": new["category_id"].fillna(-1).astype(np.int64),
+        "cents": np.round(new["amount"].to_numpy(dtype=float) * 100).astype(np.int64),
+        "description": new["description"].astype(str),
+    }), index=False).to_numpy().view(np.int64)
+    days = new["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    ids = new["id"].to_numpy(dtype=np.int64)
+
+    # The recent set is a primary-key lookup per fingerprint; big batches read it whole
+    unique = pd.unique(fingerprints)
+    if len(unique) <= 500:
+        cursor.execute(f'''
+        SELECT fingerprint, transaction_id, date FROM anomaly_recent_charges
+        WHERE fingerprint IN ({",".join("?" * len(unique))})
+        ''', unique.tolist())
+    else:
+        cursor.execute("SELECT fingerprint, transaction_id, date FROM anomaly_recent_charges")
+    recent = pd.DataFrame(cursor.fetchall(), columns=["fingerprint", "transaction_id", "date"]).set_index("fingerprint")
+
+    # Within the batch, each charge is compared with the previous one of the same fingerprint
+    order = np.lexsort((ids, days, fingerprints))
+    fingerprints, days, ids = fingerprints[order], days[order], ids[order]
+    repeat = np.r_[False, fingerprints[1:] == fingerprints[:-1]]
+    previous_days = np.r_[0, days[:-1]]
+    previous_ids = np.r_[0, ids[:-1]]
+    has_previous = repeat.copy()
+
+    first = np.flatnonzero(~repeat)
+    seen = recent.reindex(fingerprints[first])
+    known = seen["transaction_id"].notna().to_numpy()
+    previous_ids[first[known]] = seen["transaction_id"].to_numpy()[known].astype(np.int64)
+    previous_days[first[known]] = seen["date"].to_numpy()[known].astype("datetime64[D]").astype(np.int64)
+    has_previous[first[known]] = True
+
+    gaps = np.abs(days - previous_days)
+    duplicates = has_previous & (gaps <= DUPLICATE_WINDOW_DAYS)
+    cursor.executemany('''
+    INSERT OR IGNORE INTO anomalies (transaction_id, kind, score, related_transaction_id)
+    VALUES (?, 'duplicate', ?, ?)
+    ''', zip(ids[duplicates].tolist(), gaps[duplicates].tolist(), previous_ids[duplicates].tolist()))
+
+    # Remember the latest charge per fingerprint, then forget charges that fell out of the window
+    last = np.r_[fingerprints[1:] != fingerprints[:-1], True]
+    cutoff = days.max() - DUPLICATE_WINDOW_DAYS
+    keep = last & (days >= cutoff)
+    cursor.executemany('''
+    INSERT INTO anomaly_recent_charges (fingerprint, transaction_id, date) VALUES (?, ?, ?)
+    ON CONFLICT (fingerprint) DO UPDATE SET transaction_id = excluded.transaction_id, date = excluded.date
+    WHERE excluded.date >= anomaly_recent_charges.date
+    ''', zip(fingerprints[keep].tolist(), ids[keep].tolist(), days[keep].astype("datetime64[D]").astype(str).tolist()))
+    cursor.execute('''
+    DELETE FROM anomaly_recent_charges
+    WHERE date < date((SELECT MAX(date) FROM anomaly_recent_charges), ?)
+    ''', (f"-{DUPLICATE_WINDOW_DAYS} days",))
+
+def backfill_anomalies(cursor):
+    """Recompute all anomaly state and flags from the ledger in one vectorized pass"""
+    cursor.execute("DELETE FROM anomaly_stats")
+    cursor.execute("DELETE FROM anomaly_recent_charges")
+    cursor.execute("DELETE FROM anomalies")
+    _detect_anomalies(cursor, 0)
+
+def rebuild_anomalies():
+    conn = get_db_connection()
+    backfill_anomalies(conn.cursor())
+    conn.commit()
+    conn.close()
+
+def get_anomalies(since=None, limit=10) -> List[Dict]:
+    """Open (not dismissed) flags on transactions dated on or after since, newest first"""
+    conn = get_db_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT an.transaction_id, an.kind, an.score, an.related_transaction_id,
+           t.date, t.amount, t.description, c.name AS category_name, c.icon AS category_icon,
+           a.name AS account_name, a.currency AS currency, s.mean AS category_mean
+    FROM anomalies an
+    JOIN transactions t ON t.id = an.transaction_id
+    JOIN accounts a ON a.id = t.account_id
+    LEFT JOIN categories c ON c.id = t.category_id
+    LEFT JOIN anomaly_stats s ON s.category_id = t.category_id
+    WHERE an.dismissed = 0 AND t.date >= ?
+    ORDER BY t.date DESC, an.transaction_id DESC
+    LIMIT ?
+    ''', (since or "0000-00-00", limit))
+    anomalies = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return anomalies
+
+def dismiss_anomaly(transaction_id, kind):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE anomalies SET dismissed = 1 WHERE transaction_id = ? AND kind = ?", (transaction_id, kind))
+    conn.commit()
+    conn.close()
+
+def show_anomalies():
+    """Unusual spending flagged when the transactions were saved"""
+    since = (datetime.date.today() - datetime.timedelta(days=ANOMALY_DASHBOARD_DAYS)).strftime("%Y-%m-%d")
+    anomalies = get_anomalies(since=since)
+    if not anomalies:
+        return
+    
+    st.markdown("#### Unusual Spending")
+    for anomaly in anomalies:
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            what = (f"{anomaly['category_icon'] or ''} {anomaly['category_name'] or 'Uncategorized'} · "
+                    f"{anomaly['currency']} {anomaly['amount']:.2f} on {anomaly['date']} ({anomaly['account_name']})")
+            if anomaly["kind"] == "outlier":
+                st.warning(f"{what} is {anomaly['score']:.1f}σ above the usual "
+                           f"{anomaly['currency']} {anomaly['category_mean'] or 0:.2f} for this category.")
+            else:
+                st.warning(f"{what} looks like a duplicate of transaction #{anomaly['related_transaction_id']} "
+                           f"({int(anomaly['score'])} day(s) apart).")
+        with col2:
+            if st.button("Dismiss", key=f"dismiss_{anomaly['kind']}_{anomaly['transaction_id']}"):
+                dismiss_anomaly(anomaly["transaction_id"], anomaly["kind"])
+                st.rerun()
+
+def show_budget_progress(statuses: List[BudgetStatus]):
+    """Render a progress bar per budget"""
+    for status in statuses:
+        utilization = status.utilization
+        label = (f"{status.category_icon} {status.category_name} ({status.budget.period}): "
+                 f"{status.spent:.2f} / {status.budget.amount:.2f}")
+        if utilization >= 1:
+            label += " ⚠️ over budget"
+        st.progress(min(utilization, 1.0), text=label)
+
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "INR"]
+
+def get_preference(key, default=None):
+    """Read a saved preference"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM preferences WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else default
+
+def set_preferences(values: Dict[str, str]):
+    """Save several preferences at once"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.executemany('''
+    INSERT INTO preferences (key, value) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    ''', list(values.items()))
+    conn.commit()
+    conn.close()
+
+@dataclass(frozen=True)
+class FxTable:
+    """Exchange rates as a dense date x currency matrix, gaps filled with the last known rate"""
+    dates: np.ndarray       # sorted datetime64[D]
+    currencies: pd.Index
+    rates: np.ndarray       # units of each currency per 1 USD
+
+# Process-wide as-of lookup cache, one table per database file; dropped whenever rates are loaded
+_fx_tables: Dict[str, Optional[FxTable]] = {}
+
+def get_fx_table() -> Optional[FxTable]:
+    """Return the cached rate matrix, building it from fx_rates on first use"""
+    db_path = get_db_path()
+    if db_path not in _fx_tables:
+        conn = get_db_connection()
+        rates = pd.read_sql_query("SELECT date, currency, rate FROM fx_rates", conn)
+        conn.close()
+
+        if rates.empty:
+            _fx_tables[db_path] = None
+        else:
+            wide = rates.pivot_table(index="date", columns="currency", values="rate").sort_index()
+            # As-of semantics: carry each rate forward, and back to dates before its first quote
+            wide = wide.ffill().bfill()
+            if "USD" not in wide.columns:
+                wide["USD"] = 1.0
+            _fx_tables[db_path] = FxTable(
+                dates=wide.index.to_numpy(dtype="datetime64[D]"),
+                currencies=pd.Index(wide.columns),
+                rates=wide.to_numpy(dtype=float)
+            )
+    return _fx_tables[db_path]
+
+def load_fx_rates(file) -> int:
+    """Load daily rates from an offline file and return the number of rows stored.
+
+    CSV files need date, currency and rate columns (rate = units per 1 USD), with an
+    optional base column for quotes against another currency. JSON files use the
+    common {"base": "EUR", "rates": {"2024-01-31": {"USD": 1.08, ...}}} layout.
+    """
+    if file.name.endswith(".json"):
+        import json
+        data = json.load(file)
+        rates = pd.DataFrame([
+            {"date": date, "currency": currency, "rate": rate, "base": data.get("base", "USD")}
+            for date, quotes in data["rates"].items()
+            for currency, rate in quotes.items()
+        ])
     else:
-        cursor.execute("SELECT id, name, type, icon, color FROM categories ORDER BY type, name")
-    
-    categories = [Category(id=row[0], name=row[1], type=row[2], 
-                           icon=row[3], color=row[4]) 
-                  for row in cursor.fetchall()]
-    conn.close()
-    return categories
+        rates = pd.read_csv(file)
+    rates.columns = [column.strip().lower() for column in rates.columns]
 
-def save_transaction(transaction: Transaction) -> int:
-    """Save a transaction to the database and return its ID"""
+    missing_columns = {"date", "currency", "rate"} - set(rates.columns)
+    if missing_columns:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing_columns))}")
+
+    rates["date"] = pd.to_datetime(rates["date"]).dt.strftime("%Y-%m-%d")
+    rates["currency"] = rates["currency"].str.upper().str.strip()
+    rates["rate"] = rates["rate"].astype(float)
+
+    if "base" in rates.columns:
+        # Rebase quotes to USD using the base currency's own USD quote on the same day
+        rates["base"] = rates["base"].str.upper().str.strip()
+        usd_per_base = rates[rates["currency"] == "USD"].set_index(["date", "base"])["rate"]
+        base_rate = pd.Series(1.0, index=rates.index)
+        not_usd = rates["base"] != "USD"
+        base_rate[not_usd] = usd_per_base.reindex(
+            pd.MultiIndex.from_frame(rates.loc[not_usd, ["date", "base"]])).to_numpy()
+        rates["rate"] = rates["rate"] / base_rate
+        base_rows = rates[not_usd].drop_duplicates(["date", "base"])
+        rates = pd.concat([rates, pd.DataFrame({
+            "date": base_rows["date"], "currency": base_rows["base"], "rate": 1.0 / base_rate[base_rows.index]
+        })], ignore_index=True)
+        rates = rates.dropna(subset=["rate"])
+
+    rows = list(rates[["currency", "date", "rate"]].itertuples(index=False, name=None))
     conn = get_db_connection()
     cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO transactions 
-    (type, amount, date, category_id, account_id, to_account_id, description)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (transaction.type, transaction.amount, transaction.date,
-          transaction.category_id, transaction.account_id,
-          transaction.to_account_id, transaction.description))
-    
-    transaction_id = cursor.lastrowid
+    cursor.executemany('''
+    INSERT INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)
+    ON CONFLICT (currency, date) DO UPDATE SET rate = excluded.rate
+    ''', rows)
     conn.commit()
     conn.close()
-    return transaction_id
 
-def get_transactions(start_date=None, end_date=None, 
-                     account_id=None, category_id=None, 
-                     transaction_type=None, limit=None) -> List[Dict]:
-    
-     # Add limit to the query
-    if limit:
-        query += " LIMIT ?"
-        params.append(limit)
+    _fx_tables.pop(get_db_path(), None)
+    return len(rows)
+
+def convert_amounts(amounts, currencies, dates, to_currency):
+    """Convert amounts to to_currency at each row's as-of rate in one vectorized gather.
+
+    Returns the converted array and the set of currencies that had no rate; those
+    rows are passed through unconverted.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    currencies = np.asarray(currencies, dtype=object)
+    converted = amounts.copy()
+
+    foreign = currencies != to_currency
+    if not foreign.any():
+        return converted, set()
+
+    table = get_fx_table()
+    if table is None or to_currency not in table.currencies:
+        return converted, set(currencies[foreign])
 
+    day_index = np.searchsorted(table.dates, np.asarray(dates, dtype="datetime64[D]")[foreign], side="right") - 1
+    day_index = np.clip(day_index, 0, len(table.dates) - 1)
+    source_column = table.currencies.get_indexer(currencies[foreign])
+    target_column = table.currencies.get_loc(to_currency)
 
-    """Fetch transactions with filters"""
+    known = source_column >= 0
+    factors = np.ones(len(source_column))
+    factors[known] = table.rates[day_index[known], target_column] / table.rates[day_index[known], source_column[known]]
+    converted[foreign] = amounts[foreign] * factors
+    return converted, set(currencies[foreign][~known])
+
+def get_converted_totals(start_date, end_date, to_currency):
+    """Income and expense totals for a date range in to_currency.
+
+    Amounts are pre-aggregated per type, currency and day in SQL, so conversion
+    touches one row per distinct day rather than one per transaction.
+    """
     conn = get_db_connection()
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    cursor = conn.cursor()
-    
-    query = '''
-    SELECT t.*, c.name as category_name, c.icon as category_icon, 
-           a.name as account_name, a2.name as to_account_name
+    daily = pd.read_sql_query('''
+    SELECT t.type, a.currency, t.date, SUM(t.amount) AS amount
     FROM transactions t
-    LEFT JOIN categories c ON t.category_id = c.id
     JOIN accounts a ON t.account_id = a.id
-    LEFT JOIN accounts a2 ON t.to_account_id = a2.id
-    WHERE 1=1
-    '''
-    params = []
-    
-    if start_date:
-        query += " AND t.date >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND t.date <= ?"
-        params.append(end_date)
-    if account_id:
-        query += " AND (t.account_id = ? OR t.to_account_id = ?)"
-        params.extend([account_id, account_id])
-    if category_id:
-        query += " AND t.category_id = ?"
-        params.append(category_id)
-    if transaction_type:
-        query += " AND t.type = ?"
-        params.append(transaction_type)
-    
-    query += " ORDER BY t.date DESC, t.created_at DESC"
-    
-    cursor.execute(query, params)
-    transactions = [dict(row) for row in cursor.fetchall()]
+    WHERE t.date >= ? AND t.date <= ? AND t.type IN ('income', 'expense')
+    GROUP BY t.type, a.currency, t.date
+    ''', conn, params=(start_date, end_date))
     conn.close()
-    return transactions
 
-def get_account_balance(account_id):
-    """Calculate current balance for an account"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get initial balance
-    cursor.execute("SELECT initial_balance FROM accounts WHERE id = ?", (account_id,))
-    initial_balance = cursor.fetchone()[0]
-    
-    # Get sum of incoming transactions (income + transfers in)
-    cursor.execute("""
-    SELECT COALESCE(SUM(amount), 0) FROM transactions 
-    WHERE (type = 'income' AND account_id = ?) 
-       OR (type = 'transfer' AND to_account_id = ?)
-    """, (account_id, account_id))
-    income = cursor.fetchone()[0]
-    
-    # Get sum of outgoing transactions (expenses + transfers out)
-    cursor.execute("""
-    SELECT COALESCE(SUM(amount), 0) FROM transactions 
-    WHERE (type = 'expense' AND account_id = ?) 
-       OR (type = 'transfer' AND account_id = ?)
-    """, (account_id, account_id))
-    expenses = cursor.fetchone()[0]
-    
-    conn.close()
-    return initial_balance + income - expenses
+    converted, missing = convert_amounts(daily["amount"], daily["currency"], daily["date"], to_currency)
+    totals = pd.Series(converted, index=daily["type"]).groupby(level=0).sum()
+    return {"income": float(totals.get("income", 0.0)), "expense": float(totals.get("expense", 0.0))}, missing
+
+def show_missing_rates_warning(missing):
+    if missing:
+        st.warning(f"No exchange rates loaded for {', '.join(sorted(missing))}; "
+                   f"those amounts are counted unconverted. Load rates under Settings → Preferences.")
 
 def show_transactions_page():
     """Show transaction entry forms"""
     transaction_type = st.radio(
         "Transaction Type", 
-        ["Expense", "Income", "Transfer"], 
+        ["Expense", "Income", "Transfer", "Recurring", "Batch Entry"], 
         horizontal=True,
         key="transaction_type_selector"
     )
@@ -290,13 +1437,128 @@ def show_transactions_page():
         show_expense_form()
     elif transaction_type == "Income":
         show_income_form()
-    else:  # Transfer
+    elif transaction_type == "Transfer":
         show_transfer_form()
+    elif transaction_type == "Recurring":
+        show_recurring_rules()
+    else:  # Batch Entry
+        show_batch_entry()
     
     # Show recent transactions below the form
     st.subheader("Recent Transactions")
     show_recent_transactions()
 
+BATCH_GRID_COLUMNS = ["Date", "Type", "Amount", "Category", "Account", "To Account", "Note"]
+BATCH_GRID_ROWS = 10
+
+def validate_staged_transactions(staged: pd.DataFrame) -> Tuple[List[Transaction], pd.DataFrame]:
+    """Check every staged row at once against the cached account and category maps.
+
+    Rows without an amount are treated as blank and skipped. Returns the
+    transactions to save and a frame of (row, problem) for everything invalid.
+    """
+    reference = get_reference_data()
+    staged = staged[staged["Amount"].notna()].copy()
+    staged["row"] = staged.index + 1
+    staged["type"] = staged["Type"].fillna("expense").str.lower()
+    staged["date"] = pd.to_datetime(staged["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    staged["amount"] = pd.to_numeric(staged["Amount"], errors="coerce")
+    
+    # A lookup rather than a merge: category names are not unique per type, and a merge would duplicate rows
+    staged_rows = len(staged)
+    staged["category_id"] = [reference.category_id_by_name.get((tx_type, category))
+                             for tx_type, category in zip(staged["type"], staged["Category"])]
+    assert len(staged) == staged_rows
+    staged["account_id"] = staged["Account"].map(dict(reference.account_id_by_name))
+    staged["to_account_id"] = staged["To Account"].map(dict(reference.account_id_by_name))
+    
+    is_transfer = staged["type"] == "transfer"
+    checks = [
+        (~staged["type"].isin(["expense", "income", "transfer"]), "unknown type"),
+        (staged["date"].isna(), "missing or invalid date"),
+        (~(staged["amount"] > 0), "amount must be positive"),
+        (staged["account_id"].isna(), "unknown account"),
+        (~is_transfer & staged["category_id"].isna(), "category does not match the type"),
+        (is_transfer & staged["to_account_id"].isna(), "transfer needs a target account"),
+        (is_transfer & (staged["to_account_id"] == staged["account_id"]), "transfer to the same account"),
+    ]
+    errors = pd.concat([pd.DataFrame({"Row": staged.loc[mask, "row"], "Problem": problem})
+                        for mask, problem in checks if mask.any()] or [pd.DataFrame(columns=["Row", "Problem"])])
+    
+    valid = staged[~staged["row"].isin(errors["Row"])]
+    transactions = [
+        Transaction(id=None, type=tx_type, amount=float(amount), date=date,
+                    category_id=None if tx_type == "transfer" else int(category_id),
+                    account_id=int(account_id),
+                    to_account_id=int(to_account_id) if tx_type == "transfer" else None,
+                    description=note if isinstance(note, str) and note else None)
+        for tx_type, amount, date, category_id, account_id, to_account_id, note in zip(
+            valid["type"], valid["amount"], valid["date"], valid["category_id"],
+            valid["account_id"], valid["to_account_id"], valid["Note"])
+    ]
+    return transactions, errors.sort_values("Row").reset_index(drop=True)
+
+def show_batch_entry():
+    """Spreadsheet-style grid for entering or pasting many transactions in one go"""
+    reference = get_reference_data()
+    if not reference.accounts:
+        st.error("No accounts found. Please add an account first.")
+        return
+    
+    st.subheader("Batch Entry")
+    st.caption("Type or paste rows (for example from a spreadsheet). Nothing is saved until you commit, "
+               "and then all rows are saved together.")
+    
+    account_names = [account.name for account in reference.accounts]
+    category_names = sorted({category.name for category in reference.categories})
+    blank = pd.DataFrame({
+        "Date": [st.session_state.transaction_date] * BATCH_GRID_ROWS,
+        "Type": ["Expense"] * BATCH_GRID_ROWS,
+        "Amount": [None] * BATCH_GRID_ROWS,
+        "Category": [None] * BATCH_GRID_ROWS,
+        "Account": [account_names[0]] * BATCH_GRID_ROWS,
+        "To Account": [None] * BATCH_GRID_ROWS,
+        "Note": [""] * BATCH_GRID_ROWS,
+    }).astype({"Amount": float, "Category": object, "To Account": object})
+    
+    # A new editor key after each commit starts a fresh grid
+    grid_key = f"batch_grid_{st.session_state.get('batch_grid_version', 0)}"
+    with st.form("batch_entry_form"):
+        staged = st.data_editor(
+            blank,
+            key=grid_key,
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
+                "Type": st.column_config.SelectboxColumn("Type", options=["Expense", "Income", "Transfer"]),
+                "Amount": st.column_config.NumberColumn("Amount", min_value=0.0, step=0.01, format="%.2f"),
+                "Category": st.column_config.SelectboxColumn("Category", options=category_names),
+                "Account": st.column_config.SelectboxColumn("Account", options=account_names),
+                "To Account": st.column_config.SelectboxColumn("To Account", options=account_names,
+                                                               help="Transfers only"),
+                "Note": st.column_config.TextColumn("Note"),
+            },
+        )
+        submitted = st.form_submit_button("Commit All Rows")
+    
+    if not submitted:
+        return
+    
+    transactions, errors = validate_staged_transactions(staged)
+    if not errors.empty:
+        st.error(f"{errors['Row'].nunique()} row(s) need fixing; nothing was saved.")
+        st.dataframe(errors, hide_index=True, use_container_width=True)
+        return
+    if not transactions:
+        st.info("The grid is empty.")
+        return
+    
+    save_transactions(transactions)
+    st.session_state.batch_grid_version = st.session_state.get("batch_grid_version", 0) + 1
+    st.success(f"Saved {len(transactions)} transactions.")
+
 # Fix for the missing submit button and "None is not in list" error
 
 def show_expense_form():
@@ -349,6 +1611,7 @@ def show_expense_form():
             return
         
         description = st.text_area("Note", height=100)
+        receipt = st.file_uploader("Receipt (optional)", type=RECEIPT_TYPES)
         
         # Add submit button
         submitted = st.form_submit_button("Save")
@@ -364,7 +1627,9 @@ def show_expense_form():
                 to_account_id=None,
                 description=description
             )
-            save_transaction(transaction)
+            transaction_id = save_transaction(transaction)
+            if receipt is not None:
+                attach_receipt(transaction_id, receipt.name, receipt.getvalue(), receipt.type)
             st.success("Expense saved successfully!")
             st.session_state.transaction_date = date  # Remember the date for next entry
 
@@ -478,6 +1743,126 @@ def show_transfer_form():
             st.success("Transfer saved successfully!")
             st.session_state.transaction_date = date  # Remember the date for next entry
 
+def show_recurring_rules():
+    """Manage recurring rules and preview their upcoming occurrences"""
+    show_recurring_rule_form()
+    
+    rules = get_recurring_rules()
+    if not rules:
+        st.info("No recurring rules yet. Salary, rent and subscriptions are good candidates.")
+        return
+    
+    reference = get_reference_data()
+    accounts = {account_id: account.name for account_id, account in reference.account_by_id.items()}
+    categories = {category_id: f"{category.icon} {category.name}"
+                  for category_id, category in reference.category_by_id.items()}
+    
+    st.markdown("#### Active Rules")
+    for rule in rules:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            every = rule.frequency if rule.interval == 1 else f"every {rule.interval} {rule.frequency}"
+            if rule.type == "transfer":
+                target = f"{accounts.get(rule.account_id, '?')} → {accounts.get(rule.to_account_id, '?')}"
+            else:
+                target = f"{categories.get(rule.category_id, 'Uncategorized')} - {accounts.get(rule.account_id, '?')}"
+            ends = f", until {rule.end_date}" if rule.end_date else ""
+            st.markdown(f"**{rule.type.title()} {rule.amount:.2f}** {target} ({every}{ends})")
+            if rule.description:
+                st.text(rule.description)
+        with col2:
+            if st.button("Delete", key=f"delete_rule_{rule.id}"):
+                delete_recurring_rule(rule.id)
+                st.success("Recurring rule deleted.")
+                st.rerun()
+    
+    # Virtual projection: nothing here is written to the ledger
+    st.markdown("#### Upcoming (next 30 days)")
+    today = datetime.date.today()
+    upcoming = project_recurring_transactions(today, today + datetime.timedelta(days=30))
+    if upcoming:
+        st.dataframe(pd.DataFrame([{
+            "Date": tx.date,
+            "Type": tx.type,
+            "Amount": tx.amount,
+            "Account": accounts.get(tx.account_id, "?"),
+            "Category": categories.get(tx.category_id, ""),
+            "Note": tx.description
+        } for tx in upcoming]), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nothing scheduled in the next 30 days.")
+
+def show_recurring_rule_form():
+    """Form for adding a recurring rule"""
+    rule_type = st.radio("Rule Type", ["Expense", "Income", "Transfer"], horizontal=True,
+                         key="recurring_rule_type")
+    
+    with st.form("recurring_rule_form"):
+        st.subheader("Add Recurring Rule")
+        
+        accounts = get_accounts()
+        if not accounts:
+            st.error("No accounts found. Please add an account first.")
+            st.form_submit_button("Save")
+            return
+        account_options = [account.name for account in accounts]
+        
+        amount = st.number_input("Amount", min_value=0.01, step=1.0)
+        
+        selected_category_id = None
+        selected_to_id = None
+        if rule_type == "Transfer":
+            from_account = st.selectbox("From Account", account_options)
+            to_account = st.selectbox("To Account", account_options, index=min(1, len(account_options) - 1))
+            selected_account_id = accounts[account_options.index(from_account)].id
+            selected_to_id = accounts[account_options.index(to_account)].id
+        else:
+            categories = get_categories(type_filter=rule_type.lower())
+            category_options = [f"{cat.icon} {cat.name}" for cat in categories]
+            category_selected = st.selectbox("Category", category_options)
+            if category_selected in category_options:
+                selected_category_id = categories[category_options.index(category_selected)].id
+            account_selected = st.selectbox("Account", account_options)
+            selected_account_id = accounts[account_options.index(account_selected)].id
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            frequency = st.selectbox("Repeats", RECURRING_FREQUENCIES, index=2)
+            start_date = st.date_input("Starts", value=datetime.date.today())
+        with col2:
+            interval = st.number_input("Every", min_value=1, value=1, step=1)
+            has_end = st.checkbox("Ends")
+            end_date = st.date_input("Ends On", value=datetime.date.today() + datetime.timedelta(days=365))
+        
+        description = st.text_input("Note")
+        
+        submitted = st.form_submit_button("Save")
+        
+        if submitted:
+            if rule_type == "Transfer" and selected_account_id == selected_to_id:
+                st.error("From and To accounts must be different.")
+                return
+            if has_end and end_date < start_date:
+                st.error("End date must be after start date")
+                return
+            add_recurring_rule(RecurringRule(
+                id=None,
+                type=rule_type.lower(),
+                amount=amount,
+                category_id=selected_category_id,
+                account_id=selected_account_id,
+                to_account_id=selected_to_id,
+                description=description,
+                frequency=frequency,
+                interval=int(interval),
+                start_date=start_date.strftime("%Y-%m-%d"),
+                end_date=end_date.strftime("%Y-%m-%d") if has_end else None,
+                next_date=start_date.strftime("%Y-%m-%d")
+            ))
+            materialize_recurring_transactions()
+            st.success("Recurring rule saved!")
+            st.rerun()
+
 def show_calendar_view():
     """Show transactions in a calendar view"""
     # Month/Year selector
@@ -563,52 +1948,17 @@ def show_daily_transactions():
     else:
         st.info("No transactions for this date.")
 
-# Fix for the missing limit parameter in get_transactions
 def get_transactions(start_date=None, end_date=None, 
                      account_id=None, category_id=None, 
-                     transaction_type=None, limit=None) -> List[Dict]:
-    """Fetch transactions with filters"""
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    cursor = conn.cursor()
-    
-    query = '''
-    SELECT t.*, c.name as category_name, c.icon as category_icon, 
-           a.name as account_name, a2.name as to_account_name
-    FROM transactions t
-    LEFT JOIN categories c ON t.category_id = c.id
-    JOIN accounts a ON t.account_id = a.id
-    LEFT JOIN accounts a2 ON t.to_account_id = a2.id
-    WHERE 1=1
-    '''
-    params = []
-    
-    if start_date:
-        query += " AND t.date >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND t.date <= ?"
-        params.append(end_date)
-    if account_id:
-        query += " AND (t.account_id = ? OR t.to_account_id = ?)"
-        params.extend([account_id, account_id])
-    if category_id:
-        query += " AND t.category_id = ?"
-        params.append(category_id)
-    if transaction_type:
-        query += " AND t.type = ?"
-        params.append(transaction_type)
-    
-    query += " ORDER BY t.date DESC, t.created_at DESC"
-    
-    if limit:
-        query += " LIMIT ?"
-        params.append(limit)
-    
-    cursor.execute(query, params)
-    transactions = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return transactions
+                     transaction_type=None, limit=None, columns=False):
+    """Fetch transactions with filters, newest first.
+
+    Rows come back as TransactionRecord objects; columns=True returns one numpy
+    array per column instead, for callers that hand the result to pandas.
+    """
+    return query_transactions(get_db_path(), start_date=start_date, end_date=end_date,
+                              account_id=account_id, category_id=category_id,
+                              transaction_type=transaction_type, limit=limit, columns=columns)
 
 def show_dashboard():
     """Show the main dashboard with overview"""
@@ -635,22 +1985,37 @@ def show_dashboard():
     end_of_month = (datetime.date(today.year, today.month + 1, 1) - datetime.timedelta(days=1)).strftime("%Y-%m-%d") \
         if today.month < 12 else datetime.date(today.year, 12, 31).strftime("%Y-%m-%d")
     
-    # Income for the month
-    income_transactions = get_transactions(start_date=start_of_month, end_date=end_of_month, transaction_type="income")
-    total_income = sum(tx['amount'] for tx in income_transactions)
-    
-    # Expenses for the month
-    expense_transactions = get_transactions(start_date=start_of_month, end_date=end_of_month, transaction_type="expense")
-    total_expenses = sum(tx['amount'] for tx in expense_transactions)
+    # Income and expenses for the month, converted to the preferred currency
+    currency = get_preference("default_currency", "USD")
+    totals, missing_rates = get_converted_totals(start_of_month, end_of_month, currency)
+    total_income = totals["income"]
+    total_expenses = totals["expense"]
     
     # Show summary
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Income", f"{total_income:.2f}")
+        st.metric("Income", f"{currency} {total_income:.2f}")
     with col2:
-        st.metric("Expenses", f"{total_expenses:.2f}")
+        st.metric("Expenses", f"{currency} {total_expenses:.2f}")
     with col3:
-        st.metric("Balance", f"{(total_income - total_expenses):.2f}")
+        st.metric("Balance", f"{currency} {(total_income - total_expenses):.2f}")
+    show_missing_rates_warning(missing_rates)
+    
+    # Budgets
+    budget_statuses = get_budget_status()
+    if budget_statuses:
+        st.markdown("#### Budgets")
+        show_budget_progress(budget_statuses)
+        
+        events = get_budget_events(limit=5)
+        if events:
+            with st.expander("Recent budget alerts"):
+                for event in events:
+                    st.markdown(f"{event['category_icon']} **{event['category_name']}** passed "
+                                f"{event['threshold']}% of its {event['period']} budget "
+                                f"({event['spent']:.2f} / {event['amount']:.2f}) for the period starting {event['period_start']}")
+    
+    show_anomalies()
     
     # Recent transactions
     st.markdown("#### Recent Transactions")
@@ -717,27 +2082,33 @@ def show_statistics_page():
     income_data = get_transactions(
         start_date=start_date.strftime("%Y-%m-%d"),
         end_date=end_date.strftime("%Y-%m-%d"),
-        transaction_type="income"
+        transaction_type="income",
+        columns=True
     )
     
     expense_data = get_transactions(
         start_date=start_date.strftime("%Y-%m-%d"),
         end_date=end_date.strftime("%Y-%m-%d"),
-        transaction_type="expense"
+        transaction_type="expense",
+        columns=True
     )
     
-    # Overview metrics
-    total_income = sum(tx['amount'] for tx in income_data)
-    total_expenses = sum(tx['amount'] for tx in expense_data)
+    # Overview metrics, converted to the preferred currency
+    currency = get_preference("default_currency", "USD")
+    totals, missing_rates = get_converted_totals(start_date.strftime("%Y-%m-%d"),
+                                                 end_date.strftime("%Y-%m-%d"), currency)
+    total_income = totals["income"]
+    total_expenses = totals["expense"]
     balance = total_income - total_expenses
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Income", f"{total_income:.2f}")
+        st.metric("Total Income", f"{currency} {total_income:.2f}")
     with col2:
-        st.metric("Total Expenses", f"{total_expenses:.2f}")
+        st.metric("Total Expenses", f"{currency} {total_expenses:.2f}")
     with col3:
-        st.metric("Balance", f"{balance:.2f}")
+        st.metric("Balance", f"{currency} {balance:.2f}")
+    show_missing_rates_warning(missing_rates)
     
     # Charts
     tab1, tab2, tab3 = st.tabs(["Income vs. Expenses", "Expense Breakdown", "Trends"])
@@ -746,7 +2117,7 @@ def show_statistics_page():
         show_income_vs_expenses_chart(income_data, expense_data)
     
     with tab2:
-        show_expense_breakdown_chart(expense_data)
+        show_expense_breakdown_chart(expense_data, currency)
     
     with tab3:
         show_trends_chart(start_date, end_date)
@@ -756,25 +2127,22 @@ def show_income_vs_expenses_chart(income_data, expense_data):
     # Implementation will go here
     pass
 
-def show_expense_breakdown_chart(expense_data):
+def show_expense_breakdown_chart(expense_data, currency):
     """Show expense breakdown by category"""
-    if not expense_data:
+    if not len(expense_data["id"]):
         st.info("No expense data available for the selected period.")
         return
     
-    # Group by category
-    category_totals = {}
-    for tx in expense_data:
-        cat_name = tx['category_name'] if tx['category_name'] else 'Uncategorized'
-        if cat_name in category_totals:
-            category_totals[cat_name] += tx['amount']
-        else:
-            category_totals[cat_name] = tx['amount']
+    # Convert to the preferred currency, then group by category
+    expenses = pd.DataFrame(expense_data)
+    expenses['converted'], _ = convert_amounts(expenses['amount'], expenses['currency'],
+                                               expenses['date'], currency)
+    category_totals = expenses.groupby(expenses['category_name'].fillna('Uncategorized'))['converted'].sum()
     
     # Create dataframe for chart
     df = pd.DataFrame({
-        'Category': list(category_totals.keys()),
-        'Amount': list(category_totals.values())
+        'Category': category_totals.index,
+        'Amount': category_totals.to_numpy()
     })
     
     fig = px.pie(df, values='Amount', names='Category', 
@@ -788,18 +2156,391 @@ def show_trends_chart(start_date, end_date):
     # Implementation will go here
     pass
 
+FORECAST_DAYS = 365
+FORECAST_PATHS = 2000
+PATTERN_HISTORY_DAYS = 400    # history searched for recurring patterns
+ROLLING_AVERAGE_DAYS = 90     # window of the per-category averages and of the Monte Carlo draws
+MIN_PATTERN_OCCURRENCES = 3
+# Nominal gap in days and the slack allowed per gap for each detectable cadence
+PATTERN_CADENCES = {
+    "weekly": (7, 1),
+    "biweekly": (14, 2),
+    "monthly": (30.44, 3),
+    "quarterly": (91.31, 7),
+    "yearly": (365.25, 10),
+}
+_CADENCE_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+@dataclass
+class RecurringPattern:
+    """A repeating transaction found in the history (same account, category, amount and description)"""
+    account_id: int
+    category_id: Optional[int]
+    description: str
+    amount: float               # signed: money into the account is positive
+    cadence: str
+    dates: List[datetime.date]  # past occurrences, oldest first
+
+    def next_occurrences(self, start, end) -> List[datetime.date]:
+        last = self.dates[-1]
+        occurrences = []
+        for n in range(1, 10_000):
+            if self.cadence in _CADENCE_MONTHS:
+                occurrence = _add_months(last, n * _CADENCE_MONTHS[self.cadence])
+            else:
+                occurrence = last + datetime.timedelta(days=n * PATTERN_CADENCES[self.cadence][0])
+            if occurrence > end:
+                break
+            if occurrence >= start:
+                occurrences.append(occurrence)
+        return occurrences
+
+@dataclass
+class Forecast:
+    """Projected daily end-of-day balances per account"""
+    generation: int
+    start: datetime.date
+    paths: int
+    dates: np.ndarray               # datetime64[D], one per forecast day
+    account_ids: List[int]
+    current: np.ndarray             # accounts
+    expected: np.ndarray            # accounts x days
+    low: np.ndarray                 # accounts x days, 10th percentile of the simulated paths
+    high: np.ndarray                # accounts x days, 90th percentile
+    negative_probability: np.ndarray  # accounts: share of paths that dip below zero
+    patterns: List[RecurringPattern]
+    category_averages: pd.DataFrame  # account_id, category_id, daily (signed average per day)
+
+# Process-wide forecast per database file, recomputed when the ledger generation moves on
+_forecasts: Dict[str, Forecast] = {}
+
+def _classify_cadence(dates):
+    """Name of the cadence the gaps between dates follow, or None"""
+    gaps = np.diff(np.array(dates, dtype="datetime64[D]").astype(np.int64))
+    median_gap = np.median(gaps)
+    for cadence, (nominal, slack) in PATTERN_CADENCES.items():
+        if abs(median_gap - nominal) <= slack and np.mean(np.abs(gaps - nominal) <= slack) >= 0.8:
+            return cadence
+    return None
+
+def detect_recurring_patterns(as_of) -> List[RecurringPattern]:
+    """Find repeating transactions that are still active as of a date.
+
+    Candidates are grouped in SQL by account leg, type, category, counterparty,
+    description and exact amount; only groups with enough occurrences reach Python.
+    Occurrences written by recurring rules are left out, the rules project those.
+    """
+    since = (as_of - datetime.timedelta(days=PATTERN_HISTORY_DAYS)).strftime("%Y-%m-%d")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+    WITH legs AS (
+        SELECT account_id, type, category_id, to_account_id AS counterparty_id,
+               COALESCE(description, '') AS description, date,
+               CASE WHEN type = 'income' THEN amount ELSE -amount END AS delta
+        FROM transactions
+        WHERE date > ? AND date <= ? AND recurrence_key IS NULL
+        UNION ALL
+        SELECT to_account_id, type, category_id, account_id, COALESCE(description, ''), date, amount
+        FROM transactions
+        WHERE to_account_id IS NOT NULL AND type = 'transfer' AND date > ? AND date <= ? AND recurrence_key IS NULL
+    )
+    SELECT account_id, category_id, description, delta, group_concat(date)
+    FROM legs
+    GROUP BY account_id, type, category_id, counterparty_id, description, delta
+    HAVING COUNT(DISTINCT date) >= ?
+    ''', (since, as_of.strftime("%Y-%m-%d"), since, as_of.strftime("%Y-%m-%d"), MIN_PATTERN_OCCURRENCES))
+    groups = cursor.fetchall()
+    conn.close()
+
+    patterns = []
+    for account_id, category_id, description, delta, dates in groups:
+        dates = sorted({datetime.date.fromisoformat(d) for d in dates.split(",")})
+        cadence = _classify_cadence(dates)
+        if cadence is None:
+            continue
+        nominal, slack = PATTERN_CADENCES[cadence]
+        # A pattern that missed its last due date has stopped
+        if (as_of - dates[-1]).days > nominal + slack:
+            continue
+        patterns.append(RecurringPattern(account_id, category_id, description, delta, cadence, dates))
+    return patterns
+
+def _load_daily_flows(start, end, account_index, category_index):
+    """accounts x categories x days array of signed flows between two dates (inclusive)"""
+    days = (end - start).days + 1
+    flows = np.zeros((len(account_index), len(category_index), days))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+    WITH legs AS (
+        SELECT account_id, category_id, date, CASE WHEN type = 'income' THEN amount ELSE -amount END AS delta
+        FROM transactions
+        WHERE date >= ? AND date <= ? AND recurrence_key IS NULL
+        UNION ALL
+        SELECT to_account_id, category_id, date, amount
+        FROM transactions
+        WHERE to_account_id IS NOT NULL AND type = 'transfer' AND date >= ? AND date <= ? AND recurrence_key IS NULL
+    )
+    SELECT account_id, category_id, julianday(date) - julianday(?), SUM(delta)
+    FROM legs
+    GROUP BY account_id, category_id, date
+    ''', (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"),
+          start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), start.strftime("%Y-%m-%d")))
+    rows = cursor.fetchall()
+    conn.close()
+
+    if rows:
+        account_ids, category_ids, offsets, totals = zip(*rows)
+        np.add.at(flows, (account_index.get_indexer(account_ids),
+                          category_index.get_indexer([-1 if c is None else c for c in category_ids]),
+                          np.array(offsets, dtype=np.int64)), totals)
+    return flows
+
+def _add_occurrences(array, account_index, start, occurrences):
+    """Add (account_id, date, signed amount) occurrences into an accounts x days array"""
+    if not occurrences:
+        return
+    account_ids, dates, amounts = zip(*occurrences)
+    rows = account_index.get_indexer(account_ids)
+    offsets = np.array([(d - start).days for d in dates])
+    inside = (rows >= 0) & (offsets >= 0) & (offsets < array.shape[1])
+    np.add.at(array, (rows[inside], offsets[inside]), np.array(amounts)[inside])
+
+def compute_forecast(as_of=None, paths=FORECAST_PATHS, seed=None) -> Forecast:
+    """Project every account's balance FORECAST_DAYS ahead.
+
+    The expected path is the current balance plus, per day, the detected recurring
+    patterns, the recurring rules and each category's rolling daily average of the
+    remaining (irregular) flows. The range comes from bootstrapping whole historical
+    days of irregular flows: one index draw of paths x days is shared by all
+    accounts, so transfers between accounts stay balanced within a path.
+    """
+    as_of = as_of or datetime.date.today()
+    generation = get_ledger_generation()
+    accounts = get_accounts()
+    account_index = pd.Index([account.id for account in accounts])
+    category_index = pd.Index([-1] + [category.id for category in get_categories()])
+    current = np.array([get_account_balance(account.id) for account in accounts], dtype=float)
+
+    # Recurring flows: detected patterns and explicit rules, on the forecast days
+    start = as_of + datetime.timedelta(days=1)
+    end = as_of + datetime.timedelta(days=FORECAST_DAYS)
+    patterns = detect_recurring_patterns(as_of)
+    recurring = np.zeros((len(accounts), FORECAST_DAYS))
+    _add_occurrences(recurring, account_index, start, [
+        (pattern.account_id, occurrence, pattern.amount)
+        for pattern in patterns for occurrence in pattern.next_occurrences(start, end)])
+    legs = []
+    for tx in project_recurring_transactions(start, end):
+        occurrence = datetime.date.fromisoformat(tx.date)
+        if tx.type == "transfer":
+            legs.append((tx.account_id, occurrence, -tx.amount))
+            legs.append((tx.to_account_id, occurrence, tx.amount))
+        else:
+            legs.append((tx.account_id, occurrence, tx.amount if tx.type == "income" else -tx.amount))
+    _add_occurrences(recurring, account_index, start, legs)
+
+    # Irregular flows: the recent window minus the pattern occurrences that fall inside it
+    window_start = as_of - datetime.timedelta(days=ROLLING_AVERAGE_DAYS - 1)
+    flows = _load_daily_flows(window_start, as_of, account_index, category_index)
+    for pattern in patterns:
+        row = account_index.get_loc(pattern.account_id) if pattern.account_id in account_index else None
+        if row is None:
+            continue
+        column = category_index.get_loc(-1 if pattern.category_id is None else pattern.category_id)
+        for occurrence in pattern.dates:
+            offset = (occurrence - window_start).days
+            if 0 <= offset < ROLLING_AVERAGE_DAYS:
+                flows[row, column, offset] -= pattern.amount
+    averages = flows.mean(axis=2)                      # accounts x categories
+    irregular_days = flows.sum(axis=1)                 # accounts x window days
+
+    expected = current[:, None] + np.cumsum(averages.sum(axis=1)[:, None] + recurring, axis=1)
+
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, ROLLING_AVERAGE_DAYS, size=(paths, FORECAST_DAYS))
+    low = np.empty_like(expected)
+    high = np.empty_like(expected)
+    negative_probability = np.empty(len(accounts))
+    for row in range(len(accounts)):
+        simulated = current[row] + np.cumsum(irregular_days[row][draws] + recurring[row], axis=1)
+        low[row], high[row] = np.percentile(simulated, [10, 90], axis=0)
+        negative_probability[row] = np.mean(simulated.min(axis=1) < 0)
+
+    rows, columns = np.nonzero(averages)
+    category_averages = pd.DataFrame({
+        "account_id": account_index[rows],
+        "category_id": category_index[columns],
+        "daily": averages[rows, columns],
+    })
+    return Forecast(
+        generation=generation,
+        start=as_of,
+        paths=paths,
+        dates=np.datetime64(start) + np.arange(FORECAST_DAYS),
+        account_ids=list(account_index),
+        current=current,
+        expected=expected,
+        low=low,
+        high=high,
+        negative_probability=negative_probability,
+        patterns=patterns,
+        category_averages=category_averages,
+    )
+
+def get_forecast(paths=FORECAST_PATHS, account_id=None) -> Forecast:
+    """Cached forecast, recomputed only after the ledger changed (or on a new day)"""
+    db_path = get_db_path()
+    cached = _forecasts.get(db_path)
+    if (cached is None or cached.generation != get_ledger_generation()
+            or cached.start != datetime.date.today() or cached.paths != paths
+            # an account added since the forecast was computed has no row in it yet
+            or (account_id is not None and account_id not in cached.account_ids)):
+        cached = _forecasts[db_path] = compute_forecast(paths=paths)
+    return cached
+
+def show_forecast_page():
+    """Projected balances for the next twelve months"""
+    st.subheader("Cash-Flow Forecast")
+    accounts = get_accounts()
+    if not accounts:
+        st.info("No accounts found. Add your first account to get started.")
+        return
+
+    reference = get_reference_data()
+    account = st.selectbox("Account", accounts, format_func=lambda a: f"{a.name} ({a.currency})",
+                           key="forecast_account")
+    forecast = get_forecast(account_id=account.id)
+    row = forecast.account_ids.index(account.id)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Today", f"{account.currency} {forecast.current[row]:,.2f}")
+    for col, days in ((col2, 30), (col3, 90), (col4, FORECAST_DAYS)):
+        col.metric(f"In {days} days", f"{account.currency} {forecast.expected[row, days - 1]:,.2f}",
+                   f"{forecast.expected[row, days - 1] - forecast.current[row]:,.2f}",
+                   help=f"80% range: {forecast.low[row, days - 1]:,.2f} to {forecast.high[row, days - 1]:,.2f}")
+
+    dates = pd.to_datetime(forecast.dates)
+    fig = go.Figure([
+        go.Scatter(x=dates, y=forecast.high[row], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=dates, y=forecast.low[row], line=dict(width=0), fill="tonexty",
+                   fillcolor="rgba(51, 181, 255, 0.2)", name="80% range"),
+        go.Scatter(x=dates, y=forecast.expected[row], line=dict(color="#33B5FF"), name="Expected"),
+    ])
+    fig.update_layout(title=f"{account.name} balance ({account.currency})", hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+    if forecast.negative_probability[row] > 0:
+        st.warning(f"{forecast.negative_probability[row]:.0%} of {forecast.paths:,} simulated paths "
+                   f"go below zero within a year.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("##### Recurring patterns")
+        patterns = [pattern for pattern in forecast.patterns if pattern.account_id == account.id]
+        if patterns:
+            st.dataframe(pd.DataFrame([{
+                "Description": pattern.description or "",
+                "Category": (reference.category_by_id[pattern.category_id].name
+                             if pattern.category_id in reference.category_by_id else ""),
+                "Amount": pattern.amount,
+                "Cadence": pattern.cadence.capitalize(),
+                "Last seen": pattern.dates[-1].strftime("%Y-%m-%d"),
+            } for pattern in patterns]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No recurring patterns detected on this account.")
+    with col2:
+        st.markdown(f"##### Monthly averages (last {ROLLING_AVERAGE_DAYS} days)")
+        averages = forecast.category_averages[forecast.category_averages["account_id"] == account.id]
+        if averages.empty:
+            st.caption("No irregular transactions in the averaging window.")
+        else:
+            st.dataframe(pd.DataFrame({
+                "Category": [reference.category_by_id[c].name if c in reference.category_by_id else "Transfers / other"
+                             for c in averages["category_id"]],
+                "Per month": (averages["daily"] * 30.44).round(2).to_numpy(),
+            }).sort_values("Per month"), hide_index=True, use_container_width=True)
+
 def show_accounts_page():
     """Account management page"""
     st.subheader("Accounts")
     
-    tab1, tab2 = st.tabs(["Current Accounts", "Add New Account"])
+    tab1, tab2, tab3 = st.tabs(["Current Accounts", "Ledger", "Add New Account"])
     
     with tab1:
         show_accounts_list()
     
     with tab2:
+        show_account_ledger()
+    
+    with tab3:
         show_add_account_form()
 
+def show_account_ledger():
+    """Paginated ledger of one account with its running balance and balance history"""
+    accounts = get_accounts()
+    if not accounts:
+        st.info("No accounts found. Add your first account to get started.")
+        return
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        account = st.selectbox("Account", accounts, format_func=lambda a: f"{a.name} ({a.currency})",
+                               key="ledger_account")
+    with col2:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="ledger_page_size")
+    with col3:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="ledger_page")
+    
+    ledger = get_account_ledger(account.id, page=int(page), page_size=page_size)
+    if ledger.total_rows == 0:
+        st.info("No transactions on this account yet.")
+        return
+    
+    page_count = -(-ledger.total_rows // page_size)
+    if not ledger.rows:
+        st.warning(f"Page {page} is past the end; this ledger has {page_count} pages.")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "Date": row["date"],
+            "Type": row["type"].capitalize(),
+            "Details": (f"{row['category_icon']} {row['category_name']}" if row["category_name"]
+                        else f"↔ {row['counterparty_name']}" if row["counterparty_name"] else ""),
+            "Description": row["description"] or "",
+            "Amount": row["delta"],
+            "Balance": row["balance"],
+            "📎": row["attachments"] or "",
+        } for row in ledger.rows]), hide_index=True, use_container_width=True)
+        st.caption(f"Page {page} of {page_count} · {ledger.total_rows:,} entries")
+        show_ledger_receipts(ledger.rows)
+    
+    fig = px.line(ledger.history, x="date", y="balance", title=f"{account.name} balance ({account.currency})",
+                  line_shape="hv")
+    st.plotly_chart(fig, use_container_width=True)
+
+def show_ledger_receipts(rows):
+    """Receipts of the ledger page's transactions, and attaching new ones to its expenses"""
+    labels = {row["id"]: f"{row['date']} {row['amount']:.2f}" for row in rows}
+    with st.expander("Receipts"):
+        attachments = get_attachments(row["id"] for row in rows if row["attachments"])
+        if attachments:
+            show_receipt_gallery(attachments, labels)
+        else:
+            st.caption("No receipts on this page.")
+        
+        expenses = [row for row in rows if row["type"] == "expense"]
+        if not expenses:
+            return
+        with st.form("ledger_receipt_form", clear_on_submit=True):
+            row = st.selectbox("Expense", expenses, key="ledger_receipt_expense",
+                               format_func=lambda r: f"{labels[r['id']]} · {r['category_name'] or ''} "
+                                                     f"{r['description'] or ''}")
+            receipt = st.file_uploader("Receipt", type=RECEIPT_TYPES, key="ledger_receipt_file")
+            if st.form_submit_button("Attach") and receipt is not None:
+                attach_receipt(row["id"], receipt.name, receipt.getvalue(), receipt.type)
+                st.rerun()
+
 def show_accounts_list():
     """Display list of existing accounts"""
     accounts = get_accounts()
@@ -847,8 +2588,7 @@ def show_add_account_form():
         account_types = ["Cash", "Bank Account", "Credit Card", "Savings", "Investment", "Loan", "Other"]
         account_type = st.selectbox("Account Type", account_types)
         
-        currencies = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "INR"]
-        currency = st.selectbox("Currency", currencies)
+        currency = st.selectbox("Currency", CURRENCIES)
         
         initial_balance = st.number_input("Initial Balance", value=0.0)
         
@@ -859,18 +2599,19 @@ def show_add_account_form():
             st.success(f"Account '{name}' added successfully!")
             st.rerun()
 
-def add_account(name, account_type, currency, initial_balance):
-    """Add a new account to the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO accounts (name, type, currency, initial_balance)
-    VALUES (?, ?, ?, ?)
-    ''', (name, account_type, currency, initial_balance))
-    
-    conn.commit()
-    conn.close()
+def add_account(name, account_type, currency, initial_balance) -> int:
+    """Add a new account to the database and return its ID"""
+    def write(cursor):
+        cursor.execute('''
+        INSERT INTO accounts (name, type, currency, initial_balance)
+        VALUES (?, ?, ?, ?)
+        ''', (name, account_type, currency, initial_balance))
+        bump_ledger_generation(cursor)
+        return cursor.lastrowid
+    
+    account_id = get_write_queue(get_db_path()).execute(write)
+    invalidate_reference_data()
+    return account_id
 
 def delete_account(account_id):
     """Delete an account from the database"""
@@ -891,8 +2632,10 @@ def delete_account(account_id):
         return False
     
     cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+    bump_ledger_generation(cursor)
     conn.commit()
     conn.close()
+    invalidate_reference_data()
     return True
 
 def show_settings_page():
@@ -935,6 +2678,12 @@ def show_categories_management():
     # Get categories
     categories = get_categories(type_filter=category_type.lower())
     
+    # Current budget utilization per category, read from the rollups
+    budgets_by_category = {}
+    if category_type == "Expense":
+        for status in get_budget_status():
+            budgets_by_category.setdefault(status.budget.category_id, []).append(status)
+    
     # Display existing categories
     if categories:
         for category in categories:
@@ -947,6 +2696,7 @@ def show_categories_management():
                 with col2:
                     st.markdown(f"**{category.name}**")
                     st.markdown(f"<div style='background-color: {category.color}; width: 20px; height: 20px; display: inline-block; border-radius: 50%;'></div> {category.color}", unsafe_allow_html=True)
+                    show_budget_progress(budgets_by_category.get(category.id, []))
                 
                 with col3:
                     if st.button(f"Edit", key=f"edit_cat_{category.id}"):
@@ -968,6 +2718,9 @@ def show_categories_management():
     else:
         st.info(f"No {category_type.lower()} categories found.")
     
+    if category_type == "Expense" and categories:
+        show_budget_management(categories, budgets_by_category)
+    
     # Add new category form
     with st.expander(f"Add New {category_type} Category"):
         with st.form(f"add_{category_type.lower()}_category"):
@@ -1012,18 +2765,45 @@ def show_categories_management():
                 del st.session_state.edit_category_color
                 st.rerun()
 
-def add_category(name, category_type, icon, color):
-    """Add a new category to the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO categories (name, type, icon, color)
-    VALUES (?, ?, ?, ?)
-    ''', (name, category_type, icon, color))
-    
-    conn.commit()
-    conn.close()
+def show_budget_management(categories, budgets_by_category):
+    """Set, change or remove per-category budgets"""
+    with st.expander("Budgets"):
+        with st.form("budget_form"):
+            category_options = [f"{cat.icon} {cat.name}" for cat in categories]
+            category_selected = st.selectbox("Category", category_options)
+            period = st.selectbox("Period", BUDGET_PERIODS)
+            amount = st.number_input("Budget Amount", min_value=0.01, step=10.0)
+            
+            submitted = st.form_submit_button("Save Budget")
+            
+            if submitted:
+                category = categories[category_options.index(category_selected)]
+                set_budget(category.id, period, amount)
+                st.success(f"{period.title()} budget for '{category.name}' saved.")
+                st.rerun()
+        
+        for category in categories:
+            for status in budgets_by_category.get(category.id, []):
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.text(f"{category.icon} {category.name}: {status.budget.amount:.2f} {status.budget.period}")
+                with col2:
+                    if st.button("Remove", key=f"delete_budget_{status.budget.id}"):
+                        delete_budget(status.budget.id)
+                        st.rerun()
+
+def add_category(name, category_type, icon, color) -> int:
+    """Add a new category to the database and return its ID"""
+    def write(cursor):
+        cursor.execute('''
+        INSERT INTO categories (name, type, icon, color)
+        VALUES (?, ?, ?, ?)
+        ''', (name, category_type, icon, color))
+        return cursor.lastrowid
+    
+    category_id = get_write_queue(get_db_path()).execute(write)
+    invalidate_reference_data()
+    return category_id
 
 def update_category(category_id, name, icon, color):
     """Update an existing category"""
@@ -1038,9 +2818,11 @@ def update_category(category_id, name, icon, color):
     
     conn.commit()
     conn.close()
+    invalidate_reference_data()
 
 def delete_category(category_id):
     """Delete a category and set associated transactions to uncategorized"""
+    snapshot_database(get_db_path(), reason="delete-category")
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -1051,12 +2833,22 @@ def delete_category(category_id):
     if tx_count > 0:
         # Option 1: Set transactions to NULL category
         cursor.execute("UPDATE transactions SET category_id = NULL WHERE category_id = ?", (category_id,))
+        bump_ledger_generation(cursor)
+    
+    # Budgets and their rollups go with the category
+    cursor.execute('''
+    DELETE FROM budget_events WHERE budget_id IN (SELECT id FROM budgets WHERE category_id = ?)
+    ''', (category_id,))
+    cursor.execute("DELETE FROM budgets WHERE category_id = ?", (category_id,))
+    cursor.execute("DELETE FROM budget_rollups WHERE category_id = ?", (category_id,))
+    cursor.execute("DELETE FROM anomaly_stats WHERE category_id = ?", (category_id,))
     
     # Delete the category
     cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
     
     conn.commit()
     conn.close()
+    invalidate_reference_data()
     return True
 
 def show_data_management():
@@ -1079,12 +2871,14 @@ def show_data_management():
         if st.button("Import Data") and upload_file is not None:
             import_data(upload_file)
     
+    show_statement_reconciliation()
+    
     # Database operations
     st.markdown("##### Database Operations")
     dangerous_ops = st.expander("Danger Zone", expanded=False)
     
     with dangerous_ops:
-        st.warning("The following operations are destructive and cannot be undone!")
+        st.warning("The following operations are destructive! A snapshot is taken first and can be restored under Backups.")
         
         if st.button("Clear All Transactions"):
             if st.session_state.get('confirm_clear_tx') == True:
@@ -1103,6 +2897,79 @@ def show_data_management():
             else:
                 st.session_state.confirm_reset_db = True
                 st.error("⚠️ Click 'Reset Entire Database' again to confirm. ALL DATA WILL BE LOST!")
+    
+    show_backups()
+    show_write_queue_metrics()
+    
+    with st.expander("Anomaly Detection", expanded=False):
+        st.caption("Flags are computed as transactions are saved. Rebuilding replays the whole ledger "
+                   "and restores dismissed flags.")
+        if st.button("Rebuild anomaly flags"):
+            rebuild_anomalies()
+            st.success("Anomaly flags rebuilt from the ledger.")
+
+def show_write_queue_metrics():
+    """Batch size and commit latency of the group-commit write queue"""
+    with st.expander("Write Queue", expanded=False):
+        metrics = get_write_queue(get_db_path()).metrics()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Writes committed", f"{metrics.items:,}")
+        col2.metric("Mean batch size", f"{metrics.mean_batch_size:.1f}", help=f"Largest: {metrics.max_batch_size}")
+        col3.metric("Mean commit", f"{metrics.mean_commit_ms:.1f} ms")
+        col4.metric("p95 commit", f"{metrics.p95_commit_ms:.1f} ms")
+        if metrics.failed_items:
+            st.caption(f"{metrics.failed_items:,} writes failed and were rolled back individually.")
+
+def show_backups():
+    """Snapshot and restore the app databases"""
+    st.markdown("##### Backups")
+    
+    databases = {
+        "Daily Expense Tracker": get_db_path(),
+        "Crypto Trade Tracker": get_crypto_db_path(),
+        "Stocks Journal": get_stocks_db_path()
+    }
+    database = st.selectbox("Database", list(databases.keys()), key="backup_database")
+    db_path = databases[database]
+    
+    if st.button("Create Snapshot"):
+        snapshot = snapshot_database(db_path)
+        if snapshot:
+            st.success(f"Snapshot saved ({snapshot.size / 1024:.1f} KB compressed).")
+        else:
+            st.info(f"{database} has no data yet.")
+    
+    snapshots = list_snapshots(db_path)
+    if not snapshots:
+        st.info("No snapshots yet.")
+        return
+    
+    st.dataframe(pd.DataFrame([{
+        "Taken": snapshot.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "Reason": snapshot.reason,
+        "Size (KB)": round(snapshot.size / 1024, 1)
+    } for snapshot in snapshots]), use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        labels = [f"{snapshot.created_at:%Y-%m-%d %H:%M:%S} ({snapshot.reason})" for snapshot in snapshots]
+        selected = st.selectbox("Snapshot", labels, key="backup_snapshot")
+        if st.button("Restore Snapshot"):
+            restore_snapshot(db_path, snapshots[labels.index(selected)].path)
+            if db_path == get_db_path():
+                invalidate_caches()
+            st.success(f"{database} restored to {selected}.")
+    with col2:
+        restore_date = st.date_input("Restore As Of", value=datetime.date.today(), key="backup_as_of_date")
+        restore_time = st.time_input("Time", value=datetime.time(23, 59), key="backup_as_of_time")
+        if st.button("Restore Point in Time"):
+            try:
+                snapshot = restore_as_of(db_path, datetime.datetime.combine(restore_date, restore_time))
+                if db_path == get_db_path():
+                    invalidate_caches()
+                st.success(f"{database} restored to the snapshot taken {snapshot.created_at:%Y-%m-%d %H:%M:%S}.")
+            except ValueError as e:
+                st.error(str(e))
 
 def export_data(format_type):
     """Export all data to the specified format"""
@@ -1181,8 +3048,22 @@ def export_data(format_type):
             mime="application/json"
         )
 
-def import_data(file):
-    """Import data from uploaded file"""
+def import_data(file, statement_account=None, date_tolerance=3, amount_tolerance=0.0):
+    """Import data from uploaded file.
+
+    With statement_account set, the file is a bank statement for that account and is
+    reconciled against its transactions instead; the result lands in the session state.
+    """
+    if statement_account is not None:
+        try:
+            lines = parse_bank_statement(file)
+            st.session_state.reconciliation = reconcile_statement(
+                statement_account.id, lines, date_tolerance, amount_tolerance)
+            st.session_state.reconciliation_account_id = statement_account.id
+        except ValueError as e:
+            st.error(f"Could not read the statement: {e}")
+        return
+    
     try:
         # Process based on file type
         if file.name.endswith('.csv'):
@@ -1211,12 +3092,251 @@ def import_data(file):
     except Exception as e:
         st.error(f"Error importing data: {str(e)}")
 
+# Accepted spellings of the statement columns, compared case-insensitively
+STATEMENT_COLUMNS = {
+    "date": ["date", "transaction date", "posting date", "booking date", "value date"],
+    "amount": ["amount", "transaction amount"],
+    "credit": ["credit", "deposit", "deposits", "money in", "paid in"],
+    "debit": ["debit", "withdrawal", "withdrawals", "money out", "paid out"],
+    "description": ["description", "memo", "narration", "details", "payee", "reference"],
+}
+
+@dataclass
+class Reconciliation:
+    """Outcome of matching a bank statement against an account's ledger"""
+    lines: pd.DataFrame         # date, amount (signed, money in positive), description, transaction_id
+    ledger_rows: int            # transactions of the account inside the statement's date window
+    seconds: float
+    
+    @property
+    def matched(self) -> pd.DataFrame:
+        return self.lines[self.lines["transaction_id"].notna()]
+    
+    @property
+    def unmatched(self) -> pd.DataFrame:
+        return self.lines[self.lines["transaction_id"].isna()]
+
+def _find_statement_column(columns, names):
+    for name in names:
+        if name in columns:
+            return columns[name]
+    return None
+
+def parse_bank_statement(file) -> pd.DataFrame:
+    """Read a CSV or Excel statement into date, signed amount and description columns"""
+    df = pd.read_excel(file) if file.name.endswith('.xlsx') else pd.read_csv(file)
+    columns = {str(column).strip().lower(): column for column in df.columns}
+    
+    date_column = _find_statement_column(columns, STATEMENT_COLUMNS["date"])
+    if date_column is None:
+        raise ValueError("no date column found")
+    
+    amount_column = _find_statement_column(columns, STATEMENT_COLUMNS["amount"])
+    if amount_column is not None:
+        amounts = pd.to_numeric(df[amount_column], errors="coerce")
+    else:
+        credit_column = _find_statement_column(columns, STATEMENT_COLUMNS["credit"])
+        debit_column = _find_statement_column(columns, STATEMENT_COLUMNS["debit"])
+        if credit_column is None and debit_column is None:
+            raise ValueError("no amount (or credit/debit) column found")
+        amounts = pd.Series(0.0, index=df.index)
+        if credit_column is not None:
+            amounts += pd.to_numeric(df[credit_column], errors="coerce").fillna(0).abs()
+        if debit_column is not None:
+            amounts -= pd.to_numeric(df[debit_column], errors="coerce").fillna(0).abs()
+    
+    description_column = _find_statement_column(columns, STATEMENT_COLUMNS["description"])
+    lines = pd.DataFrame({
+        "date": pd.to_datetime(df[date_column], errors="coerce").dt.strftime("%Y-%m-%d"),
+        "amount": amounts.round(2),
+        "description": df[description_column].fillna("").astype(str) if description_column is not None else "",
+    })
+    lines = lines.dropna(subset=["date", "amount"]).reset_index(drop=True)
+    if lines.empty:
+        raise ValueError("the statement has no lines with a valid date and amount")
+    return lines
+
+def _load_statement_window(account_id, start_date, end_date):
+    """Signed ledger amounts of an account between two dates, as (ids, days, cents) arrays.
+
+    Built on get_transactions with the same filters; a transfer counts against the
+    account it leaves and for the one it reaches (both, for a transfer to itself).
+    """
+    columns = get_transactions(start_date=start_date, end_date=end_date, account_id=account_id, columns=True)
+    outgoing = columns["account_id"] == account_id
+    incoming = (columns["to_account_id"] == account_id) & (columns["type"] == "transfer")
+    amounts = np.where(columns["type"] == "income", columns["amount"], -columns["amount"])
+    
+    ids = np.concatenate([columns["id"][outgoing], columns["id"][incoming]])
+    dates = np.concatenate([columns["date"][outgoing], columns["date"][incoming]])
+    amounts = np.concatenate([amounts[outgoing], columns["amount"][incoming]])
+    return (ids.astype(np.int64),
+            np.array(dates, dtype="datetime64[D]").astype(np.int64),
+            np.round(amounts * 100).astype(np.int64))
+
+# Statement keys are day * _DAY_KEY_SCALE + cents, so one sorted array orders by (day, amount)
+_DAY_KEY_SCALE = 1 << 40
+_CENTS_OFFSET = 1 << 39
+
+def match_statement_lines(line_days, line_cents, ledger_days, ledger_cents, date_tolerance, amount_tolerance_cents):
+    """Pair statement lines with ledger rows one-to-one; returns the ledger index per line or -1.
+
+    The ledger is sorted once by (day, amount). For every allowed day offset a pair
+    of binary searches finds each line's candidates inside the amount tolerance, so
+    the work is O((lines + ledger) log ledger) per day offset instead of lines x ledger.
+    Candidates are then taken greedily, closest amount first, then closest date.
+    """
+    line_count = len(line_days)
+    matches = np.full(line_count, -1, dtype=np.int64)
+    if line_count == 0 or len(ledger_days) == 0:
+        return matches
+    
+    ledger_keys = ledger_days * _DAY_KEY_SCALE + ledger_cents + _CENTS_OFFSET
+    order = np.argsort(ledger_keys, kind="stable")
+    sorted_keys = ledger_keys[order]
+    
+    pair_lines, pair_ledger = [], []
+    for offset in range(-date_tolerance, date_tolerance + 1):
+        target = (line_days + offset) * _DAY_KEY_SCALE + line_cents + _CENTS_OFFSET
+        low = np.searchsorted(sorted_keys, target - amount_tolerance_cents, side="left")
+        high = np.searchsorted(sorted_keys, target + amount_tolerance_cents, side="right")
+        counts = high - low
+        total = counts.sum()
+        if total == 0:
+            continue
+        # Expand every [low, high) range into individual candidate positions
+        group_starts = np.cumsum(counts) - counts
+        positions = np.repeat(low, counts) + np.arange(total) - np.repeat(group_starts, counts)
+        pair_lines.append(np.repeat(np.arange(line_count), counts))
+        pair_ledger.append(order[positions])
+    if not pair_lines:
+        return matches
+    
+    pair_lines = np.concatenate(pair_lines)
+    pair_ledger = np.concatenate(pair_ledger)
+    amount_gap = np.abs(line_cents[pair_lines] - ledger_cents[pair_ledger])
+    date_gap = np.abs(line_days[pair_lines] - ledger_days[pair_ledger])
+    ranked = np.lexsort((pair_ledger, pair_lines, date_gap, amount_gap))
+    
+    ledger_taken = np.zeros(len(ledger_days), dtype=bool)
+    for line, ledger in zip(pair_lines[ranked].tolist(), pair_ledger[ranked].tolist()):
+        if matches[line] < 0 and not ledger_taken[ledger]:
+            matches[line] = ledger
+            ledger_taken[ledger] = True
+    return matches
+
+def reconcile_statement(account_id, lines: pd.DataFrame, date_tolerance=3, amount_tolerance=0.0) -> Reconciliation:
+    """Match statement lines against the account's transactions within the given tolerances"""
+    started = time.perf_counter()
+    line_days = lines["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    line_cents = np.round(lines["amount"].to_numpy(dtype=float) * 100).astype(np.int64)
+    
+    window_start = (np.datetime64(lines["date"].min()) - date_tolerance).astype(str)
+    window_end = (np.datetime64(lines["date"].max()) + date_tolerance).astype(str)
+    ledger_ids, ledger_days, ledger_cents = _load_statement_window(account_id, window_start, window_end)
+    
+    matches = match_statement_lines(line_days, line_cents, ledger_days, ledger_cents,
+                                    date_tolerance, int(round(amount_tolerance * 100)))
+    matched = matches >= 0
+    transaction_ids = pd.array(np.zeros(len(lines), dtype=np.int64), dtype="Int64")
+    transaction_ids[matched] = ledger_ids[matches[matched]]
+    transaction_ids[~matched] = pd.NA
+    lines = lines.assign(transaction_id=transaction_ids)
+    return Reconciliation(lines=lines, ledger_rows=len(ledger_ids), seconds=time.perf_counter() - started)
+
+def insert_statement_lines(account_id, lines: pd.DataFrame, expense_category_id, income_category_id) -> int:
+    """Add statement lines as transactions in one batch; money out becomes an expense, money in income"""
+    amounts = lines["amount"].to_numpy(dtype=float)
+    rows = list(zip(np.where(amounts < 0, "expense", "income").tolist(),
+                    np.abs(amounts).tolist(),
+                    lines["date"].tolist(),
+                    np.where(amounts < 0, expense_category_id, income_category_id).tolist(),
+                    [account_id] * len(lines),
+                    [None] * len(lines),
+                    lines["description"].replace("", None).tolist()))
+    
+    def write(cursor):
+        after_id = last_transaction_id(cursor)
+        cursor.executemany('''
+        INSERT INTO transactions 
+        (type, amount, date, category_id, account_id, to_account_id, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        after_transactions_written(cursor, after_id)
+        return len(rows)
+    
+    return get_write_queue(get_db_path()).execute(write)
+
+def show_statement_reconciliation():
+    """Upload a bank statement, match it against an account and add what is missing"""
+    st.markdown("##### Reconcile Bank Statement")
+    accounts = get_accounts()
+    if not accounts:
+        st.info("Add an account before reconciling a statement.")
+        return
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        account = st.selectbox("Account", accounts, format_func=lambda a: f"{a.name} ({a.currency})",
+                               key="reconcile_account")
+    with col2:
+        date_tolerance = st.number_input("Date tolerance (days)", min_value=0, max_value=10, value=3)
+    with col3:
+        amount_tolerance = st.number_input("Amount tolerance", min_value=0.0, max_value=10.0, value=0.0, step=0.01)
+    
+    statement = st.file_uploader("Statement (CSV or Excel)", type=["csv", "xlsx"], key="statement_file")
+    if st.button("Match Statement") and statement is not None:
+        import_data(statement, statement_account=account, date_tolerance=int(date_tolerance),
+                    amount_tolerance=amount_tolerance)
+    
+    result = st.session_state.get("reconciliation")
+    if result is None or st.session_state.get("reconciliation_account_id") != account.id:
+        return
+    
+    unmatched = result.unmatched
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Statement lines", f"{len(result.lines):,}")
+    col2.metric("Matched", f"{len(result.matched):,}")
+    col3.metric("Unmatched", f"{len(unmatched):,}")
+    st.caption(f"Matched against {result.ledger_rows:,} ledger entries in {result.seconds:.2f}s")
+    
+    if unmatched.empty:
+        st.success("Every statement line has a matching transaction.")
+        return
+    
+    st.dataframe(unmatched[["date", "amount", "description"]].head(1000), hide_index=True, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        expense_category = st.selectbox("Category for money out", get_categories("expense"),
+                                        format_func=lambda c: f"{c.icon} {c.name}", key="reconcile_expense_category")
+    with col2:
+        income_category = st.selectbox("Category for money in", get_categories("income"),
+                                       format_func=lambda c: f"{c.icon} {c.name}", key="reconcile_income_category")
+    
+    if st.button(f"Add {len(unmatched):,} unmatched lines as transactions"):
+        if expense_category is None or income_category is None:
+            st.error("Pick a category for both money in and money out first.")
+            return
+        added = insert_statement_lines(account.id, unmatched, expense_category.id, income_category.id)
+        del st.session_state.reconciliation
+        st.success(f"Added {added:,} transactions.")
+
 def clear_transactions():
     """Clear all transactions from the database"""
+    snapshot_database(get_db_path(), reason="clear-transactions")
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute("DELETE FROM transactions")
+    cursor.execute("DELETE FROM budget_rollups")
+    cursor.execute("DELETE FROM budget_events")
+    cursor.execute("DELETE FROM anomaly_stats")
+    cursor.execute("DELETE FROM anomaly_recent_charges")
+    cursor.execute("DELETE FROM anomalies")
+    # Receipt files stay in the blob store so the snapshot taken above can still be restored with them
+    cursor.execute("DELETE FROM transaction_attachments")
+    bump_ledger_generation(cursor)
     
     conn.commit()
     conn.close()
@@ -1227,50 +3347,91 @@ def reset_database():
     import shutil
     
     # Path to the database
-    db_path = "data/expense_tracker.db"
+    db_path = get_db_path()
     
     # Check if file exists
     if os.path.exists(db_path):
+        snapshot_database(db_path, reason="reset-database")
+        # The queued writer holds the file open; flush it before the file goes away
+        close_write_queue(db_path)
+        close_read_connections(db_path)
         # Delete the file
         os.remove(db_path)
     
-    # Reinitialize the database
+    # Reinitialize the database and drop everything cached from the old one
+    invalidate_caches()
     init_database()
 
+def invalidate_caches(db_path=None):
+    """Forget everything cached about the database after it was replaced underneath us"""
+    db_path = db_path or get_db_path()
+    _initialized_databases.discard(db_path)
+    close_write_queue(db_path)
+    close_read_connections(db_path)
+    with _reference_data_lock:
+        _reference_data.pop(db_path, None)
+    _fx_tables.pop(db_path, None)
+    _forecasts.pop(db_path, None)
+
 def show_preferences():
     """User preferences"""
     st.markdown("#### Preferences")
     
-    # Currency preference
+    # Currency preference; totals on the dashboard and statistics pages are converted to it
+    saved_currency = get_preference("default_currency", "USD")
     default_currency = st.selectbox(
         "Default Currency",
-        ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "INR"],
-        index=0  # Default to USD
+        CURRENCIES,
+        index=CURRENCIES.index(saved_currency) if saved_currency in CURRENCIES else 0
     )
     
     # Date format
+    date_formats = ["MM/DD/YYYY", "DD/MM/YYYY", "YYYY-MM-DD"]
     date_format = st.selectbox(
         "Date Format",
-        ["MM/DD/YYYY", "DD/MM/YYYY", "YYYY-MM-DD"],
-        index=2  # Default to YYYY-MM-DD
+        date_formats,
+        index=date_formats.index(get_preference("date_format", "YYYY-MM-DD"))
     )
     
     # Theme preference
+    themes = ["System Default", "Light", "Dark"]
     theme = st.selectbox(
         "Application Theme",
-        ["System Default", "Light", "Dark"],
-        index=0
+        themes,
+        index=themes.index(get_preference("theme", "System Default"))
     )
     
     # First day of week
+    week_days = ["Sunday", "Monday"]
     first_day = st.selectbox(
         "First Day of Week",
-        ["Sunday", "Monday"],
-        index=1
+        week_days,
+        index=week_days.index(get_preference("first_day", "Monday"))
     )
     
     if st.button("Save Preferences"):
-        # In a real app, these preferences would be saved to the database
-        # or local storage. For now, just display a success message.
+        set_preferences({
+            "default_currency": default_currency,
+            "date_format": date_format,
+            "theme": theme,
+            "first_day": first_day
+        })
         st.success("Preferences saved successfully!")
-        st.info("Note: Some preferences may require an app restart to take effect.")
\ No newline at end of file
+        st.info("Note: Some preferences may require an app restart to take effect.")
+    
+    # Exchange rates
+    st.markdown("##### Exchange Rates")
+    table = get_fx_table()
+    if table is None:
+        st.info("No exchange rates loaded. Totals across currencies are only correct once rates are available.")
+    else:
+        st.text(f"{len(table.currencies)} currencies, {table.dates[0]} to {table.dates[-1]}")
+    
+    rates_file = st.file_uploader("Rates File (CSV: date, currency, rate per 1 USD; or JSON)",
+                                  type=["csv", "json"], key="fx_rates_file")
+    if st.button("Load Rates") and rates_file is not None:
+        try:
+            loaded = load_fx_rates(rates_file)
+            st.success(f"Loaded {loaded} exchange rates.")
+        except Exception as e:
+            st.error(f"Error loading exchange rates: {str(e)}")
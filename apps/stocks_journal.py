@@ -4,12 +4,14 @@ import sqlite3
 from datetime import datetime
 import matplotlib.pyplot as plt
 import io
+from utils.db import get_stocks_db_path
+from utils.backup import snapshot_database
 
 def show_stocks_journal():
     st.header("📊 Stocks Journal")
     
     # Initialize DB connection
-    conn = sqlite3.connect('stocks_journal.db')
+    conn = sqlite3.connect(get_stocks_db_path())
     c = conn.cursor()
     
     # Create table if it doesn't exist
@@ -205,6 +207,7 @@ def show_stocks_journal():
                         st.rerun()
                 with col5:
                     if st.button("🗑️ Delete", key=f"delete_transaction_{selected_id}"):
+                        snapshot_database(get_stocks_db_path(), reason="delete-transaction")
                         c.execute("DELETE FROM stock_transactions WHERE id=?", (selected_id,))
                         conn.commit()
                         st.success("🗑️ Transaction deleted!")
@@ -1,10 +1,22 @@
 # apps/travel_planner.py
 import streamlit as st
-import pandas as pd
+import io
 from datetime import datetime, timedelta
-import json
-import os
 import uuid
+from bisect import insort
+from collections import defaultdict
+from utils.travel_store import (init_travel_db, list_itinerary_summaries, load_itinerary, create_itinerary,
+                                delete_itinerary, add_activity, update_activity, delete_activity,
+                                ItineraryConflictError, load_conflicts, count_conflicts, MIN_CONNECTION_GAP,
+                                geocode_locations, time_to_minutes, load_changes, apply_changes,
+                                search_itineraries)
+from utils.itinerary_export import EXPORT_FORMATS, write_itinerary_zip
+from utils.geocoder import distance_matrix_km, travel_minutes, shortest_route, route_length
+
+DAY_VIEW_MODES = ["All days", "Single day"]
+MAX_ROUTE_STOPS = 60          # days with more located stops get no reordering suggestion
+MIN_ROUTE_SAVING = 0.10       # share of the day's distance a suggested order must save
+SINGLE_DAY_VIEW_AFTER_DAYS = 7  # longer trips open in single-day mode
 
 def show_travel_planner():
     st.title("🧳 Travel Itinerary Planner")
@@ -17,57 +29,25 @@ def show_travel_planner():
         ["Create Itinerary", "View Itineraries", "Export Itinerary"]
     )
     
-    # Create data directory if it doesn't exist
-    if not os.path.exists("data"):
-        os.makedirs("data")
-    
-    # Initialize itineraries file if it doesn't exist
-    itineraries_file = "data/travel_itineraries.json"
-    if not os.path.exists(itineraries_file):
-        with open(itineraries_file, "w") as f:
-            json.dump({"itineraries": []}, f)
-    
-    # Load existing itineraries
-    with open(itineraries_file, "r") as f:
-        data = json.load(f)
-        itineraries = data["itineraries"]
+    init_travel_db()
     
     # Initialize session state variables
     if "active_itinerary" not in st.session_state:
         st.session_state.active_itinerary = None
     if "editing_activity" not in st.session_state:
         st.session_state.editing_activity = None
-    
-    # Function to save itineraries
-    def save_itineraries():
-        with open(itineraries_file, "w") as f:
-            json.dump({"itineraries": itineraries}, f, indent=4)
+    if "itinerary_versions" not in st.session_state:
+        st.session_state.itinerary_versions = {}  # itinerary id -> version this session last displayed
+    if "itinerary_replicas" not in st.session_state:
+        st.session_state.itinerary_replicas = {}  # itinerary id -> this session's synced copy
     
     # Route to the correct function based on sidebar selection
     if sidebar_action == "Create Itinerary":
         create_new_itinerary()
     elif sidebar_action == "View Itineraries":
-        view_itineraries(itineraries, save_itineraries)
+        view_itineraries()
     elif sidebar_action == "Export Itinerary":
-        # Export functionality
-        st.subheader("Export Itinerary")
-        if not itineraries:
-            st.info("No itineraries available to export.")
-        else:
-            # Select an itinerary to export
-            itinerary_names = [f"{i['name']} ({i['destination']})" for i in itineraries]
-            selected_name = st.selectbox("Select Itinerary to Export", itinerary_names)
-            selected_idx = itinerary_names.index(selected_name)
-            
-            if st.button("Export to CSV"):
-                df = export_itinerary(itineraries[selected_idx])
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"{itineraries[selected_idx]['name']}_itinerary.csv",
-                    mime="text/csv"
-                )
+        export_itineraries()
     
 def create_new_itinerary():
     st.header("Create New Itinerary")
@@ -94,16 +74,7 @@ def create_new_itinerary():
                 "activities": []
             }
             
-            # Load existing itineraries
-            itineraries_file = "data/travel_itineraries.json"
-            with open(itineraries_file, "r") as f:
-                data = json.load(f)
-                itineraries = data["itineraries"]
-            
-            # Add new itinerary and save
-            itineraries.append(new_itinerary)
-            with open(itineraries_file, "w") as f:
-                json.dump({"itineraries": itineraries}, f, indent=4)
+            create_itinerary(new_itinerary)
             
             st.success(f"Itinerary '{trip_name}' created successfully!")
             st.session_state.active_itinerary = new_itinerary["id"]
@@ -111,61 +82,168 @@ def create_new_itinerary():
         else:
             st.error("Please fill all fields and ensure end date is after start date.")
 
-def view_itineraries(itineraries, save_callback):
-    if not itineraries:
+def view_itineraries():
+    # Summaries only; the activities of the selected itinerary are loaded below
+    summaries = {summary.id: summary for summary in list_itinerary_summaries()}
+    if not summaries:
         st.info("No itineraries found. Create one to get started!")
         return
     
     # Display list of itineraries
     st.header("Your Itineraries")
     
-    itinerary_names = [f"{i['name']} ({i['destination']} - {i['start_date']} to {i['end_date']})" for i in itineraries]
-    itinerary_ids = [i["id"] for i in itineraries]
+    # Search every trip and activity; a hit opens its itinerary on the matching day
+    search_query = st.text_input("🔍 Search trips and activities", key="itinerary_search",
+                                 placeholder="e.g. hotel lisbon")
+    if search_query:
+        show_search_hits(search_query)
     
-    selected_idx = 0
-    if st.session_state.active_itinerary:
-        if st.session_state.active_itinerary in itinerary_ids:
-            selected_idx = itinerary_ids.index(st.session_state.active_itinerary)
+    positions = {itinerary_id: position for position, itinerary_id in enumerate(summaries)}
+    st.session_state.active_itinerary = st.selectbox(
+        "Select Itinerary", list(summaries), index=positions.get(st.session_state.active_itinerary, 0),
+        format_func=lambda i: f"{summaries[i].label} · {summaries[i].activity_count} activities"
+    )
+    
+    summary = summaries[st.session_state.active_itinerary]
+    
+    # Display itinerary details
+    st.subheader(f"{summary.name} - {summary.destination}")
+    st.write(f"**Date:** {summary.start_date} to {summary.end_date}")
+    
+    # Calculate number of days in the trip
+    start = datetime.strptime(summary.start_date, "%Y-%m-%d")
+    end = datetime.strptime(summary.end_date, "%Y-%m-%d")
+    days = (end - start).days + 1
     
-    selected_itinerary_name = st.selectbox("Select Itinerary", itinerary_names, index=selected_idx)
-    selected_idx = itinerary_names.index(selected_itinerary_name)
-    st.session_state.active_itinerary = itineraries[selected_idx]["id"]
+    # Long trips default to showing one day, which only loads and renders that day's activities
+    # Keyed per itinerary so a search hit can switch it to the day it found
+    view_mode_key = f"day_view_mode_{summary.id}"
+    st.session_state.setdefault(view_mode_key, DAY_VIEW_MODES[1 if days > SINGLE_DAY_VIEW_AFTER_DAYS else 0])
+    view_mode = st.radio("Show", DAY_VIEW_MODES, horizontal=True, key=view_mode_key)
+    selected_day = None
+    if view_mode == "Single day":
+        selected_day = st.selectbox("Day", list(range(1, days + 1)), key="selected_day",
+                                    format_func=lambda day: format_day(start, day))
     
-    # Get the selected itinerary
-    active_itinerary = next((i for i in itineraries if i["id"] == st.session_state.active_itinerary), None)
+    # Get the selected itinerary; only the activities on display are kept, and reruns read
+    # just the changes other sessions (or this one) made since
+    active_itinerary = sync_itinerary(summary.id, day=selected_day)
+    
+    if st.session_state.pop("itinerary_conflict", False):
+        st.warning("This itinerary was changed in another session, so your last change was not saved. "
+                   "The latest version is shown below.")
     
     if active_itinerary:
-        # Display itinerary details
-        st.subheader(f"{active_itinerary['name']} - {active_itinerary['destination']}")
-        st.write(f"**Date:** {active_itinerary['start_date']} to {active_itinerary['end_date']}")
+        # Edits made on this run were decided on what the previous run displayed, so they are
+        # checked against that version; a change from another session in between is a conflict
+        seen_versions = st.session_state.itinerary_versions
+        loaded_version = active_itinerary["version"]
+        active_itinerary["version"] = seen_versions.get(active_itinerary["id"], loaded_version)
+        seen_versions[active_itinerary["id"]] = loaded_version
         
-        # Calculate number of days in the trip
-        start = datetime.strptime(active_itinerary['start_date'], "%Y-%m-%d")
-        end = datetime.strptime(active_itinerary['end_date'], "%Y-%m-%d")
-        days = (end - start).days + 1
+        activities_by_day = bucket_activities_by_day(active_itinerary["activities"])
         
         # Section for adding new activities
         with st.expander("Add New Activity", expanded=False):
-            add_new_activity(active_itinerary, days, itineraries, save_callback)
+            add_new_activity(active_itinerary, days, activities_by_day, selected_day)
+        
+        # Conflicts are kept up to date by every activity write; only the displayed ones are read
+        conflicts = load_conflicts(active_itinerary["id"], day=selected_day)
+        conflict_count = count_conflicts(active_itinerary["id"])
+        if conflict_count:
+            st.warning(f"⚠️ {conflict_count} scheduling conflict(s) in this itinerary.")
+        
+        # Locations of the displayed activities, geocoded offline and cached in the store
+        places = geocode_locations((activity["location"] for day_activities in activities_by_day.values()
+                                    for activity in day_activities), destination=summary.destination)
         
         # Display activities by day
-        display_activities_by_day(active_itinerary, days, start, itineraries, save_callback)
+        if selected_day is None:
+            display_activities_by_day(active_itinerary, days, start, activities_by_day, conflicts, places)
+        else:
+            display_day(active_itinerary, selected_day, start, activities_by_day[selected_day], conflicts, places)
         
         # Delete itinerary button
         if st.button("Delete This Itinerary", key="delete_itinerary"):
-            itineraries.remove(active_itinerary)
-            save_callback()
+            save_itinerary_change(delete_itinerary, active_itinerary)
+            st.session_state.itinerary_replicas.pop(active_itinerary["id"], None)
             st.session_state.active_itinerary = None
             st.success("Itinerary deleted successfully!")
             st.rerun()
 
-def add_new_activity(itinerary, days, itineraries, save_callback):
+def show_search_hits(query):
+    hits = search_itineraries(query)
+    if not hits:
+        st.info(f"Nothing matches '{query}'.")
+        return
+    for i, hit in enumerate(hits):
+        if hit.activity_id is None:
+            label = f"🧳 {hit.title}"
+        else:
+            label = f"{hit.title} · {hit.itinerary_name}, day {hit.day}"
+        st.button(label, key=f"search_hit_{i}", on_click=jump_to_search_hit, args=(hit,))
+        st.caption(hit.snippet)
+
+def jump_to_search_hit(hit):
+    """Open the hit's itinerary, on its day when the hit is an activity"""
+    st.session_state.active_itinerary = hit.itinerary_id
+    if hit.day is not None:
+        st.session_state[f"day_view_mode_{hit.itinerary_id}"] = "Single day"
+        st.session_state.selected_day = hit.day
+    st.session_state.itinerary_search = ""
+
+def sync_itinerary(itinerary_id, day=None):
+    """This session's copy of an itinerary (or one day of it), brought up to date from the change log.
+
+    It is loaded in full the first time, when the day on display changes, or when
+    the log no longer reaches back to its version; otherwise a rerun only reads the
+    changes made since.
+    """
+    replicas = st.session_state.itinerary_replicas
+    replica = replicas.get(itinerary_id)
+    delta = None
+    if replica is not None and replica["day"] == day:
+        delta = load_changes(itinerary_id, replica["itinerary"]["version"])
+    if delta is not None:
+        apply_changes(replica["itinerary"], *delta, day=day)
+    else:
+        itinerary = load_itinerary(itinerary_id, day)
+        if itinerary is None:
+            replicas.pop(itinerary_id, None)
+            return None
+        replica = replicas[itinerary_id] = {"day": day, "itinerary": itinerary}
+    # The page changes its itinerary in place, so it gets a copy of the replica
+    return dict(replica["itinerary"], activities=list(replica["itinerary"]["activities"]))
+
+def bucket_activities_by_day(activities):
+    """Group activities by day in one pass; the store returns them in day and time order"""
+    activities_by_day = defaultdict(list)
+    for activity in activities:
+        activities_by_day[activity["day"]].append(activity)
+    return activities_by_day
+
+def format_day(start_date, day):
+    day_date = start_date + timedelta(days=day - 1)
+    return f"Day {day} · {day_date.strftime('%A, %d %B %Y')}"
+
+def save_itinerary_change(change, itinerary, *args):
+    """Apply a change through the store; if another session got there first, reload instead of overwriting"""
+    try:
+        change(itinerary, *args)
+    except ItineraryConflictError:
+        st.session_state.itinerary_versions.pop(itinerary["id"], None)
+        st.session_state.itinerary_conflict = True
+        st.rerun()
+    st.session_state.itinerary_versions[itinerary["id"]] = itinerary["version"]
+
+def add_new_activity(itinerary, days, activities_by_day, selected_day=None):
     st.subheader("Add New Activity")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        day_num = st.selectbox("Day", list(range(1, days + 1)))
+        day_num = st.selectbox("Day", list(range(1, days + 1)),
+                               index=selected_day - 1 if selected_day else 0)
         activity_type = st.selectbox("Activity Type", [
             "Food", "Accommodation", "Sightseeing", "Meeting", 
             "Activity", "Rest", "Transportation", "Other"
@@ -206,87 +284,167 @@ def add_new_activity(itinerary, days, itineraries, save_callback):
                 "date": activity_date.strftime("%Y-%m-%d")
             }
             
-            # Add to itinerary
-            itinerary["activities"].append(new_activity)
-            save_callback()
+            # Add to itinerary, keeping the loaded day in time order
+            save_itinerary_change(add_activity, itinerary, new_activity)
+            if selected_day in (None, day_num):
+                insort(activities_by_day[day_num], new_activity, key=lambda a: a["time"])
             st.success(f"Activity '{activity_name}' added successfully!")
         else:
             st.error("Please enter an activity name.")
 
-def display_activities_by_day(itinerary, days, start_date, itineraries, save_callback):
-    activities = itinerary.get("activities", [])
-    
-    # Group activities by day
-    activities_by_day = {}
-    for day in range(1, days + 1):
-        day_date = start_date + timedelta(days=day - 1)
-        day_str = day_date.strftime("%A, %d %B %Y")
-        activities_by_day[day] = {
-            "date_str": day_str,
-            "activities": [a for a in activities if a["day"] == day]
-        }
-        # Sort activities by time
-        activities_by_day[day]["activities"].sort(key=lambda x: x["time"])
-    
-    # Display activities for each day with tabs
+def display_activities_by_day(itinerary, days, start_date, activities_by_day, conflicts, places):
+    # Display activities for each day with tabs; Streamlit runs every tab's body
     tabs = st.tabs([f"Day {day}" for day in range(1, days + 1)])
     
     for day, tab in enumerate(tabs, 1):
         with tab:
-            st.markdown(f"<h2 style='color: #4CAF50;'>{activities_by_day[day]['date_str']}</h2>", unsafe_allow_html=True)
+            display_day(itinerary, day, start_date, activities_by_day[day], conflicts, places)
+
+def display_day(itinerary, day, start_date, day_activities, conflicts, places):
+    """Timeline of one day's activities, already in time order"""
+    day_str = (start_date + timedelta(days=day - 1)).strftime("%A, %d %B %Y")
+    st.markdown(f"<h2 style='color: #4CAF50;'>{day_str}</h2>", unsafe_allow_html=True)
+    
+    if not day_activities:
+        st.info(f"No activities planned for Day {day} yet.")
+        return
+    
+    tight_legs, better_route = check_day_travel(day_activities, places)
+    
+    for i, activity in enumerate(day_activities):
+        # Use Streamlit's native components instead of custom HTML
+        with st.container():
+            cols = st.columns([1, 5])
+            
+            # Time column
+            with cols[0]:
+                st.markdown(f"**{activity['time']}**")
             
-            day_activities = activities_by_day[day]["activities"]
-            if not day_activities:
-                st.info(f"No activities planned for Day {day} yet.")
-            else:
-                for i, activity in enumerate(day_activities):
-                    # Use Streamlit's native components instead of custom HTML
-                    with st.container():
-                        cols = st.columns([1, 5])
-                        
-                        # Time column
-                        with cols[0]:
-                            st.markdown(f"**{activity['time']}**")
-                        
-                        # Activity details column
-                        with cols[1]:
-                            # Create a container with colored border using minimal HTML
-                            activity_color = get_activity_color(activity['type'])
-                            st.markdown(f"<div style='border-left: 4px solid {activity_color}; padding-left: 10px;'>", unsafe_allow_html=True)
-                            
-                            # Activity icon and name
-                            icon = get_activity_icon(activity)
-                            st.markdown(f"### {icon} {activity['name']} ({activity['duration']} min)")
-                            
-                            # Activity type information
-                            type_info = f"{activity['type']}"
-                            if activity.get('transport_type'):
-                                type_info += f" - {activity['transport_type']}"
-                            st.markdown(f"*{type_info}*")
-                            
-                            # Location if available
-                            if activity['location']:
-                                st.markdown(f"📍 {activity['location']}")
-                            
-                            # Notes if available
-                            if activity['notes']:
-                                st.markdown(f"📝 *{activity['notes']}*")
-                            
-                            # Close the div
-                            st.markdown("</div>", unsafe_allow_html=True)
-                            
-                            # Action buttons
-                            button_cols = st.columns(2)
-                            with button_cols[0]:
-                                if st.button("Edit", key=f"edit_{activity['id']}"):
-                                    st.session_state.editing_activity = activity["id"]
-                                    st.rerun()
-                            with button_cols[1]:
-                                if st.button("Delete", key=f"delete_{activity['id']}"):
-                                    itinerary["activities"].remove(activity)
-                                    save_callback()
-                                    st.success("Activity deleted!")
-                                    st.rerun()
+            # Activity details column
+            with cols[1]:
+                # Create a container with colored border using minimal HTML
+                activity_color = get_activity_color(activity['type'])
+                st.markdown(f"<div style='border-left: 4px solid {activity_color}; padding-left: 10px;'>", unsafe_allow_html=True)
+                
+                # Activity icon and name
+                icon = get_activity_icon(activity)
+                st.markdown(f"### {icon} {activity['name']} ({activity['duration']} min)")
+                
+                # Activity type information
+                type_info = f"{activity['type']}"
+                if activity.get('transport_type'):
+                    type_info += f" - {activity['transport_type']}"
+                st.markdown(f"*{type_info}*")
+                
+                # Location if available
+                if activity['location']:
+                    st.markdown(f"📍 {activity['location']}")
+                
+                # Notes if available
+                if activity['notes']:
+                    st.markdown(f"📝 *{activity['notes']}*")
+                
+                # Conflicts found by the sweep
+                for conflict in conflicts.get(activity["id"], []):
+                    st.warning(describe_conflict(conflict))
+                if activity["id"] in tight_legs:
+                    st.warning(tight_legs[activity["id"]])
+                
+                # Close the div
+                st.markdown("</div>", unsafe_allow_html=True)
+                
+                # Action buttons
+                button_cols = st.columns(2)
+                with button_cols[0]:
+                    if st.button("Edit", key=f"edit_{activity['id']}"):
+                        st.session_state.editing_activity = activity["id"]
+                        st.rerun()
+                with button_cols[1]:
+                    if st.button("Delete", key=f"delete_{activity['id']}"):
+                        itinerary["activities"].remove(activity)
+                        save_itinerary_change(delete_activity, itinerary, activity["id"])
+                        st.success("Activity deleted!")
+                        st.rerun()
+                
+                if st.session_state.editing_activity == activity["id"]:
+                    edit_activity(itinerary, activity)
+    
+    if better_route:
+        st.info(better_route)
+
+def edit_activity(itinerary, activity):
+    key = activity["id"]
+    activity_name = st.text_input("Activity Name", activity["name"], key=f"edit_name_{key}")
+    col1, col2 = st.columns(2)
+    with col1:
+        activity_time = st.time_input("Time", datetime.strptime(activity["time"], "%H:%M").time(),
+                                      key=f"edit_time_{key}")
+    with col2:
+        activity_duration = st.number_input("Duration (minutes)", min_value=15, value=int(activity["duration"]),
+                                            step=15, key=f"edit_duration_{key}")
+    activity_location = st.text_input("Location/Address", activity["location"] or "", key=f"edit_location_{key}")
+    notes = st.text_area("Notes", activity["notes"] or "", key=f"edit_notes_{key}")
+    
+    button_cols = st.columns(2)
+    with button_cols[0]:
+        if st.button("Save", key=f"save_{key}"):
+            if not activity_name:
+                st.error("Please enter an activity name.")
+                return
+            updated = dict(activity, name=activity_name, time=activity_time.strftime("%H:%M"),
+                           duration=activity_duration, location=activity_location, notes=notes)
+            save_itinerary_change(update_activity, itinerary, updated)
+            st.session_state.editing_activity = None
+            st.success("Activity updated!")
+            st.rerun()
+    with button_cols[1]:
+        if st.button("Cancel", key=f"cancel_{key}"):
+            st.session_state.editing_activity = None
+            st.rerun()
+
+def check_day_travel(day_activities, places):
+    """Flag legs with less time between activities than the trip takes, and suggest a shorter order.
+
+    Distances and travel times between all of the day's located stops come from one
+    broadcast over their coordinates. Returns (warning per activity id, suggestion or None).
+    """
+    stops = [(activity, places[activity["location"]]) for activity in day_activities
+             if places.get(activity["location"])]
+    if len(stops) < 2:
+        return {}, None
+    
+    distances = distance_matrix_km([place.latitude for _, place in stops], [place.longitude for _, place in stops])
+    minutes = travel_minutes(distances)
+    
+    # Only back-to-back activities are checked; with an unlocated one in between, the
+    # traveller's route (and where the time goes) is unknown
+    stop_index = {activity["id"]: i for i, (activity, _) in enumerate(stops)}
+    tight_legs = {}
+    for previous, activity in zip(day_activities, day_activities[1:]):
+        if previous["id"] not in stop_index or activity["id"] not in stop_index:
+            continue
+        i, j = stop_index[previous["id"]], stop_index[activity["id"]]
+        gap = time_to_minutes(activity["time"]) - time_to_minutes(previous["time"]) - int(previous["duration"])
+        if minutes[i, j] > gap:
+            tight_legs[activity["id"]] = (f"🚕 About {minutes[i, j]:.0f} min ({distances[i, j]:.1f} km) "
+                                          f"from {previous['name']}, but only {max(gap, 0)} min between them")
+    
+    better_route = None
+    if 3 <= len(stops) <= MAX_ROUTE_STOPS:
+        current = route_length(distances, list(range(len(stops))))
+        route = shortest_route(distances)
+        shortest = route_length(distances, route)
+        if shortest < current * (1 - MIN_ROUTE_SAVING):
+            better_route = (f"🧭 Visiting in this order would cut the day's travel from {current:.1f} km to "
+                            f"{shortest:.1f} km: " + " → ".join(stops[stop][0]["name"] for stop in route))
+    return tight_legs, better_route
+
+def describe_conflict(conflict):
+    if conflict["kind"] == "overlap":
+        return f"⚠️ Overlaps {conflict['other_name']} ({conflict['other_time']}) by {conflict['minutes']} min"
+    return (f"⏱️ Only {conflict['minutes']} min after {conflict['other_name']} ({conflict['other_time']}) "
+            f"ends; allow at least {MIN_CONNECTION_GAP} min around transport")
+
 def get_activity_icon(activity):
     """Get icon based on activity type with transport-specific icons"""
     if activity['type'] == "Transportation":
@@ -372,12 +530,47 @@ def add_timeline_styles():
     </style>
     """, unsafe_allow_html=True)
 
-def export_itinerary(itinerary):
-    activities = sorted(itinerary["activities"], key=lambda x: (x["day"], x["time"]))
-    
-    # Create DataFrame for export
-    df = pd.DataFrame(activities)
-    return df
+def export_itineraries():
+    st.subheader("Export Itinerary")
+    summaries = {summary.id: summary for summary in list_itinerary_summaries()}
+    if not summaries:
+        st.info("No itineraries available to export.")
+        return
+
+    export_all = st.radio("Itineraries", ["One itinerary", "All itineraries"], horizontal=True) == "All itineraries"
+    if export_all:
+        itinerary_ids = None
+        file_name = "itineraries.zip"
+    else:
+        selected_id = st.selectbox("Select Itinerary to Export", list(summaries),
+                                   format_func=lambda i: f"{summaries[i].name} ({summaries[i].destination})")
+        itinerary_ids = [selected_id]
+        file_name = f"{summaries[selected_id].name}_itinerary.zip"
+    formats = st.multiselect("Formats", EXPORT_FORMATS, default=EXPORT_FORMATS)
+
+    # The zip is built only when the download is clicked, on Streamlit's download thread;
+    # the report dict lives in session state so the next rerun can show how it went
+    if "export_report" not in st.session_state:
+        st.session_state.export_report = {}
+    report_holder = st.session_state.export_report
+
+    def build_export():
+        buffer = io.BytesIO()
+        report_holder["report"] = write_itinerary_zip(buffer, itinerary_ids, formats)
+        return buffer
+
+    st.download_button(
+        label="Download export",
+        data=build_export,
+        file_name=file_name,
+        mime="application/zip",
+        disabled=not formats
+    )
+
+    report = report_holder.get("report")
+    if report is not None:
+        st.caption(f"Last export: {report.activities} activities from {report.itineraries} itineraries, "
+                   f"{report.size_bytes / 1024:,.1f} KB in {report.seconds * 1000:,.0f} ms")
 
 if __name__ == "__main__":
     show_travel_planner()
\ No newline at end of file
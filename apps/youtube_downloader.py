@@ -11,10 +11,24 @@ import requests
 import webbrowser
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+from utils.disk_cache import DiskCache
 
-# Create a cache directory if it doesn't exist
-if not os.path.exists('cache'):
-    os.makedirs('cache')
+CACHE_DIR = 'cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+DAY = 24 * 60 * 60
+CACHE_TTLS = {
+    "info": 7 * DAY,  # titles and descriptions do get edited
+    "transcript": 30 * DAY,
+    "pytube_transcript": 30 * DAY,
+}
+
+# Entries from before the cache was sharded were flat JSON files; they are dropped
+os.makedirs(CACHE_DIR, exist_ok=True)
+for name in os.listdir(CACHE_DIR):
+    if name.endswith('.json'):
+        os.remove(os.path.join(CACHE_DIR, name))
+
+youtube_cache = DiskCache(CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTLS)
 
 # List of free proxies - you can update this list with working proxies
 # Format: "http://ip:port"
@@ -33,31 +47,21 @@ def extract_video_id(url):
     match = re.search(r"(?:v=|youtu\.be/|embed/)([\w-]{11})", url)
     return match.group(1) if match else None
 
+@youtube_cache.cached("info")
+def fetch_video_info(video_id):
+    yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+    return {
+        "title": yt.title,
+        "author": yt.author,
+        "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/0.jpg",
+        "length": yt.length,
+        "description": yt.description
+    }
+
 def get_video_info(video_id):
     """Get video information using pytube"""
     try:
-        cache_file = f'cache/{video_id}_info.json'
-        
-        # Check if info is cached
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-                
-        # Get fresh info
-        yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
-        info = {
-            "title": yt.title,
-            "author": yt.author,
-            "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/0.jpg",
-            "length": yt.length,
-            "description": yt.description
-        }
-        
-        # Cache the info
-        with open(cache_file, 'w') as f:
-            json.dump(info, f)
-            
-        return info
+        return fetch_video_info(video_id)
     except Exception as e:
         st.warning(f"Could not get complete video info: {str(e)}")
         return {
@@ -68,15 +72,9 @@ def get_video_info(video_id):
             "description": ""
         }
 
+@youtube_cache.cached("transcript")
 def get_transcript_with_api(video_id):
     """Get transcript using youtube_transcript_api with proxy support"""
-    cache_file = f'cache/{video_id}_transcript.json'
-    
-    # Check if transcript is cached
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            return json.load(f)
-    
     # Try with proxy if available
     proxy = get_random_proxy()
     try:
@@ -86,25 +84,13 @@ def get_transcript_with_api(video_id):
             os.environ["HTTPS_PROXY"] = proxy
         
         # Try getting English transcript
-        transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-        
-        # Cache the result
-        with open(cache_file, 'w') as f:
-            json.dump(transcript, f)
-            
-        return transcript
+        return YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
     except (TranscriptsDisabled, NoTranscriptFound):
         # Try listing available transcripts
         try:
             transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
             available_transcript = transcripts.find_generated_transcript(['en', 'en-US'])
-            transcript = available_transcript.fetch()
-            
-            # Cache the result
-            with open(cache_file, 'w') as f:
-                json.dump(transcript, f)
-                
-            return transcript
+            return available_transcript.fetch()
         except Exception as e:
             st.warning(f"Could not find any English transcripts: {str(e)}")
             return None
@@ -117,16 +103,10 @@ def get_transcript_with_api(video_id):
             os.environ.pop("HTTP_PROXY", None)
             os.environ.pop("HTTPS_PROXY", None)
 
+@youtube_cache.cached("pytube_transcript")
 def get_transcript_with_pytube(video_id):
     """Fallback method to get captions using pytube directly"""
     try:
-        cache_file = f'cache/{video_id}_pytube_transcript.json'
-        
-        # Check if transcript is cached
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        
         yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
         caption_tracks = yt.captions
         
@@ -166,10 +146,6 @@ def get_transcript_with_pytube(video_id):
                 'duration': duration
             })
         
-        # Cache the result
-        with open(cache_file, 'w') as f:
-            json.dump(lines, f)
-            
         return lines
     except Exception as e:
         st.warning(f"Error getting transcript with pytube: {str(e)}")
@@ -220,6 +196,10 @@ def show_youtube_downloader():
         use_proxies = st.checkbox("Use Proxy Rotation (if available)", value=PROXIES != [])
         use_fallback = st.checkbox("Use Pytube fallback if transcript API fails", value=True)
         clear_cache = st.checkbox("Clear cache for this video", value=False)
+        stats = youtube_cache.stats()
+        st.caption(f"Cache: {stats.entries} entries, {stats.total_bytes / 1024 / 1024:.1f} MB · "
+                   f"{stats.hits} hits, {stats.misses} misses ({stats.expired} expired), "
+                   f"{stats.evictions} evictions")
     
     # Check if redirect was clicked in previous run
     if st.session_state.redirect_clicked:
@@ -242,15 +222,8 @@ def show_youtube_downloader():
             st.stop()
         
         # Clear cache if requested
-        if clear_cache:
-            for cache_file in [
-                f'cache/{video_id}_info.json',
-                f'cache/{video_id}_transcript.json',
-                f'cache/{video_id}_pytube_transcript.json'
-            ]:
-                if os.path.exists(cache_file):
-                    os.remove(cache_file)
-                    st.success(f"Cleared cache for {video_id}")
+        if clear_cache and youtube_cache.invalidate(video_id):
+            st.success(f"Cleared cache for {video_id}")
         
         # Display loading indicator
         with st.spinner("Fetching video information..."):
@@ -0,0 +1,220 @@
+"""Benchmark the expense_tracker pages headlessly at several data sizes.
+
+    python -m benchmarks.bench_expense_pages --rows 10k 1M --out bench_report.json
+    python -m benchmarks.bench_expense_pages --rows 10k --compare bench_report.json
+
+Each page is rendered through Streamlit's AppTest against a generated database,
+once cold (process caches dropped) and then --repeat times warm. Wall time, the
+number of SQL statements executed and the peak Python memory are recorded in a
+JSON report that --compare diffs against an earlier run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+from apps import expense_tracker
+from benchmarks.generate_expense_data import generate_expense_data, parse_rows
+from utils import expense_queries, write_queue
+from utils.db import EXPENSE_DB_NAME, get_user_db_path
+
+PAGES = {
+    "Dashboard": "show_dashboard",
+    "Transactions": "show_transactions_page",
+    "Accounts": "show_accounts_page",
+    "Statistics": "show_statistics_page",
+}
+METRICS = ["cold_wall_s", "warm_wall_s", "cold_sql_statements", "warm_sql_statements", "peak_memory_mb"]
+REGRESSION_THRESHOLD = 1.10
+BENCH_USER = "bench"
+
+def _render_page(page_function, username):
+    """AppTest script: render a single expense_tracker page"""
+    import streamlit as st
+    from apps import expense_tracker
+    st.session_state.auth_username = username
+    expense_tracker.init_database()
+    expense_tracker.init_session_state()
+    getattr(expense_tracker, page_function)()
+
+class SqlStatementCounter:
+    """Count statements on every connection opened while active, and on the pooled read and
+    write-queue connections, which may have been opened before"""
+
+    def __init__(self):
+        self.count = 0
+        self._connect = sqlite3.connect
+        self._lock = threading.Lock()
+
+    def _counting_connect(self, *args, **kwargs):
+        conn = self._connect(*args, **kwargs)
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, statement):
+        # Statements also arrive from the write queue's thread
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self):
+        sqlite3.connect = self._counting_connect
+        expense_queries.set_statement_trace(self._trace)
+        write_queue.set_statement_trace(self._trace)
+        return self
+
+    def __exit__(self, *exc_info):
+        sqlite3.connect = self._connect
+        expense_queries.set_statement_trace(None)
+        write_queue.set_statement_trace(None)
+
+def _run_page(page_function, timeout, trace_memory=False):
+    """Render a page once and return (wall seconds, SQL statements, peak bytes, errors)"""
+    app = AppTest.from_function(_render_page, kwargs={"page_function": page_function, "username": BENCH_USER},
+                                default_timeout=timeout)
+    if trace_memory:
+        tracemalloc.start()
+    with SqlStatementCounter() as counter:
+        started = time.perf_counter()
+        app.run()
+        wall = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    errors = [exception.message for exception in app.exception]
+    return wall, counter.count, peak, errors
+
+def bench_page(page_function, repeat, timeout):
+    """Cold run with process caches dropped, repeat warm runs, then one traced run for memory.
+
+    Memory is measured separately because tracemalloc slows the traced run down.
+    """
+    expense_tracker.invalidate_caches(get_user_db_path(EXPENSE_DB_NAME, BENCH_USER))
+    cold_wall, cold_statements, _, errors = _run_page(page_function, timeout)
+
+    warm_walls = []
+    warm_statements = cold_statements
+    for _ in range(repeat):
+        wall, warm_statements, _, run_errors = _run_page(page_function, timeout)
+        warm_walls.append(wall)
+        errors.extend(run_errors)
+
+    _, _, peak, run_errors = _run_page(page_function, timeout, trace_memory=True)
+    errors.extend(run_errors)
+
+    return {
+        "cold_wall_s": round(cold_wall, 4),
+        "warm_wall_s": round(statistics.median(warm_walls), 4) if warm_walls else None,
+        "cold_sql_statements": cold_statements,
+        "warm_sql_statements": warm_statements,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "errors": sorted(set(errors)),
+    }
+
+def prepare_database(workdir, rows, seed):
+    """Generate (or reuse) the database for one size and make it the app's working directory"""
+    size_dir = os.path.join(workdir, str(rows))
+    os.makedirs(size_dir, exist_ok=True)
+    os.chdir(size_dir)
+    db_path = get_user_db_path(EXPENSE_DB_NAME, BENCH_USER)
+    marker = db_path + f".seed{seed}"
+    if not os.path.exists(marker):
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        started = time.perf_counter()
+        generate_expense_data(db_path, rows, seed=seed)
+        print(f"  generated {rows:,} rows in {time.perf_counter() - started:.1f}s")
+        open(marker, "w").close()
+    expense_tracker.invalidate_caches(db_path)
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_reports(baseline, current):
+    """Print metric ratios between two reports and return the number of regressions"""
+    regressions = 0
+    print(f"\nComparison against {baseline.get('git_commit') or 'baseline'}:")
+    for rows, pages in current["results"].items():
+        for page, metrics in pages.items():
+            previous = baseline.get("results", {}).get(rows, {}).get(page)
+            if not previous:
+                continue
+            for metric in METRICS:
+                old, new = previous.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                ratio = new / old
+                flag = ""
+                if ratio > REGRESSION_THRESHOLD:
+                    flag = "  <-- regression"
+                    regressions += 1
+                print(f"  {rows:>10} {page:<13} {metric:<20} {old:>10} -> {new:>10}  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", nargs="+", default=["10k"], help="dataset sizes, e.g. 10k 1M 10M")
+    parser.add_argument("--pages", nargs="+", default=list(PAGES), choices=list(PAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="warm runs per page")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per page render")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "expense_tracker_bench"),
+                        help="generated databases are kept here and reused between runs")
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--compare", help="earlier report to diff against")
+    args = parser.parse_args()
+
+    out_path = os.path.abspath(args.out)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": {},
+    }
+    for size in args.rows:
+        rows = parse_rows(size)
+        print(f"{rows:,} transactions")
+        prepare_database(args.workdir, rows, args.seed)
+        report["results"][str(rows)] = {}
+        for page in args.pages:
+            metrics = bench_page(PAGES[page], args.repeat, args.timeout)
+            report["results"][str(rows)][page] = metrics
+            print(f"  {page:<13} cold {metrics['cold_wall_s']:.3f}s  warm {metrics['warm_wall_s']}s  "
+                  f"sql {metrics['cold_sql_statements']}/{metrics['warm_sql_statements']}  "
+                  f"peak {metrics['peak_memory_mb']} MB" + (f"  errors: {metrics['errors']}" if metrics['errors'] else ""))
+
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {out_path}")
+
+    if baseline:
+        regressions = compare_reports(baseline, report)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
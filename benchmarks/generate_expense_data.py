@@ -0,0 +1,189 @@
+"""Fill an expense_tracker database with realistic synthetic data.
+
+    python -m benchmarks.generate_expense_data --rows 1M --user admin
+
+Row counts accept k/M suffixes (10k, 1M, 10M). The same seed always produces
+the same database, so benchmark runs on different commits see identical data.
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.expense_tracker import init_database, after_transactions_written
+from utils.db import EXPENSE_DB_NAME, get_user_db_path
+
+# Log-normal (mu, sigma) of the amount per category, in USD
+CATEGORY_AMOUNTS = {
+    "Food & Dining": (2.8, 0.6),
+    "Transportation": (3.0, 0.7),
+    "Utilities": (4.3, 0.4),
+    "Entertainment": (3.3, 0.8),
+    "Shopping": (3.8, 1.0),
+    "Health": (3.9, 1.0),
+    "Salary": (8.0, 0.1),
+    "Investment": (5.5, 1.0),
+    "Gift": (4.0, 0.8),
+}
+EXTRA_EXPENSE_CATEGORIES = ["Groceries", "Rent", "Insurance", "Education", "Travel", "Subscriptions",
+                            "Pets", "Gifts Given", "Home Repair", "Personal Care", "Taxes", "Charity"]
+DESCRIPTIONS = ["", "weekly shop", "with friends", "online order", "monthly bill", "refund pending",
+                "card payment", "split with roommate", "cash", "auto-pay"]
+ACCOUNT_TYPES = ["Bank Account", "Cash", "Credit Card", "Savings", "Investment"]
+CURRENCY_SCALE = {"USD": 1.0, "EUR": 0.92, "INR": 83.0}
+TYPE_SHARES = {"expense": 0.93, "income": 0.02, "transfer": 0.05}
+CHUNK_ROWS = 200_000
+
+def parse_rows(value):
+    """Parse a row count such as 10k, 1M or 2500"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = value[-1].lower()
+    if suffix in multipliers:
+        return int(float(value[:-1]) * multipliers[suffix])
+    return int(value)
+
+def _seed_reference_data(cursor, rng, rows):
+    """Create accounts and extra categories; return account currencies and category amount params"""
+    account_count = int(np.clip(rows // 200_000 + 4, 4, 50))
+    currencies = ["USD"] + list(rng.choice(["USD", "USD", "USD", "EUR", "INR"], size=account_count - 1))
+    cursor.executemany('''
+    INSERT INTO accounts (name, type, currency, initial_balance) VALUES (?, ?, ?, ?)
+    ''', [(f"{ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)]} {i + 1}", ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)],
+           currency, round(float(rng.uniform(0, 5000)) * CURRENCY_SCALE[currency], 2))
+          for i, currency in enumerate(currencies)])
+
+    cursor.executemany('''
+    INSERT INTO categories (name, type, icon, color) VALUES (?, 'expense', '📌', '#607D8B')
+    ''', [(name,) for name in EXTRA_EXPENSE_CATEGORIES])
+
+    cursor.execute("SELECT id, name, type FROM categories ORDER BY id")
+    categories = {"expense": [], "income": []}
+    for category_id, name, category_type in cursor.fetchall():
+        mu, sigma = CATEGORY_AMOUNTS.get(name, (float(rng.uniform(2.5, 5.0)), float(rng.uniform(0.4, 1.0))))
+        categories[category_type].append((category_id, mu, sigma))
+
+    cursor.execute("SELECT id, currency FROM accounts ORDER BY id")
+    accounts = cursor.fetchall()
+    return accounts, categories
+
+def _seed_fx_rates(cursor, rng, start, days):
+    """Random-walk daily rates for every non-USD currency"""
+    rows = []
+    for currency, base in CURRENCY_SCALE.items():
+        if currency == "USD":
+            continue
+        walk = base * np.exp(np.cumsum(rng.normal(0, 0.003, size=days)))
+        dates = (start + np.arange(days)).astype(str)
+        rows.extend(zip([currency] * days, dates.tolist(), np.round(walk, 6).tolist()))
+    cursor.executemany("INSERT OR REPLACE INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)", rows)
+
+def _generate_chunk(rng, first_row, size, accounts, categories, start, day_bounds):
+    """Build one chunk of transaction rows with vectorized draws"""
+    types = rng.choice(list(TYPE_SHARES), size=size, p=list(TYPE_SHARES.values()))
+    # Rows are dated in id order, as if entered day by day
+    days = np.searchsorted(day_bounds, np.arange(first_row, first_row + size), side="right")
+    dates = (start + days).astype(str)
+
+    account_weights = 1.0 / np.arange(1, len(accounts) + 1)
+    account_index = rng.choice(len(accounts), size=size, p=account_weights / account_weights.sum())
+    to_index = (account_index + rng.integers(1, len(accounts), size=size)) % len(accounts)
+
+    category_ids = np.zeros(size, dtype=np.int64)
+    amounts = np.zeros(size)
+    for category_type in ("expense", "income"):
+        mask = types == category_type
+        params = categories[category_type]
+        # Earlier categories (the defaults) are used more often than the extras
+        weights = 1.0 / np.arange(1, len(params) + 1) ** 0.7
+        picks = rng.choice(len(params), size=mask.sum(), p=weights / weights.sum())
+        ids, mus, sigmas = (np.array(column) for column in zip(*params))
+        category_ids[mask] = ids[picks]
+        amounts[mask] = rng.lognormal(mus[picks], sigmas[picks])
+    transfers = types == "transfer"
+    amounts[transfers] = rng.lognormal(5.0, 0.8, size=transfers.sum())
+
+    account_ids = np.array([account[0] for account in accounts])
+    scales = np.array([CURRENCY_SCALE[account[1]] for account in accounts])
+    amounts = np.round(amounts * scales[account_index], 2)
+    descriptions = rng.choice(DESCRIPTIONS, size=size)
+
+    category_column = np.where(transfers, None, category_ids.astype(object))
+    to_account_column = np.where(transfers, account_ids[to_index].astype(object), None)
+    description_column = np.where(descriptions == "", None, descriptions.astype(object))
+
+    return list(zip(types.tolist(), amounts.tolist(), dates.tolist(), category_column.tolist(),
+                    account_ids[account_index].tolist(), to_account_column.tolist(),
+                    description_column.tolist()))
+
+def generate_expense_data(db_path, rows, seed=42, years=5, verbose=False):
+    """Create db_path (if needed) and add rows synthetic transactions spread over the last years"""
+    init_database(db_path)
+    rng = np.random.default_rng(seed)
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # Bulk load: durability is irrelevant for a generated database
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA journal_mode = MEMORY")
+
+    accounts, categories = _seed_reference_data(cursor, rng, rows)
+
+    days = years * 365
+    start = np.datetime64(datetime.date.today()) - days + 1
+    _seed_fx_rates(cursor, rng, start, days)
+
+    # More spending at weekends and a slow upward drift over the years
+    weekday = (np.arange(days) + (start.astype("datetime64[D]").astype(int) + 3)) % 7
+    day_weights = np.where(weekday >= 5, 1.3, 1.0) * np.linspace(0.8, 1.2, days)
+    day_weights /= day_weights.sum()
+    day_bounds = np.cumsum(rng.multinomial(rows, day_weights))
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions")
+    first_id = cursor.fetchone()[0]
+    written = 0
+    started = time.perf_counter()
+    while written < rows:
+        size = min(CHUNK_ROWS, rows - written)
+        cursor.executemany('''
+        INSERT INTO transactions (type, amount, date, category_id, account_id, to_account_id, description)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', _generate_chunk(rng, written, size, accounts, categories, start, day_bounds))
+        written += size
+        if verbose:
+            print(f"  {written:,} / {rows:,} rows ({time.perf_counter() - started:.1f}s)")
+
+    # Derived tables go through the same bookkeeping as the app's own write path
+    after_transactions_written(cursor, first_id)
+
+    # A few budgets so the budget widgets have something to show
+    cursor.executemany('''
+    INSERT OR IGNORE INTO budgets (category_id, period, amount) VALUES (?, ?, ?)
+    ''', [(category_id, "monthly", round(float(np.exp(mu)) * 40, -1))
+          for category_id, mu, _ in categories["expense"][:5]])
+
+    conn.commit()
+    conn.close()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10k", help="number of transactions, e.g. 10k, 1M, 10M")
+    parser.add_argument("--user", default="admin", help="user whose database is filled")
+    parser.add_argument("--db", help="database file to fill instead of the user's")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=5, help="history length ending today")
+    args = parser.parse_args()
+
+    db_path = args.db or get_user_db_path(EXPENSE_DB_NAME, args.user)
+    started = time.perf_counter()
+    rows = generate_expense_data(db_path, parse_rows(args.rows), seed=args.seed, years=args.years, verbose=True)
+    print(f"Wrote {rows:,} transactions to {db_path} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
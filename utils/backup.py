@@ -0,0 +1,133 @@
+import os
+import gzip
+import shutil
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+BACKUP_ROOT = "backups"
+SNAPSHOT_RETENTION = 20        # newest snapshots kept per database
+SNAPSHOT_MAX_AGE_DAYS = 90     # older snapshots are dropped, except the newest one
+BACKUP_PAGES_PER_STEP = 256    # pages copied before the source lock is released again
+BACKUP_STEP_SLEEP = 0.005      # seconds writers get between steps
+
+_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+
+@dataclass
+class Snapshot:
+    path: str
+    created_at: datetime
+    reason: str
+    size: int
+
+def get_snapshot_dir(db_path):
+    """Directory holding the snapshots of one database file"""
+    relative = os.path.splitext(os.path.normpath(db_path))[0].lstrip(os.sep)
+    return os.path.join(BACKUP_ROOT, relative)
+
+def _copy_database(source, target):
+    """Copy one SQLite database into another in small steps with the online backup API"""
+    target.execute("PRAGMA busy_timeout = 5000")
+    source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+
+def snapshot_database(db_path, reason="manual") -> Optional[Snapshot]:
+    """Write a gzip-compressed snapshot of a live database and apply retention.
+
+    Returns None if the database does not exist yet.
+    """
+    if not os.path.exists(db_path):
+        return None
+
+    snapshot_dir = get_snapshot_dir(db_path)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    created_at = datetime.now()
+    name = f"{created_at.strftime(_TIMESTAMP_FORMAT)}__{reason}.db.gz"
+    path = os.path.join(snapshot_dir, name)
+
+    fd, raw_path = tempfile.mkstemp(suffix=".db", dir=snapshot_dir)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(raw_path)
+        try:
+            _copy_database(source, target)
+        finally:
+            target.close()
+            source.close()
+
+        # Compress to a side file and rename, so a crash never leaves a truncated snapshot
+        with open(raw_path, "rb") as raw, gzip.open(path + ".part", "wb") as compressed:
+            shutil.copyfileobj(raw, compressed)
+        os.replace(path + ".part", path)
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    rotate_snapshots(db_path)
+    return Snapshot(path=path, created_at=created_at, reason=reason, size=os.path.getsize(path))
+
+def list_snapshots(db_path) -> List[Snapshot]:
+    """Snapshots of a database, newest first"""
+    snapshot_dir = get_snapshot_dir(db_path)
+    if not os.path.isdir(snapshot_dir):
+        return []
+
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        if not name.endswith(".db.gz"):
+            continue
+        timestamp, _, reason = name[:-len(".db.gz")].partition("__")
+        try:
+            created_at = datetime.strptime(timestamp, _TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+        path = os.path.join(snapshot_dir, name)
+        snapshots.append(Snapshot(path=path, created_at=created_at, reason=reason,
+                                  size=os.path.getsize(path)))
+    snapshots.sort(key=lambda snapshot: snapshot.created_at, reverse=True)
+    return snapshots
+
+def rotate_snapshots(db_path, keep=SNAPSHOT_RETENTION, max_age_days=SNAPSHOT_MAX_AGE_DAYS):
+    """Delete snapshots beyond the retention count or age limit"""
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    for index, snapshot in enumerate(list_snapshots(db_path)):
+        if index >= keep or (index > 0 and snapshot.created_at < cutoff):
+            os.remove(snapshot.path)
+
+def restore_snapshot(db_path, snapshot_path):
+    """Restore a snapshot into the live database.
+
+    The current state is snapshotted first, so a restore can itself be undone.
+    Pages are copied through the backup API into the open database rather than
+    by replacing the file, so other connections never see a half-written file.
+    """
+    snapshot_dir = os.path.dirname(snapshot_path)
+    fd, raw_path = tempfile.mkstemp(suffix=".db", dir=snapshot_dir)
+    os.close(fd)
+    try:
+        with gzip.open(snapshot_path, "rb") as compressed, open(raw_path, "wb") as raw:
+            shutil.copyfileobj(compressed, raw)
+
+        # Taken after decompressing, since its rotation may drop the snapshot being restored
+        snapshot_database(db_path, reason="pre-restore")
+
+        source = sqlite3.connect(raw_path)
+        target = sqlite3.connect(db_path)
+        try:
+            _copy_database(source, target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        os.remove(raw_path)
+
+def restore_as_of(db_path, point_in_time) -> Snapshot:
+    """Restore the newest snapshot taken at or before point_in_time"""
+    for snapshot in list_snapshots(db_path):
+        if snapshot.created_at <= point_in_time:
+            restore_snapshot(db_path, snapshot.path)
+            return snapshot
+    raise ValueError(f"No snapshot of {db_path} exists before {point_in_time:%Y-%m-%d %H:%M}")
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+def shard_path(root, key):
+    """Spread files over two directory levels so no directory grows too large"""
+    return os.path.join(root, key[:2], key[2:4], key)
+
+def atomic_write(path, data: bytes):
+    """Write a file so readers only ever see the old or the complete new content"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class BlobStore:
+    """Immutable files named by the SHA-256 of their content; identical uploads are stored once"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest) -> str:
+        return shard_path(self.root, digest)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+        return digest
+
+    def get(self, digest) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def exists(self, digest) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def delete(self, digest):
+        if self.exists(digest):
+            os.remove(self.path(digest))
+
+class LruFileCache:
+    """Files on disk, evicted least recently used first once they exceed max_bytes in total.
+
+    The recency order lives in memory and is rebuilt from file modification times
+    on first use; hits touch the file so the order survives a restart.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: Optional[OrderedDict] = None  # key -> size, least recent first
+        self._total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        found = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                found.append((stat.st_mtime, name, stat.st_size))
+        found.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in found)
+        self._total_bytes = sum(size for _, _, size in found)
+
+    def path(self, key) -> str:
+        return shard_path(self.root, key)
+
+    def get(self, key) -> Optional[str]:
+        """Path of a cached file, or None"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def put(self, key, data: bytes) -> str:
+        path = self.path(key)
+        atomic_write(path, data)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self.path(evicted))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def delete(self, key) -> bool:
+        """Remove a cached file; False if it wasn't cached"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if key not in self._entries:
+                return False
+            self._total_bytes -= self._entries.pop(key)
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return self._total_bytes
+
+_lru_caches: Dict[str, LruFileCache] = {}
+_lru_caches_lock = threading.Lock()
+
+def get_lru_cache(root, max_bytes) -> LruFileCache:
+    """The process-wide cache of a directory, so all threads share one recency order"""
+    with _lru_caches_lock:
+        cache = _lru_caches.get(root)
+        if cache is None:
+            cache = _lru_caches[root] = LruFileCache(root, max_bytes)
+        return cache
@@ -1,9 +1,71 @@
+import os
+import re
 import sqlite3
+import threading
 import pandas as pd
+import streamlit as st
+
+# Every user gets their own database files under DATA_ROOT/<user>/
+DATA_ROOT = 'data'
+EXPENSE_DB_NAME = 'expense_tracker.db'
+CRYPTO_DB_NAME = 'crypto_trades.db'
+STOCKS_DB_NAME = 'stocks_journal.db'
+
+# Travel itineraries are shared by all users, so they live in one file at the top of DATA_ROOT
+TRAVEL_DB_PATH = os.path.join(DATA_ROOT, 'travel_planner.db')
+
+# Shared files from before the per-user split; they move to LEGACY_DATA_OWNER on first use
+LEGACY_DB_PATHS = {
+    EXPENSE_DB_NAME: os.path.join(DATA_ROOT, EXPENSE_DB_NAME),
+    CRYPTO_DB_NAME: 'crypto_trades.db',
+    STOCKS_DB_NAME: 'stocks_journal.db',
+}
+LEGACY_DATA_OWNER = 'admin'
+
+_routed_paths = set()
+_routing_lock = threading.Lock()
+
+def get_current_user():
+    """Username of the logged-in session"""
+    username = st.session_state.get("auth_username")
+    if not username:
+        raise RuntimeError("No user is logged in")
+    return username
+
+def get_user_db_path(db_name, username=None):
+    """Path of one user's copy of a database file, defaulting to the logged-in user"""
+    username = username or get_current_user()
+    user_dir = re.sub(r'[^A-Za-z0-9_.-]', '_', username).lstrip('.') or '_'
+    path = os.path.join(DATA_ROOT, user_dir, db_name)
+    if path not in _routed_paths:
+        with _routing_lock:
+            if path not in _routed_paths:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if username == LEGACY_DATA_OWNER:
+                    _adopt_legacy_database(LEGACY_DB_PATHS[db_name], path)
+                _routed_paths.add(path)
+    return path
+
+def _adopt_legacy_database(legacy_path, path):
+    """Move a shared pre-partitioning database (and any journal) to its owner's directory"""
+    if os.path.exists(path) or not os.path.exists(legacy_path):
+        return
+    # The journal goes first: a hot journal must sit next to the file it belongs to
+    for suffix in ('-journal', '-wal', '-shm', ''):
+        if os.path.exists(legacy_path + suffix):
+            os.replace(legacy_path + suffix, path + suffix)
+
+def get_crypto_db_path(username=None):
+    """Path of a user's crypto trades database"""
+    return get_user_db_path(CRYPTO_DB_NAME, username)
+
+def get_stocks_db_path(username=None):
+    """Path of a user's stocks journal database"""
+    return get_user_db_path(STOCKS_DB_NAME, username)
 
 def init_crypto_db():
     """Initialize crypto database connection"""
-    conn = sqlite3.connect('crypto_trades.db')
+    conn = sqlite3.connect(get_crypto_db_path())
     c = conn.cursor()
     # Create table if it doesn't exist
     c.execute('''
@@ -29,7 +91,7 @@ def init_crypto_db():
 
 def init_stocks_db():
     """Initialize stocks database connection"""
-    conn = sqlite3.connect('stocks_journal.db')
+    conn = sqlite3.connect(get_stocks_db_path())
     c = conn.cursor()
     # Create table if it doesn't exist
     c.execute('''
@@ -0,0 +1,97 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from utils.blob_store import get_lru_cache
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    expired: int  # misses because the entry was past its TTL
+    evictions: int
+    entries: int
+    total_bytes: int
+
+class DiskCache:
+    """JSON values on disk, compressed, per kind of entry with its own time to live.
+
+    Entries are named by a hash of their kind and key, so they spread evenly over
+    the sharded directories of an LruFileCache, which writes them atomically and
+    evicts the least recently used once the cache outgrows max_bytes.
+    """
+
+    def __init__(self, root, max_bytes, ttls: Dict[str, float]):
+        self.ttls = ttls  # kind -> seconds
+        self._files = get_lru_cache(root, max_bytes)
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(kind, key) -> str:
+        return hashlib.sha256(f"{kind}:{key}".encode("utf-8")).hexdigest()
+
+    def _count(self, hit, expired=False):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+                self._expired += expired
+
+    def get(self, kind, key) -> Optional[Any]:
+        """The cached value, or None when it is missing or older than its kind's TTL"""
+        digest = self._digest(kind, key)
+        path = self._files.get(digest)
+        if path is None:
+            self._count(hit=False)
+            return None
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError):
+            # Evicted by another thread meanwhile, or unreadable; either way, fetch again
+            self._files.delete(digest)
+            self._count(hit=False)
+            return None
+        if time.time() - entry["stored_at"] > self.ttls[kind]:
+            self._files.delete(digest)
+            self._count(hit=False, expired=True)
+            return None
+        self._count(hit=True)
+        return entry["value"]
+
+    def put(self, kind, key, value):
+        entry = {"stored_at": time.time(), "value": value}
+        self._files.put(self._digest(kind, key), zlib.compress(json.dumps(entry).encode("utf-8")))
+
+    def invalidate(self, key, kinds=None) -> int:
+        """Drop the entries of a key, of every kind unless given; returns how many there were"""
+        return sum(self._files.delete(self._digest(kind, key)) for kind in (kinds or self.ttls))
+
+    def cached(self, kind):
+        """Decorator caching a one-argument function's results under that argument; None is not cached"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(key):
+                value = self.get(kind, key)
+                if value is None:
+                    value = func(key)
+                    if value is not None:
+                        self.put(kind, key, value)
+                return value
+            return wrapper
+        return decorator
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            hits, misses, expired = self._hits, self._misses, self._expired
+        return CacheStats(hits=hits, misses=misses, expired=expired, evictions=self._files.evictions,
+                          entries=len(self._files), total_bytes=self._files.total_bytes)
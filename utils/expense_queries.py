@@ -0,0 +1,169 @@
+import functools
+import itertools
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+TRANSACTION_COLUMNS = ("id", "type", "amount", "date", "category_id", "account_id", "to_account_id",
+                       "description", "created_at", "category_name", "category_icon", "account_name",
+                       "currency", "to_account_name")
+
+# Filter name -> SQL condition; the order here is the order conditions appear in the statement
+_TRANSACTION_FILTERS = {
+    "start_date": "t.date >= :start_date",
+    "end_date": "t.date <= :end_date",
+    "account_id": "(t.account_id = :account_id OR t.to_account_id = :account_id)",
+    "category_id": "t.category_id = :category_id",
+    "transaction_type": "t.type = :transaction_type",
+}
+
+# numpy dtype of each column when rows are returned column-wise; everything else stays object
+_COLUMN_DTYPES = {"id": np.int64, "amount": np.float64, "account_id": np.int64}
+
+MAX_IDLE_READ_CONNECTIONS = 4
+
+class TransactionRecord:
+    """One transaction with its display names; a fixed-layout record instead of a dict per row.
+
+    Supports tx["name"] and tx.get("name", default) so it drops in where dict rows were used.
+    """
+    __slots__ = TRANSACTION_COLUMNS
+
+    def __init__(self, id, type, amount, date, category_id, account_id, to_account_id, description,
+                 created_at, category_name, category_icon, account_name, currency, to_account_name):
+        self.id = id
+        self.type = type
+        self.amount = amount
+        self.date = date
+        self.category_id = category_id
+        self.account_id = account_id
+        self.to_account_id = to_account_id
+        self.description = description
+        self.created_at = created_at
+        self.category_name = category_name
+        self.category_icon = category_icon
+        self.account_name = account_name
+        self.currency = currency
+        self.to_account_name = to_account_name
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        return f"TransactionRecord(id={self.id!r}, type={self.type!r}, amount={self.amount!r}, date={self.date!r})"
+
+@functools.lru_cache(maxsize=None)
+def compile_transaction_query(filters: frozenset, limited: bool) -> str:
+    """SQL for one combination of filters, built once; the same text also hits sqlite's statement cache"""
+    conditions = [condition for name, condition in _TRANSACTION_FILTERS.items() if name in filters]
+    return f'''
+    SELECT t.id, t.type, t.amount, t.date, t.category_id, t.account_id, t.to_account_id,
+           t.description, t.created_at, c.name, c.icon, a.name, a.currency, a2.name
+    FROM transactions t
+    LEFT JOIN categories c ON t.category_id = c.id
+    JOIN accounts a ON t.account_id = a.id
+    LEFT JOIN accounts a2 ON t.to_account_id = a2.id
+    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+    ORDER BY t.date DESC, t.created_at DESC
+    {"LIMIT :limit" if limited else ""}
+    '''
+
+class _ReadConnectionPool:
+    """Idle read connections of one database file, kept open so their prepared statements survive"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.closed = False
+        self._idle = queue.LifoQueue(maxsize=MAX_IDLE_READ_CONNECTIONS)
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def release(self, conn):
+        if self.closed:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_read_pools: Dict[str, _ReadConnectionPool] = {}
+_read_pools_lock = threading.Lock()
+_statement_trace: Optional[Callable[[str], None]] = None
+
+def set_statement_trace(callback: Optional[Callable[[str], None]]):
+    """Pass every statement run on a pooled connection to callback (None to stop), e.g. to count them"""
+    global _statement_trace
+    _statement_trace = callback
+
+@contextmanager
+def read_connection(db_path):
+    """Borrow a pooled read-only connection to db_path"""
+    with _read_pools_lock:
+        pool = _read_pools.get(db_path)
+        if pool is None:
+            pool = _read_pools[db_path] = _ReadConnectionPool(db_path)
+    conn = pool.acquire()
+    # Set on every borrow, so a pooled connection never keeps an earlier caller's trace
+    conn.set_trace_callback(_statement_trace)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        pool.release(conn)
+
+def close_read_connections(db_path):
+    """Close the pooled connections of db_path, e.g. before the file is replaced"""
+    with _read_pools_lock:
+        pool = _read_pools.pop(db_path, None)
+    if pool is not None:
+        pool.close()
+
+def query_transactions(db_path, start_date=None, end_date=None, account_id=None, category_id=None,
+                       transaction_type=None, limit=None, columns=False):
+    """Transactions matching the filters, newest first.
+
+    Returns a list of TransactionRecord, or with columns=True a dict of one numpy
+    array per column, which is cheaper when the result goes straight into pandas.
+    """
+    params = {"start_date": start_date, "end_date": end_date, "account_id": account_id,
+              "category_id": category_id, "transaction_type": transaction_type, "limit": limit}
+    params = {name: value for name, value in params.items() if value}
+    sql = compile_transaction_query(frozenset(params), "limit" in params)
+
+    with read_connection(db_path) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    if not columns:
+        return list(itertools.starmap(TransactionRecord, rows))
+    return transaction_columns(rows)
+
+def transaction_columns(rows) -> Dict[str, np.ndarray]:
+    """Transpose result rows into one array per column"""
+    if not rows:
+        return {name: np.empty(0, dtype=_COLUMN_DTYPES.get(name, object)) for name in TRANSACTION_COLUMNS}
+    return {name: np.array(values, dtype=_COLUMN_DTYPES.get(name, object))
+            for name, values in zip(TRANSACTION_COLUMNS, zip(*rows))}
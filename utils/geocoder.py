@@ -0,0 +1,181 @@
+import bisect
+import csv
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+import numpy as np
+
+from utils.db import DATA_ROOT
+
+# The bundled gazetteer covers major cities and landmarks; a larger file in the same
+# format at DATA_ROOT/gazetteer.csv is merged in when present
+BUNDLED_GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+LOCAL_GAZETTEER = os.path.join(DATA_ROOT, 'gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0
+ROUTE_FACTOR = 1.3        # roads are longer than the great-circle distance
+TRAVEL_SPEED_KMH = 30.0   # door-to-door average for city travel
+MIN_TRAVEL_MINUTES = 5    # getting out of one place and into the next
+MAX_NGRAM_WORDS = 5
+MIN_PREFIX_LENGTH = 3
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    city: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int
+
+def normalize(text) -> str:
+    """Lower-case, accent-free, single-spaced form used as the index key"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+class Gazetteer:
+    """Place names in a sorted key array, so exact and prefix lookups are binary searches"""
+
+    def __init__(self, paths):
+        self.places: List[Place] = []
+        entries = []
+        for path in paths:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    place = Place(name=row["name"], city=row["city"], country=row["country"],
+                                  latitude=float(row["latitude"]), longitude=float(row["longitude"]),
+                                  population=int(row["population"] or 0))
+                    names = [row["name"]] + [name for name in (row["alternate_names"] or "").split("|") if name]
+                    for name in names:
+                        entries.append((normalize(name), len(self.places)))
+                    self.places.append(place)
+        entries.sort()
+        self._areas = {normalize(area) for place in self.places for area in (place.city, place.country)}
+        self._keys = [key for key, _ in entries]
+        self._place_ids = [place_id for _, place_id in entries]
+        self.fingerprint = hashlib.sha1(
+            "|".join(f"{path}:{os.path.getsize(path)}:{os.path.getmtime(path)}" for path in paths).encode()
+        ).hexdigest()[:16]
+
+    def exact(self, key) -> List[Place]:
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key, lo=start)
+        return [self.places[place_id] for place_id in self._place_ids[start:end]]
+
+    def prefix(self, key, limit=20) -> List[Place]:
+        start = bisect.bisect_left(self._keys, key)
+        matches = []
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(key):
+                break
+            matches.append(self.places[self._place_ids[position]])
+        return matches
+
+    def areas(self, destination) -> Set[str]:
+        """Normalized cities and countries a destination such as "Lisbon, Portugal" covers"""
+        areas = set()
+        for part in (destination or "").split(","):
+            part = normalize(part)
+            if part in self._areas:
+                areas.add(part)
+            for place in self.exact(part):
+                areas.update((normalize(place.city), normalize(place.country)))
+        return areas
+
+    def geocode(self, location, destination=None) -> Optional[Place]:
+        """Best place for a free-text location such as "Colosseum, Rome" or "near the Eiffel Tower".
+
+        Comma-separated parts are tried from the most specific (first) one. A part
+        matches exactly, by a run of its words (longest first), or by prefix;
+        the remaining parts break ties by city or country, then a landmark beats the
+        city it is in, then population decides.
+        When the trip's destination is a known city or country, places outside it
+        are not considered, so "Marina" on a Lisbon trip is not Singapore's.
+        """
+        parts = [normalize(part) for part in (location or "").split(",")]
+        parts = [part for part in parts if part]
+        # Whole parts and their single words, so "Colosseum Rome" is read like "Colosseum, Rome"
+        context = set(parts) | {word for part in parts for word in part.split()}
+        areas = self.areas(destination)
+        inside = lambda place: not areas or normalize(place.city) in areas or normalize(place.country) in areas
+        for part in parts:
+            candidates = [place for place in self.exact(part) if inside(place)] or self._ngram_matches(part, inside)
+            if not candidates and len(part) >= MIN_PREFIX_LENGTH:
+                candidates = [place for place in self.prefix(part) if inside(place)]
+            if candidates:
+                return max(candidates, key=lambda place: (normalize(place.city) in context,
+                                                          normalize(place.country) in context,
+                                                          normalize(place.name) not in self._areas,
+                                                          place.population))
+        return None
+
+    def _ngram_matches(self, part, inside) -> List[Place]:
+        words = part.split()
+        for size in range(min(len(words), MAX_NGRAM_WORDS), 0, -1):
+            matches = []
+            for start in range(len(words) - size + 1):
+                matches.extend(place for place in self.exact(" ".join(words[start:start + size])) if inside(place))
+            if matches:
+                return matches
+        return []
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer() -> Gazetteer:
+    """The process-wide gazetteer, loaded on first use"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            paths = [BUNDLED_GAZETTEER] + ([LOCAL_GAZETTEER] if os.path.exists(LOCAL_GAZETTEER) else [])
+            _gazetteer = Gazetteer(paths)
+        return _gazetteer
+
+def distance_matrix_km(latitudes, longitudes) -> np.ndarray:
+    """Great-circle distance between every pair of points, in one broadcast"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def travel_minutes(distance_km) -> np.ndarray:
+    """Rough door-to-door travel time for the given distances"""
+    minutes = distance_km * ROUTE_FACTOR / TRAVEL_SPEED_KMH * 60
+    return np.where(distance_km > 0, np.maximum(minutes, MIN_TRAVEL_MINUTES), 0.0)
+
+def shortest_route(distances) -> List[int]:
+    """Visiting order from stop 0 through all stops: nearest neighbour, then 2-opt improvement"""
+    count = len(distances)
+    route = [0]
+    unvisited = set(range(1, count))
+    while unvisited:
+        last = route[-1]
+        route.append(min(unvisited, key=lambda stop: distances[last, stop]))
+        unvisited.remove(route[-1])
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, count - 1):
+            for j in range(i + 1, count):
+                # Reversing route[i..j] swaps edges (i-1, i) and (j, j+1) for (i-1, j) and (i, j+1)
+                before = distances[route[i - 1], route[i]]
+                after = distances[route[i - 1], route[j]]
+                if j + 1 < count:
+                    before += distances[route[j], route[j + 1]]
+                    after += distances[route[i], route[j + 1]]
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
+
+def route_length(distances, route) -> float:
+    return float(sum(distances[a, b] for a, b in zip(route, route[1:])))
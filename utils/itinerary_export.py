@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import re
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Iterator
+
+from utils.travel_store import ACTIVITY_COLUMNS, iter_export_activities
+
+EXPORT_COLUMNS = ("itinerary_id", "itinerary_name", "destination") + ACTIVITY_COLUMNS
+EXPORT_FORMATS = ["iCalendar", "CSV", "JSON Lines"]
+ICAL_LINE_OCTETS = 75
+WRITE_BLOCK_CHARS = 64 * 1024
+
+@dataclass
+class ExportReport:
+    itineraries: int = 0
+    activities: int = 0
+    size_bytes: int = 0
+    seconds: float = 0.0
+
+def _ical_escape(text) -> str:
+    return (str(text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _ical_fold(line) -> str:
+    """Split a content line into CRLF-joined chunks of at most 75 octets (RFC 5545 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICAL_LINE_OCTETS:
+        return line + "\r\n"
+    chunks, chunk = [], ""
+    limit = ICAL_LINE_OCTETS
+    for ch in line:
+        if len((chunk + ch).encode("utf-8")) > limit:
+            chunks.append(chunk)
+            chunk = ""
+            limit = ICAL_LINE_OCTETS - 1  # continuation lines start with a space
+        chunk += ch
+    chunks.append(chunk)
+    return "\r\n ".join(chunks) + "\r\n"
+
+def ical_lines(itinerary_name, activities, stamp) -> Iterator[str]:
+    """One VCALENDAR with a VEVENT per activity, at the activity's local (floating) time"""
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield "PRODID:-//Travel Itinerary Planner//EN\r\n"
+    yield _ical_fold(f"X-WR-CALNAME:{_ical_escape(itinerary_name)}")
+    for activity in activities:
+        details = activity["type"] + (f" - {activity['transport_type']}" if activity["transport_type"] else "")
+        if activity["notes"]:
+            details += f"\n{activity['notes']}"
+        yield "BEGIN:VEVENT\r\n"
+        yield f"UID:{activity['id']}@travel-itinerary-planner\r\n"
+        yield f"DTSTAMP:{stamp}\r\n"
+        yield f"DTSTART:{activity['date'].replace('-', '')}T{activity['time'].replace(':', '')}00\r\n"
+        yield f"DURATION:PT{int(activity['duration'])}M\r\n"
+        yield _ical_fold(f"SUMMARY:{_ical_escape(activity['name'])}")
+        if activity["location"]:
+            yield _ical_fold(f"LOCATION:{_ical_escape(activity['location'])}")
+        yield _ical_fold(f"DESCRIPTION:{_ical_escape(details)}")
+        yield _ical_fold(f"CATEGORIES:{_ical_escape(activity['type'])}")
+        yield "END:VEVENT\r\n"
+    yield "END:VCALENDAR\r\n"
+
+def csv_lines(activities) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for activity in activities:
+        writer.writerow([activity[column] for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def json_lines(activities) -> Iterator[str]:
+    for activity in activities:
+        yield json.dumps(activity, ensure_ascii=False) + "\n"
+
+def _safe_filename(name) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "itinerary"
+
+def _write_entry(archive, name, chunks):
+    """Stream text chunks into one compressed zip member, compressing a block at a time"""
+    with archive.open(name, "w") as member:
+        block, size = [], 0
+        for chunk in chunks:
+            block.append(chunk)
+            size += len(chunk)
+            if size >= WRITE_BLOCK_CHARS:
+                member.write("".join(block).encode("utf-8"))
+                block, size = [], 0
+        member.write("".join(block).encode("utf-8"))
+
+def _counted(rows, report, seen_itineraries):
+    for row in rows:
+        report.activities += row["id"] is not None
+        seen_itineraries.add(row["itinerary_id"])
+        yield row
+
+def _activities_only(rows):
+    """Drop the placeholder rows of itineraries without activities"""
+    return (row for row in rows if row["id"] is not None)
+
+def write_itinerary_zip(fileobj, itinerary_ids=None, formats=EXPORT_FORMATS) -> ExportReport:
+    """Write the activities of the given itineraries (None for all) into a zip, one format at a time.
+
+    Every format reads the activities straight from a database cursor and writes
+    them into its zip member chunk by chunk, so no export is held in memory whole.
+    """
+    started = time.perf_counter()
+    report = ExportReport()
+    seen_itineraries = set()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for export_format in formats:
+            # Activities are counted on the first pass only
+            rows = iter_export_activities(itinerary_ids)
+            if export_format == formats[0]:
+                rows = _counted(rows, report, seen_itineraries)
+            if export_format == "CSV":
+                _write_entry(archive, "activities.csv", csv_lines(_activities_only(rows)))
+            elif export_format == "JSON Lines":
+                _write_entry(archive, "activities.jsonl", json_lines(_activities_only(rows)))
+            elif export_format == "iCalendar":
+                # Every itinerary gets a calendar, an empty one if it has no activities yet
+                used_names = set()
+                for (itinerary_id, itinerary_name), activities in groupby(
+                        rows, key=lambda row: (row["itinerary_id"], row["itinerary_name"])):
+                    name = _safe_filename(itinerary_name)
+                    if name in used_names:
+                        name = f"{name}_{itinerary_id[:8]}"
+                    used_names.add(name)
+                    _write_entry(archive, f"calendars/{name}.ics",
+                                 ical_lines(itinerary_name, _activities_only(activities), stamp))
+    report.itineraries = len(seen_itineraries)
+    fileobj.seek(0, io.SEEK_END)
+    report.size_bytes = fileobj.tell()
+    fileobj.seek(0)
+    report.seconds = time.perf_counter() - started
+    return report
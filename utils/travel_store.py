@@ -0,0 +1,611 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from utils.db import DATA_ROOT, TRAVEL_DB_PATH
+from utils.geocoder import Place, get_gazetteer, normalize
+
+# The planner used to rewrite this whole file on every change; it is imported once and renamed
+LEGACY_ITINERARIES_FILE = os.path.join(DATA_ROOT, 'travel_itineraries.json')
+
+ITINERARY_COLUMNS = ("id", "name", "destination", "start_date", "end_date")
+SCHEMA_VERSION = 6
+MIN_CONNECTION_GAP = 15  # minutes needed between a transport leg and the next or previous activity
+BUSY_TIMEOUT_MS = 5000
+CHANGE_LOG_COMPACT_EVERY = 100  # versions between compactions of an itinerary's change log
+CHANGE_LOG_RETAIN = 1000        # sessions further behind than this many versions reload in full
+# bm25 weight of each search_index column; the first three are not searched
+SEARCH_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 5.0, 1.0, 2.0)
+ACTIVITY_COLUMNS = ("id", "name", "type", "transport_type", "time", "duration", "location", "notes",
+                    "day", "date")
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+@dataclass(frozen=True)
+class ItinerarySummary:
+    """What the itinerary picker needs, without the activities"""
+    id: str
+    name: str
+    destination: str
+    start_date: str
+    end_date: str
+    activity_count: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} ({self.destination} - {self.start_date} to {self.end_date})"
+
+@dataclass(frozen=True)
+class SearchHit:
+    """A search match: a whole itinerary (activity_id and day are None) or one activity in it"""
+    itinerary_id: str
+    itinerary_name: str
+    activity_id: Optional[str]
+    day: Optional[int]
+    title: str
+    snippet: str
+    score: float
+
+class ItineraryConflictError(Exception):
+    """The itinerary was changed by someone else since this copy of it was loaded"""
+
+    def __init__(self, itinerary_id):
+        super().__init__(f"Itinerary {itinerary_id} was changed by another session")
+        self.itinerary_id = itinerary_id
+
+def get_travel_connection():
+    """Connection to the itinerary store"""
+    conn = sqlite3.connect(TRAVEL_DB_PATH)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_travel_db():
+    """Create the itinerary tables and import the legacy JSON file, once per process"""
+    if TRAVEL_DB_PATH in _initialized and os.path.exists(TRAVEL_DB_PATH):
+        return
+    with _init_lock:
+        os.makedirs(os.path.dirname(TRAVEL_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(TRAVEL_DB_PATH)
+        # Readers keep working from the last commit while another session writes
+        conn.execute("PRAGMA journal_mode = WAL")
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS itineraries (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activities (
+            id TEXT PRIMARY KEY,
+            itinerary_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            transport_type TEXT,
+            time TEXT NOT NULL,  -- HH:MM
+            duration INTEGER NOT NULL,  -- minutes
+            location TEXT,
+            notes TEXT,
+            day INTEGER NOT NULL,  -- 1-based day of the trip
+            date TEXT NOT NULL,
+            FOREIGN KEY (itinerary_id) REFERENCES itineraries (id)
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_activities_itinerary_day ON activities(itinerary_id, day, time)")
+        
+        # Scheduling problems found by the conflict sweep, replaced day by day as activities change
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activity_conflicts (
+            itinerary_id TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            activity_id TEXT NOT NULL,
+            kind TEXT NOT NULL,  -- 'overlap', 'tight_connection'
+            other_activity_id TEXT NOT NULL,
+            minutes INTEGER NOT NULL,  -- overlap length, or the gap that was too short
+            PRIMARY KEY (itinerary_id, day, activity_id, kind)
+        ) WITHOUT ROWID
+        ''')
+        
+        # Every activity add, update and delete, numbered by the itinerary version it produced,
+        # so a session can replay what changed since the version it last saw
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS itinerary_changes (
+            itinerary_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,  -- itinerary version after the change
+            op TEXT NOT NULL,  -- 'add', 'update', 'delete'
+            activity_id TEXT NOT NULL,
+            activity TEXT,  -- JSON of the activity after the change; NULL for a delete
+            PRIMARY KEY (itinerary_id, seq)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_itinerary_changes_activity ON itinerary_changes(itinerary_id, activity_id, seq)")
+        
+        # Full-text index over itineraries and activities. Rows share the rowid of what they index,
+        # activities as is and itineraries negated, so a save replaces its row with a key lookup
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            itinerary_id UNINDEXED,
+            activity_id UNINDEXED,  -- NULL for the itinerary's own row
+            day UNINDEXED,
+            title,  -- itinerary or activity name
+            place,  -- destination or location
+            notes,
+            trip,  -- an activity's itinerary name and destination
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        ''')
+        
+        cursor.execute("PRAGMA user_version")
+        schema_version = cursor.fetchone()[0]
+        if schema_version < 1:
+            # Optimistic concurrency: every change to an itinerary or its activities bumps its version
+            cursor.execute("PRAGMA table_info(itineraries)")
+            if "version" not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE itineraries ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if schema_version < 2:
+            # Kept up to date by every activity write, so listing trips never touches activities
+            cursor.execute("PRAGMA table_info(itineraries)")
+            if "activity_count" not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE itineraries ADD COLUMN activity_count INTEGER NOT NULL DEFAULT 0")
+            cursor.execute('''
+            UPDATE itineraries SET activity_count =
+                (SELECT COUNT(*) FROM activities a WHERE a.itinerary_id = itineraries.id)
+            ''')
+        if schema_version < 3:
+            cursor.execute("SELECT id FROM itineraries")
+            for (itinerary_id,) in cursor.fetchall():
+                _refresh_conflicts(cursor, itinerary_id)
+        if schema_version < 4:
+            # Changes before the log existed can't be replayed; older copies reload in full
+            cursor.execute("PRAGMA table_info(itineraries)")
+            if "log_start" not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE itineraries ADD COLUMN log_start INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("UPDATE itineraries SET log_start = version")
+        if schema_version < 5:
+            cursor.execute("DELETE FROM search_index")
+            cursor.execute("SELECT id FROM itineraries")
+            for (itinerary_id,) in cursor.fetchall():
+                _index_itinerary(cursor, itinerary_id)
+            cursor.execute("SELECT id FROM activities")
+            for (activity_id,) in cursor.fetchall():
+                _index_activity(cursor, activity_id)
+        if schema_version < 6:
+            # Geocoder results per location text and trip destination, misses included; a changed
+            # gazetteer has a new fingerprint, so its answers are looked up afresh. Earlier rows
+            # were keyed without the commas the geocoder relies on, and are dropped
+            cursor.execute("DROP TABLE IF EXISTS geocodes")
+            cursor.execute('''
+            CREATE TABLE geocodes (
+                query TEXT NOT NULL,  -- location with each comma-separated part normalized
+                destination TEXT NOT NULL,  -- normalized trip destination the answer was limited to
+                gazetteer TEXT NOT NULL,  -- fingerprint of the gazetteer files
+                name TEXT,  -- NULL when nothing matched
+                city TEXT,
+                country TEXT,
+                latitude REAL,
+                longitude REAL,
+                population INTEGER,
+                PRIMARY KEY (query, destination, gazetteer)
+            ) WITHOUT ROWID
+            ''')
+        if schema_version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        imported = _import_legacy_itineraries(cursor)
+        conn.commit()
+        conn.close()
+        if imported:
+            os.replace(LEGACY_ITINERARIES_FILE, LEGACY_ITINERARIES_FILE + ".imported")
+        _initialized.add(TRAVEL_DB_PATH)
+
+def _import_legacy_itineraries(cursor):
+    """Copy itineraries from the old JSON file into the store; the caller retires the file after commit"""
+    if not os.path.exists(LEGACY_ITINERARIES_FILE):
+        return False
+    with open(LEGACY_ITINERARIES_FILE, "r") as f:
+        itineraries = json.load(f).get("itineraries", [])
+    for itinerary in itineraries:
+        _insert_itinerary(cursor, itinerary)
+        for activity in itinerary.get("activities", []):
+            _insert_activity(cursor, itinerary["id"], activity)
+        _refresh_activity_count(cursor, itinerary["id"])
+        _refresh_conflicts(cursor, itinerary["id"])
+    return True
+
+def _insert_itinerary(cursor, itinerary):
+    cursor.execute('''
+    INSERT OR IGNORE INTO itineraries (id, name, destination, start_date, end_date)
+    VALUES (?, ?, ?, ?, ?)
+    ''', tuple(itinerary[column] for column in ITINERARY_COLUMNS))
+    if cursor.rowcount:
+        _index_itinerary(cursor, itinerary["id"])
+
+def _insert_activity(cursor, itinerary_id, activity):
+    # REPLACE gives the row a new rowid, so the old index row goes first
+    _unindex_activities(cursor, "id = ?", (activity["id"],))
+    cursor.execute(f'''
+    INSERT OR REPLACE INTO activities (itinerary_id, {", ".join(ACTIVITY_COLUMNS)})
+    VALUES (?, {", ".join("?" * len(ACTIVITY_COLUMNS))})
+    ''', (itinerary_id,) + tuple(activity.get(column) for column in ACTIVITY_COLUMNS))
+    _index_activity(cursor, activity["id"])
+
+def _index_itinerary(cursor, itinerary_id):
+    cursor.execute('''
+    INSERT INTO search_index (rowid, itinerary_id, activity_id, day, title, place, notes, trip)
+    SELECT -rowid, id, NULL, NULL, name, destination, '', '' FROM itineraries WHERE id = ?
+    ''', (itinerary_id,))
+
+def _index_activity(cursor, activity_id):
+    cursor.execute('''
+    INSERT INTO search_index (rowid, itinerary_id, activity_id, day, title, place, notes, trip)
+    SELECT a.rowid, a.itinerary_id, a.id, a.day, a.name, a.location, a.notes, i.name || ' ' || i.destination
+    FROM activities a JOIN itineraries i ON i.id = a.itinerary_id
+    WHERE a.id = ?
+    ''', (activity_id,))
+
+def _unindex_activities(cursor, condition, params):
+    """Drop the index rows of the activities matching condition; call before they are replaced or deleted"""
+    cursor.execute(f"DELETE FROM search_index WHERE rowid IN (SELECT rowid FROM activities WHERE {condition})", params)
+
+def _refresh_activity_count(cursor, itinerary_id):
+    cursor.execute('''
+    UPDATE itineraries SET activity_count = (SELECT COUNT(*) FROM activities WHERE itinerary_id = :id)
+    WHERE id = :id
+    ''', {"id": itinerary_id})
+
+def _record_change(cursor, itinerary_id, op, activity_id, activity=None):
+    """Append a change to the itinerary's log under the version the current write produced"""
+    cursor.execute('''
+    INSERT INTO itinerary_changes (itinerary_id, seq, op, activity_id, activity)
+    SELECT id, version, ?, ?, ? FROM itineraries WHERE id = ?
+    ''', (op, activity_id,
+          json.dumps({column: activity.get(column) for column in ACTIVITY_COLUMNS}) if activity is not None else None,
+          itinerary_id))
+    cursor.execute("SELECT version FROM itineraries WHERE id = ?", (itinerary_id,))
+    if cursor.fetchone()[0] % CHANGE_LOG_COMPACT_EVERY == 0:
+        _compact_changes(cursor, itinerary_id)
+
+def _compact_changes(cursor, itinerary_id):
+    """Shrink an itinerary's change log without changing what replaying it produces.
+
+    Only the latest change of each activity is kept: a session replaying from any
+    version still sees every activity that changed after it in its final state.
+    Entries more than CHANGE_LOG_RETAIN versions old are dropped too, and log_start
+    moves up so sessions that far behind know to reload instead.
+    """
+    cursor.execute('''
+    DELETE FROM itinerary_changes
+    WHERE itinerary_id = :id AND seq < (
+        SELECT MAX(seq) FROM itinerary_changes latest
+        WHERE latest.itinerary_id = :id AND latest.activity_id = itinerary_changes.activity_id)
+    ''', {"id": itinerary_id})
+    cursor.execute('''
+    UPDATE itineraries SET log_start = MAX(log_start, version - :retain) WHERE id = :id
+    ''', {"id": itinerary_id, "retain": CHANGE_LOG_RETAIN})
+    cursor.execute('''
+    DELETE FROM itinerary_changes
+    WHERE itinerary_id = :id AND seq <= (SELECT log_start FROM itineraries WHERE id = :id)
+    ''', {"id": itinerary_id})
+
+def time_to_minutes(time_text):
+    hours, minutes = time_text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def find_conflicts(day_activities) -> List[Dict]:
+    """Sweep one day's activities in start-time order for overlaps and too-tight transport connections.
+
+    Each activity is only compared with the one that ends latest among those before
+    it, so a day costs one pass after sorting instead of a check of every pair.
+    """
+    conflicts = []
+    latest, latest_end = None, None
+    for activity in sorted(day_activities, key=lambda a: a["time"]):
+        start = time_to_minutes(activity["time"])
+        end = start + int(activity["duration"])
+        if latest is not None:
+            if start < latest_end:
+                conflicts.append({"activity_id": activity["id"], "kind": "overlap",
+                                  "other_activity_id": latest["id"], "minutes": min(latest_end, end) - start})
+            elif (activity["type"] == "Transportation" or latest["type"] == "Transportation") \
+                    and start - latest_end < MIN_CONNECTION_GAP:
+                conflicts.append({"activity_id": activity["id"], "kind": "tight_connection",
+                                  "other_activity_id": latest["id"], "minutes": start - latest_end})
+        if latest is None or end > latest_end:
+            latest, latest_end = activity, end
+    return conflicts
+
+def _refresh_conflicts(cursor, itinerary_id, day=None):
+    """Re-run the sweep for one day of an itinerary (or all of its days) and store what it finds"""
+    day_filter = "AND day = :day" if day is not None else ""
+    params = {"itinerary_id": itinerary_id, "day": day}
+    cursor.execute(f"DELETE FROM activity_conflicts WHERE itinerary_id = :itinerary_id {day_filter}", params)
+    cursor.execute(f'''
+    SELECT id, day, time, duration, type FROM activities
+    WHERE itinerary_id = :itinerary_id {day_filter}
+    ORDER BY day, time
+    ''', params)
+    activities_by_day = {}
+    for activity_id, activity_day, time, duration, activity_type in cursor.fetchall():
+        activities_by_day.setdefault(activity_day, []).append(
+            {"id": activity_id, "time": time, "duration": duration, "type": activity_type})
+    cursor.executemany('''
+    INSERT OR REPLACE INTO activity_conflicts (itinerary_id, day, activity_id, kind, other_activity_id, minutes)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(itinerary_id, activity_day, conflict["activity_id"], conflict["kind"],
+           conflict["other_activity_id"], conflict["minutes"])
+          for activity_day, activities in activities_by_day.items()
+          for conflict in find_conflicts(activities)])
+
+def load_conflicts(itinerary_id, day=None) -> Dict[str, List[Dict]]:
+    """Stored conflicts of an itinerary (or one day of it) keyed by the activity they are shown on"""
+    day_filter = "AND c.day = :day" if day is not None else ""
+    conn = get_travel_connection()
+    rows = conn.execute(f'''
+    SELECT c.activity_id, c.kind, c.minutes, c.other_activity_id, o.name AS other_name, o.time AS other_time
+    FROM activity_conflicts c
+    JOIN activities o ON o.id = c.other_activity_id
+    WHERE c.itinerary_id = :itinerary_id {day_filter}
+    ''', {"itinerary_id": itinerary_id, "day": day}).fetchall()
+    conn.close()
+    conflicts = {}
+    for row in rows:
+        conflicts.setdefault(row["activity_id"], []).append(dict(row))
+    return conflicts
+
+def count_conflicts(itinerary_id) -> int:
+    conn = get_travel_connection()
+    count = conn.execute("SELECT COUNT(*) FROM activity_conflicts WHERE itinerary_id = ?",
+                         (itinerary_id,)).fetchone()[0]
+    conn.close()
+    return count
+
+def _geocode_key(location) -> str:
+    """Cache key of a location: normalized, but keeping the commas that separate its parts"""
+    return ", ".join(normalize(part) for part in location.split(","))
+
+def geocode_locations(locations, destination=None) -> Dict[str, Optional[Place]]:
+    """Place for each location text of a trip to destination, from the store's cache or else the gazetteer"""
+    gazetteer = get_gazetteer()
+    context = normalize(destination)
+    queries = {location: _geocode_key(location) for location in set(locations) if location}
+    if not queries:
+        return {}
+    originals = {query: location for location, query in queries.items()}
+    
+    conn = get_travel_connection()
+    unique = sorted(set(queries.values()))
+    cached = {}
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        rows = conn.execute(f'''
+        SELECT query, name, city, country, latitude, longitude, population FROM geocodes
+        WHERE gazetteer = ? AND destination = ? AND query IN ({", ".join("?" * len(chunk))})
+        ''', [gazetteer.fingerprint, context] + chunk).fetchall()
+        for row in rows:
+            cached[row["query"]] = Place(*tuple(row)[1:]) if row["name"] is not None else None
+    
+    missing = [query for query in unique if query not in cached]
+    if missing:
+        for query in missing:
+            cached[query] = gazetteer.geocode(originals[query], destination)
+        conn.executemany('''
+        INSERT OR REPLACE INTO geocodes (query, destination, gazetteer, name, city, country, latitude, longitude,
+                                         population)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(query, context, gazetteer.fingerprint) + ((place.name, place.city, place.country, place.latitude,
+                                                  place.longitude, place.population) if place else (None,) * 6)
+              for query, place in ((query, cached[query]) for query in missing)])
+        conn.commit()
+    conn.close()
+    return {location: cached[query] for location, query in queries.items()}
+
+def list_itinerary_summaries() -> List[ItinerarySummary]:
+    """Summary of every itinerary, earliest trip first; activities are not read"""
+    conn = get_travel_connection()
+    conn.row_factory = None
+    rows = conn.execute(f'''
+    SELECT {", ".join(ITINERARY_COLUMNS)}, activity_count FROM itineraries ORDER BY start_date, name
+    ''').fetchall()
+    conn.close()
+    return [ItinerarySummary(*row) for row in rows]
+
+def load_activities(itinerary_id, day=None) -> List[Dict]:
+    """Activities of one itinerary (or of one of its days) in day and time order"""
+    # Separate statements, so a single day is an index range rather than a scan of the whole trip
+    day_filter = "AND day = :day" if day is not None else ""
+    conn = get_travel_connection()
+    rows = conn.execute(f'''
+    SELECT {", ".join(ACTIVITY_COLUMNS)} FROM activities
+    WHERE itinerary_id = :itinerary_id {day_filter}
+    ORDER BY day, time
+    ''', {"itinerary_id": itinerary_id, "day": day}).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def load_itinerary(itinerary_id, day=None) -> Optional[Dict]:
+    """One itinerary with its activities, or only those of one day"""
+    conn = get_travel_connection()
+    row = conn.execute(f"SELECT {', '.join(ITINERARY_COLUMNS)}, version FROM itineraries WHERE id = ?",
+                       (itinerary_id,)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    itinerary = dict(row)
+    itinerary["activities"] = load_activities(itinerary_id, day)
+    return itinerary
+
+def load_changes(itinerary_id, since) -> Optional[Tuple[int, List[Dict]]]:
+    """The itinerary's current version and the logged changes after version `since`, oldest first.
+
+    None when the log can't bring that version up to date (the itinerary is gone,
+    or the changes were compacted away), in which case the caller reloads it.
+    """
+    conn = get_travel_connection()
+    try:
+        # One read transaction, so the version and the changes come from the same snapshot
+        conn.execute("BEGIN")
+        row = conn.execute("SELECT version, log_start FROM itineraries WHERE id = ?", (itinerary_id,)).fetchone()
+        if row is None or not row["log_start"] <= since <= row["version"]:
+            return None
+        if since == row["version"]:
+            return since, []
+        rows = conn.execute('''
+        SELECT seq, op, activity_id, activity FROM itinerary_changes
+        WHERE itinerary_id = ? AND seq > ? ORDER BY seq
+        ''', (itinerary_id, since)).fetchall()
+    finally:
+        conn.close()
+    changes = [{"seq": seq, "op": op, "activity_id": activity_id,
+                "activity": json.loads(activity) if activity is not None else None}
+               for seq, op, activity_id, activity in rows]
+    return row["version"], changes
+
+def apply_changes(itinerary, version, changes, day=None):
+    """Replay logged changes onto a loaded itinerary (or one day of it), keeping day and time order"""
+    if changes:
+        activities = {activity["id"]: activity for activity in itinerary["activities"]}
+        for change in changes:
+            activities.pop(change["activity_id"], None)
+            activity = change["activity"]
+            if activity is not None and (day is None or activity["day"] == day):
+                activities[activity["id"]] = activity
+        itinerary["activities"] = sorted(activities.values(), key=lambda a: (a["day"], a["time"]))
+    itinerary["version"] = version
+
+def _match_expression(query, operator):
+    """FTS5 query matching every word of the user's text (or any, with OR) as a prefix"""
+    words = normalize(query).split()
+    return f" {operator} ".join(f'"{word}"*' for word in words)
+
+def search_itineraries(query, limit=20) -> List[SearchHit]:
+    """Itineraries and activities matching the text, best first.
+
+    Names weigh most, then places, trip names and notes. Hits must contain every
+    word; if nothing does, hits with any of them are ranked instead.
+    """
+    if not normalize(query):
+        return []
+    conn = get_travel_connection()
+    try:
+        for operator in ("AND", "OR"):
+            rows = conn.execute(f'''
+            SELECT search_index.itinerary_id, i.name, search_index.activity_id, search_index.day,
+                   search_index.title, snippet(search_index, -1, '**', '**', '…', 12),
+                   bm25(search_index, {", ".join(map(str, SEARCH_WEIGHTS))}) AS score
+            FROM search_index JOIN itineraries i ON i.id = search_index.itinerary_id
+            WHERE search_index MATCH ?
+            ORDER BY score
+            LIMIT ?
+            ''', (_match_expression(query, operator), limit)).fetchall()
+            if rows:
+                break
+    finally:
+        conn.close()
+    return [SearchHit(*row) for row in rows]
+
+def iter_export_activities(itinerary_ids=None):
+    """Activities with their itinerary's fields, streamed from the cursor in the order of the activity index.
+
+    An itinerary without activities still yields one row, with the activity fields None.
+    """
+    itinerary_filter = ""
+    params = []
+    if itinerary_ids is not None:
+        itinerary_ids = list(itinerary_ids)
+        itinerary_filter = f"WHERE i.id IN ({', '.join('?' * len(itinerary_ids))})"
+        params = itinerary_ids
+    conn = get_travel_connection()
+    try:
+        cursor = conn.execute(f'''
+        SELECT i.id AS itinerary_id, i.name AS itinerary_name, i.destination,
+               {", ".join("a." + column for column in ACTIVITY_COLUMNS)}
+        FROM itineraries i
+        LEFT JOIN activities a ON a.itinerary_id = i.id
+        {itinerary_filter}
+        ORDER BY i.id, a.day, a.time
+        ''', params)
+        for row in cursor:
+            yield dict(row)
+    finally:
+        conn.close()
+
+def create_itinerary(itinerary):
+    conn = get_travel_connection()
+    _insert_itinerary(conn.cursor(), itinerary)
+    conn.commit()
+    conn.close()
+    itinerary["version"] = 0
+
+@contextmanager
+def _itinerary_write(itinerary, expected_version=None):
+    """Change an itinerary only if nobody else did since it was loaded (compare-and-swap on its version).
+
+    Yields a cursor inside a write transaction; on success itinerary["version"]
+    is advanced, otherwise ItineraryConflictError is raised and nothing is written.
+    Sessions editing different itineraries never conflict.
+    """
+    expected_version = itinerary["version"] if expected_version is None else expected_version
+    conn = get_travel_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("UPDATE itineraries SET version = version + 1 WHERE id = ? AND version = ?",
+                       (itinerary["id"], expected_version))
+        if cursor.rowcount != 1:
+            raise ItineraryConflictError(itinerary["id"])
+        yield cursor
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    itinerary["version"] = expected_version + 1
+
+def delete_itinerary(itinerary):
+    with _itinerary_write(itinerary) as cursor:
+        cursor.execute("DELETE FROM activity_conflicts WHERE itinerary_id = ?", (itinerary["id"],))
+        _unindex_activities(cursor, "itinerary_id = ?", (itinerary["id"],))
+        cursor.execute("DELETE FROM search_index WHERE rowid = -(SELECT rowid FROM itineraries WHERE id = ?)",
+                       (itinerary["id"],))
+        cursor.execute("DELETE FROM activities WHERE itinerary_id = ?", (itinerary["id"],))
+        cursor.execute("DELETE FROM itinerary_changes WHERE itinerary_id = ?", (itinerary["id"],))
+        cursor.execute("DELETE FROM itineraries WHERE id = ?", (itinerary["id"],))
+
+def add_activity(itinerary, activity):
+    with _itinerary_write(itinerary) as cursor:
+        _insert_activity(cursor, itinerary["id"], activity)
+        _refresh_activity_count(cursor, itinerary["id"])
+        # Only the day that changed is swept again
+        _refresh_conflicts(cursor, itinerary["id"], activity["day"])
+        _record_change(cursor, itinerary["id"], "add", activity["id"], activity)
+
+def update_activity(itinerary, activity):
+    with _itinerary_write(itinerary) as cursor:
+        cursor.execute("SELECT day FROM activities WHERE id = ? AND itinerary_id = ?", (activity["id"], itinerary["id"]))
+        row = cursor.fetchone()
+        _insert_activity(cursor, itinerary["id"], activity)
+        # The activity may have moved to another day; both are swept again
+        for day in {activity["day"]} | ({row[0]} if row is not None else set()):
+            _refresh_conflicts(cursor, itinerary["id"], day)
+        _record_change(cursor, itinerary["id"], "update", activity["id"], activity)
+
+def delete_activity(itinerary, activity_id):
+    with _itinerary_write(itinerary) as cursor:
+        cursor.execute("SELECT day FROM activities WHERE id = ? AND itinerary_id = ?", (activity_id, itinerary["id"]))
+        row = cursor.fetchone()
+        _unindex_activities(cursor, "id = ? AND itinerary_id = ?", (activity_id, itinerary["id"]))
+        cursor.execute("DELETE FROM activities WHERE id = ? AND itinerary_id = ?", (activity_id, itinerary["id"]))
+        _refresh_activity_count(cursor, itinerary["id"])
+        if row is not None:
+            _refresh_conflicts(cursor, itinerary["id"], row[0])
+        _record_change(cursor, itinerary["id"], "delete", activity_id)
@@ -0,0 +1,213 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+BATCH_WINDOW = 0.005     # seconds the writer waits for more work after the first item
+MAX_BATCH_SIZE = 256     # items committed together at most
+METRICS_WINDOW = 1000    # recent batches kept for the metrics
+BUSY_TIMEOUT_MS = 5000
+
+@dataclass
+class WriteQueueMetrics:
+    batches: int
+    items: int
+    failed_items: int
+    mean_batch_size: float
+    max_batch_size: int
+    mean_commit_ms: float
+    p95_commit_ms: float
+    pending: int
+
+class WriteQueue:
+    """Write-behind queue with one writer thread that group-commits pending writes.
+
+    Each submitted write is a callable taking a cursor. The writer runs every
+    write of a batch inside its own savepoint and commits the batch once, so one
+    fsync covers many callers and a failing write only rolls back itself.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self._commit_seconds = deque(maxlen=METRICS_WINDOW)
+        self._batches = 0
+        self._items = 0
+        self._failed_items = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"write-queue:{db_path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Callable[[sqlite3.Cursor], object]) -> Future:
+        """Queue a write; the future resolves to its return value once committed.
+
+        A caller still holding a queue that was closed (or whose writer died) is
+        sent on to the database's current queue, so nothing is queued unanswered.
+        """
+        future = Future()
+        with self._lock:
+            if not self._closed:
+                self._queue.put((write, future))
+                return future
+        return get_write_queue(self.db_path).submit(write)
+
+    def execute(self, write: Callable[[sqlite3.Cursor], object]):
+        """Queue a write and block until it is committed"""
+        return self.submit(write).result()
+
+    def close(self):
+        """Commit what is pending and stop the writer thread"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        """Block for the first item, then collect more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW
+        while batch[-1] is not None and len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        items = []
+        error = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+                cursor = conn.cursor()
+                while True:
+                    batch = self._next_batch()
+                    stopping = batch[-1] is None
+                    items = [item for item in batch if item is not None]
+                    if items:
+                        self._write_batch(conn, cursor, items)
+                    items = []
+                    if stopping:
+                        return
+            finally:
+                conn.close()
+        except Exception as e:
+            error = e
+        finally:
+            self._stop(items, error)
+
+    def _stop(self, items, error):
+        """Refuse further writes and fail whatever the writer thread will never get to"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                items.append(item)
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error or RuntimeError(f"Write queue of {self.db_path} stopped"))
+        with _write_queues_lock:
+            if _write_queues.get(self.db_path) is self:
+                del _write_queues[self.db_path]
+
+    def _write_batch(self, conn, cursor, items):
+        results = []
+        failed = 0
+        # Only the writer thread may touch its connection, so the trace is (re)applied here
+        conn.set_trace_callback(_statement_trace)
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for write, future in items:
+                cursor.execute("SAVEPOINT queued_write")
+                try:
+                    result = write(cursor)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO queued_write")
+                    failed += 1
+                    results.append((future, None, e))
+                else:
+                    results.append((future, result, None))
+                cursor.execute("RELEASE queued_write")
+
+            started = time.perf_counter()
+            conn.commit()
+            commit_seconds = time.perf_counter() - started
+        except Exception as e:
+            # The batch as a whole could not be written (locked database, disk full, ...)
+            if conn.in_transaction:
+                conn.rollback()
+            for _, future in items:
+                future.set_exception(e)
+            with self._lock:
+                self._failed_items += len(items)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(items)
+            self._failed_items += failed
+            self._batch_sizes.append(len(items))
+            self._commit_seconds.append(commit_seconds)
+
+        # Callers only see their result after the commit made it durable
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def metrics(self) -> WriteQueueMetrics:
+        """Batch size and commit latency over the recent batches"""
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            commit_ms = sorted(seconds * 1000 for seconds in self._commit_seconds)
+            batches, items, failed_items = self._batches, self._items, self._failed_items
+        return WriteQueueMetrics(
+            batches=batches,
+            items=items,
+            failed_items=failed_items,
+            mean_batch_size=sum(sizes) / len(sizes) if sizes else 0.0,
+            max_batch_size=max(sizes, default=0),
+            mean_commit_ms=sum(commit_ms) / len(commit_ms) if commit_ms else 0.0,
+            p95_commit_ms=commit_ms[int(0.95 * (len(commit_ms) - 1))] if commit_ms else 0.0,
+            pending=self._queue.qsize(),
+        )
+
+_write_queues: Dict[str, WriteQueue] = {}
+_write_queues_lock = threading.Lock()
+_statement_trace: Optional[Callable[[str], None]] = None
+
+def set_statement_trace(callback: Optional[Callable[[str], None]]):
+    """Pass every statement the write queues run to callback from their next batch on (None to stop)"""
+    global _statement_trace
+    _statement_trace = callback
+
+def get_write_queue(db_path) -> WriteQueue:
+    """The process-wide write queue of a database file, started on first use"""
+    with _write_queues_lock:
+        write_queue = _write_queues.get(db_path)
+        if write_queue is None:
+            write_queue = _write_queues[db_path] = WriteQueue(db_path)
+        return write_queue
+
+def close_write_queue(db_path):
+    """Flush and stop the write queue of a database file, e.g. before the file is replaced"""
+    with _write_queues_lock:
+        write_queue = _write_queues.pop(db_path, None)
+    if write_queue is not None:
+        write_queue.close()